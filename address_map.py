@@ -0,0 +1,155 @@
+"""
+Address map of a flash layout: the enabled images as [start, end) intervals
+checked against each other and against the device's flash regions.
+
+The flash regions come from the .jflash project's [FLASH] section when it
+has them (BaseAddr / Size, and BaseAddr1 / Size1 ... for further banks),
+else from the profile's "flash_start" / "flash_end". Without either, only
+overlaps and gaps are reported.
+"""
+import configparser
+from bisect import bisect_right
+
+from parser import load_project
+
+# Issue kinds, errors stop a flash, gaps are informational
+OVERLAP = "overlap"
+OUT_OF_RANGE = "out_of_range"
+GAP = "gap"
+MAX_BANKS = 8
+
+
+class Interval:
+    def __init__(self, label, start, end):
+        self.label = label
+        self.start = start
+        self.end = end        # exclusive
+
+    def __repr__(self):
+        return f"{self.label} {self.start:08X}-{self.end:08X}"
+
+
+class Issue:
+    def __init__(self, kind, message, labels=()):
+        self.kind = kind
+        self.message = message
+        self.labels = list(labels)
+
+    @property
+    def is_error(self):
+        return self.kind != GAP
+
+    def __str__(self):
+        return self.message
+
+
+class IntervalIndex:
+    """
+    Intervals sorted by start, with a running maximum of their ends so
+    overlapping(start, end) only has to look at intervals starting before end.
+    """
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals, key=lambda iv: (iv.start, iv.end))
+        self._starts = [iv.start for iv in self.intervals]
+        self._max_end = []
+        running = None
+        for iv in self.intervals:
+            running = iv.end if running is None else max(running, iv.end)
+            self._max_end.append(running)
+
+    def overlapping(self, start, end):
+        """Intervals intersecting [start, end)"""
+        found = []
+        i = bisect_right(self._starts, end - 1) - 1
+        while i >= 0 and self._max_end[i] > start:
+            iv = self.intervals[i]
+            if iv.end > start and iv.start < end:
+                found.append(iv)
+            i -= 1
+        found.reverse()
+        return found
+
+    def containing(self, address):
+        """The interval holding address, or None"""
+        i = bisect_right(self._starts, address) - 1
+        while i >= 0 and self._max_end[i] > address:
+            if self.intervals[i].start <= address < self.intervals[i].end:
+                return self.intervals[i]
+            i -= 1
+        return None
+
+
+def _number(text):
+    return int(str(text).strip(), 0)
+
+
+def memory_map(project=None, profile=None):
+    """Flash regions as an IntervalIndex, empty if the device layout is unknown"""
+    regions = []
+    if project:
+        try:
+            config = load_project(project)
+        except (OSError, configparser.Error):
+            config = None
+        if config is not None:
+            for bank in range(MAX_BANKS):
+                suffix = str(bank) if bank else ""
+                if not (config.has("FLASH", f"BaseAddr{suffix}") and config.has("FLASH", f"Size{suffix}")):
+                    break
+                try:
+                    base = _number(config.get("FLASH", f"BaseAddr{suffix}"))
+                    size = _number(config.get("FLASH", f"Size{suffix}"))
+                except ValueError:
+                    break
+                regions.append(Interval(f"flash bank {bank}", base, base + size))
+
+    if not regions and profile:
+        end = profile.get("flash_end", "").strip()
+        if end:
+            start = profile.get("flash_start", "").strip() or "08000000"
+            try:
+                regions.append(Interval("flash", int(start, 16), int(end, 16)))
+            except ValueError:
+                pass
+    return IntervalIndex(regions)
+
+
+def check_layout(images, memory=None):
+    """
+    Issues of (label, start, size) images: images overlapping each other,
+    images not inside one flash region of memory, and the gaps between
+    consecutive images.
+    """
+    intervals = [Interval(label, start, start + size) for label, start, size in images]
+    index = IntervalIndex(intervals)
+    issues = []
+
+    for iv in index.intervals:
+        for other in index.overlapping(iv.start, iv.end):
+            if other is iv or (other.start, other.end, other.label) <= (iv.start, iv.end, iv.label):
+                continue  # report each pair once
+            lo, hi = max(iv.start, other.start), min(iv.end, other.end)
+            issues.append(Issue(
+                OVERLAP, f"{iv.label} and {other.label} overlap at {lo:08X}-{hi:08X} ({hi - lo} bytes)",
+                (iv.label, other.label)
+            ))
+
+    if memory is not None and memory.intervals:
+        for iv in index.intervals:
+            region = memory.containing(iv.start)
+            if region is None:
+                issues.append(Issue(OUT_OF_RANGE, f"{iv.label} starts at {iv.start:08X}, outside flash", (iv.label,)))
+            elif iv.end > region.end:
+                issues.append(Issue(
+                    OUT_OF_RANGE,
+                    f"{iv.label} runs {iv.end - region.end} bytes past the end of {region.label} ({region.end:08X})",
+                    (iv.label,)
+                ))
+
+    for prev, nxt in zip(index.intervals, index.intervals[1:]):
+        if nxt.start > prev.end:
+            issues.append(Issue(
+                GAP, f"{nxt.start - prev.end} byte gap between {prev.label} and {nxt.label}",
+                (prev.label, nxt.label)
+            ))
+    return issues
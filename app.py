@@ -1,37 +1,116 @@
-import time
+import copy
 import sys
 import os
-import shutil
-import subprocess
-import json
-import time
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QComboBox,
     QFileDialog, QVBoxLayout, QTextEdit, QMessageBox, QHBoxLayout,
     QInputDialog, QGraphicsDropShadowEffect, QFrame, QCheckBox
 )
 from PyQt6.QtGui import QIcon, QColor
-from PyQt6.QtCore import QThread, pyqtSignal, QSize
+from PyQt6.QtCore import QThread, pyqtSignal, QSize, QTimer, QEvent
 from theme import get_theme, hex_box_style
-from styles import MaterialButton, MaterialCheckBox, MaterialComboBox
-from widgets import FlashFileWidget
-from parser import get_config, set_config
-
-SETTINGS_FILE = "settings.json"
+from styles import MaterialButton, MaterialCheckBox, MaterialComboBox, material_stylesheet, set_severity
+from widgets import FlashFileWidget, SEGMENT_FILTER
+from profile_picker import ProfileListModel
+from parser import get_config, set_config_later, flush_configs
+
+SETTINGS_FILE = "settings.json"  # imported into PROFILES_DB on first start
+PROFILES_DB = "profiles.db"
+FILTER_DELAY_MS = 150  # the profile filter is applied once typing pauses this long
 swd_speeds = ["1", "5", "100", "500", "1000", "2000", "4000", "4800", "6000", "8000", "9600", "12000", "15000", "20000", "25000", "30000", "40000"]
 
 
 class FlashWorker(QThread):
+    """Runs a pipeline of steps off the GUI thread"""
+    output = pyqtSignal(str)
+    progress = pyqtSignal(object)      # jflash.ProgressEvent
+    step_changed = pyqtSignal(object)  # pipeline.Step
+    finished = pyqtSignal()
+
+    def __init__(self, steps):
+        super().__init__()
+        from pipeline import Pipeline
+
+        self.pipeline = Pipeline(
+            steps,
+            on_lines=lambda lines: self.output.emit("\n".join(lines)),
+            on_progress=self.progress.emit,
+            on_step=self.step_changed.emit,
+            on_stall=lambda seconds: self.output.emit(f"--- No output from JFlash for {seconds:.0f} s ---")
+        )
+        self.result = None
+
+    def cancel(self):
+        self.pipeline.cancel()
+
+    def run(self):
+        try:
+            self.result = self.pipeline.run()
+        except Exception as e:
+            self.output.emit(f"Exception: {e}")
+
+        self.finished.emit()
+
+
+class PrepareWorker(QThread):
+    """Validates and pre-flights a profile off the GUI thread, the images are read and hashed here"""
+    prepared = pyqtSignal(object, object)  # flash_core.FlashJob, steps for the (first) probe
+    failed = pyqtSignal(str)
+
+    def __init__(self, profile):
+        super().__init__()
+        self.profile = profile
+
+    def run(self):
+        from flash_core import prepare_flash, FlashError
+
+        try:
+            job = prepare_flash(self.profile)
+            # Delta steps cut their parts out of the images, so they are built here too
+            steps = job.steps_for(job.serials[0] if job.serials else "")
+        except FlashError as e:
+            self.failed.emit(str(e))
+            return
+        except Exception as e:
+            self.failed.emit(f"Exception: {e}")
+            return
+        self.prepared.emit(job, steps)
+
+
+class GangWorker(QThread):
     output = pyqtSignal(str)
+    probe_update = pyqtSignal(object)  # gang.ProbeResult
     finished = pyqtSignal()
 
-    def __init__(self, cmd):
+    def __init__(self, serials, steps_for):
         super().__init__()
-        self.cmd = cmd
+        self.serials = serials
+        self.steps_for = steps_for
+        from gang import ProbeResult
+        self.probes = {sn: ProbeResult(sn) for sn in serials}
+        self.cancel_event = threading.Event()
+        self.result = None
+
+    def cancel(self):
+        self.cancel_event.set()
 
     def run(self):
+        from gang import run_gang
+
+        def on_update(probe):
+            probe = copy.copy(probe)  # the GUI gets this state, not whatever the pool thread sets next
+            self.probes[probe.serial] = probe
+            self.probe_update.emit(probe)
+
         try:
-            subprocess.run(self.cmd)
+            self.result = run_gang(
+                self.serials,
+                self.steps_for,
+                on_lines=lambda sn, lines: self.output.emit("\n".join(f"[{sn}] {line}" for line in lines)),
+                on_update=on_update,
+                cancel_event=self.cancel_event
+            )
         except Exception as e:
             self.output.emit(f"Exception: {e}")
 
@@ -39,12 +118,63 @@ class FlashWorker(QThread):
 
 
 class JFlashGUI(QWidget):
+    ready = pyqtSignal()  # deferred startup work has finished
+    index_ready = pyqtSignal()  # the profile search index was built in the background
+
     def __init__(self):
         super().__init__()
         self.settings_path = SETTINGS_FILE
-        self.profiles = []
+        self.store = None
+        self._profile_index = None
+        self._index_thread = None
+        self._index_lock = threading.Lock()
+        self._index_backlog = []  # (method, argument) applied to the index once it is built
+        self.started = False
+        self._startup_scheduled = False
         self.init_ui()
+
+    def event(self, event):
+        result = super().event(event)
+        # Settings, the project file and icons are only loaded once the first frame is on screen
+        if event.type() == QEvent.Type.Paint and not self._startup_scheduled:
+            self._startup_scheduled = True
+            QTimer.singleShot(0, self.finish_startup)
+        return result
+
+    def finish_startup(self):
+        self.btn_add_profile.setIcon(QIcon("assets/add.svg"))
+        QApplication.setWindowIcon(QIcon("assets/thunder.ico"))
         self.load_settings()
+        self.started = True
+
+        # The search index is only needed once the operator types in the filter
+        if self.store is not None:
+            self._index_thread = threading.Thread(target=self._build_profile_index, daemon=True)
+            self._index_thread.start()
+        self.ready.emit()
+
+    def _build_profile_index(self):
+        from profile_index import ProfileIndex
+        from profile_store import ProfileStore
+        store = ProfileStore(self.store.path)  # sqlite connections stay on their own thread
+        try:
+            index = ProfileIndex(store.items())
+        finally:
+            store.close()
+        with self._index_lock:
+            for method, argument in self._index_backlog:  # profiles added / deleted during the build
+                getattr(index, method)(argument)
+            self._index_backlog = []
+            self._profile_index = index
+        self.index_ready.emit()
+
+    def update_profile_index(self, method, argument):
+        """index.add(profile) / index.remove(name), queued if the index is still being built"""
+        with self._index_lock:
+            if self._profile_index is None:
+                self._index_backlog.append((method, argument))
+                return
+        getattr(self._profile_index, method)(argument)
 
     def init_ui(self):
         self.setWindowTitle("JFlash Programming Tool")
@@ -57,14 +187,26 @@ class JFlashGUI(QWidget):
         profile_row = QHBoxLayout()
         lbl_profile = QLabel("Profile:")
         lbl_profile.setMinimumWidth(150)
-        self.last_loaded_profile = 0
 
+        self.profile_model = ProfileListModel(self)
         self.profile_select = MaterialComboBox()
         self.profile_select.setMinimumWidth(200)
+        self.profile_select.setModel(self.profile_model)
+        self.profile_select.setMaxVisibleItems(20)
         self.profile_select.currentIndexChanged.connect(self.load_profile)
 
+        self.profile_filter = QLineEdit()
+        self.profile_filter.setPlaceholderText("🔍 Name, serial or file")
+        self.profile_filter.setClearButtonEnabled(True)
+        self.profile_filter.setMaximumWidth(200)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(lambda: self.filter_profiles(self.profile_filter.text()))
+        self.profile_filter.textChanged.connect(self._filter_timer.start)
+        self.index_ready.connect(lambda: self.profile_filter.text() and self._filter_timer.start())
+
         self.btn_add_profile = MaterialButton()
-        self.btn_add_profile.setIcon(QIcon("assets/add.svg"))
         self.btn_add_profile.setIconSize(QSize(20, 20))
         self.btn_add_profile.clicked.connect(self.add_profile)
 
@@ -74,6 +216,7 @@ class JFlashGUI(QWidget):
 
         profile_row.addWidget(lbl_profile)
         profile_row.addWidget(self.profile_select)
+        profile_row.addWidget(self.profile_filter)
         profile_row.addWidget(self.btn_add_profile)
         profile_row.addWidget(self.btn_delete_profile)
         main_layout.addLayout(profile_row)
@@ -107,22 +250,38 @@ class JFlashGUI(QWidget):
         sn_layout.addWidget(swd_speed_label)
         sn_layout.addWidget(self.swd_speed)
 
-        # Right-aligned: checkbox
+        # Right-aligned: checkboxes
         self.chip_erase = MaterialCheckBox("Full Chip Erase")
+        self.delta_flash = MaterialCheckBox("Changed Sectors Only")
+        self.trim_fill = MaterialCheckBox("Skip Erased Fill")
+        self.trim_fill.setToolTip("With Full Chip Erase, runs of FF of a sector or more are not programmed")
 
         misc_layout.addLayout(sn_layout)
+        misc_layout.addWidget(self.delta_flash)
+        misc_layout.addWidget(self.trim_fill)
         misc_layout.addWidget(self.chip_erase)
         main_layout.addLayout(misc_layout)
 
         # ---------------- Flash File Widgets ----------------
-        self.bootloader_widget = FlashFileWidget("⚙️ Bootloader", "0x08000000", "Bootloader (*.bin *.trpk)")
-        self.kernel_widget = FlashFileWidget("💿 App Image", "08080000", "(*.bin *.trpk)")
-        self.param_widget = FlashFileWidget("💿 Secondary Image", "083FE000", "(*.bin)")
+        self.bootloader_widget = FlashFileWidget("⚙️ Bootloader", "0x08000000", f"Bootloader (*.bin *.trpk {SEGMENT_FILTER})")
+        self.kernel_widget = FlashFileWidget("💿 App Image", "08080000", f"(*.bin *.trpk {SEGMENT_FILTER})")
+        self.param_widget = FlashFileWidget("💿 Secondary Image", "083FE000", f"(*.bin {SEGMENT_FILTER})")
 
         main_layout.addWidget(self.bootloader_widget)
         main_layout.addWidget(self.kernel_widget)
         main_layout.addWidget(self.param_widget)
 
+        # Overlaps / out-of-flash / gaps of the enabled images, rechecked on every edit
+        self.layout_label = QLabel("")
+        self.layout_label.setWordWrap(True)
+        main_layout.addWidget(self.layout_label)
+        for widget in (self.bootloader_widget, self.kernel_widget, self.param_widget):
+            widget.addr.textChanged.connect(self.check_layout)
+            widget.file_path.textChanged.connect(self.check_layout)
+            widget.chk_enable.toggled.connect(self.check_layout)
+            widget.image_loaded.connect(self.check_layout)
+        self.prj_path.textChanged.connect(self.check_layout)
+
         # ---------------- Action Buttons ----------------
         action_frame = QFrame()
         action_frame.setFrameShape(QFrame.Shape.NoFrame)
@@ -146,14 +305,22 @@ class JFlashGUI(QWidget):
         action_frame.setLayout(action_layout)
 
         self.btn_run = MaterialButton("⚡ Run Flash")
+        self.btn_cancel = MaterialButton("⏹ Cancel", kind="danger")
+        self.btn_cancel.setEnabled(False)
         self.btn_save = MaterialButton("💾 Save Settings", kind="secondary")
         action_layout.addWidget(self.btn_run)
+        action_layout.addWidget(self.btn_cancel)
         action_layout.addWidget(self.btn_save)
 
         self.btn_run.clicked.connect(self.run_flash)
+        self.btn_cancel.clicked.connect(self.cancel_flash)
         self.btn_save.clicked.connect(self.save_settings)
         main_layout.addWidget(action_frame)
 
+        # ---------------- Progress ----------------
+        self.status_label = QLabel("Idle")
+        main_layout.addWidget(self.status_label)
+
         # ---------------- Output Box ----------------
         self.output_box = QTextEdit()
         self.output_box.setFontFamily("Courier New")
@@ -185,30 +352,42 @@ class JFlashGUI(QWidget):
             "jlink_sn": ""
         }
 
-        self.profiles.append(new_profile)
-        self.profile_select.addItem(name)
-        self.profile_select.setCurrentIndex(len(self.profiles) - 1)
+        if name in self.store:
+            QMessageBox.warning(self, "Error", f"Profile '{name}' already exists.")
+            return
+
+        self.store.put(new_profile)
+        self.update_profile_index("add", new_profile)
+        if self.profile_filter.text():
+            self.filter_profiles(self.profile_filter.text())
+        else:
+            self.profile_model.append(name)
+        if self.profile_model.row_of(name) < 0:
+            # The filter hides the new profile: show them all rather than lose sight of it
+            self.profile_filter.clear()
+            self.filter_profiles("")
+        self.profile_select.setCurrentIndex(self.profile_model.row_of(name))
 
     def delete_profile(self):
         index = self.profile_select.currentIndex()
         if index < 0:
             return
 
-        del self.profiles[index]
-        self.profile_select.removeItem(index)
+        name = self.profile_model.name(index)
+        self.store.delete(name)
+        self.update_profile_index("remove", name)
+        self.profile_model.remove(index)
 
-        # Save updated list
-        with open(self.settings_path, "w") as f:
-            json.dump({"profiles": self.profiles}, f, indent=4)
-
-        if self.profiles:
+        if self.profile_select.count():
             self.load_profile(0)
 
     def load_profile(self, index):
-        if index < 0 or index >= len(self.profiles):
+        if index < 0 or self.store is None:
             return
 
-        p = self.profiles[index]
+        p = self.store.get(self.profile_model.name(index))
+        if p is None:
+            return
 
         self.project_file = p.get("project_file", "")
         self.prj_path.setText(self.project_file)
@@ -229,33 +408,45 @@ class JFlashGUI(QWidget):
 
         self.jlink_sn.setText(p.get("jlink_sn", ""))
         self.chip_erase.setChecked(p.get("chip_erase", False))
+        self.delta_flash.setChecked(p.get("delta_flash", False))
+        self.trim_fill.setChecked(p.get("trim_fill", False))
+
+    def filter_profiles(self, text):
+        """Show only the profiles matching text, keeping the current one selected if it matches"""
+        if self.store is None:
+            return
+        index = self._profile_index
+        if index is None:
+            from profile_index import filter_names
+            names = filter_names(self.store.names(), text)  # by name only until index_ready
+        else:
+            names = index.search(text)
+        current = self.profile_select.currentText()
+        if current and current not in names:
+            self.save_settings()  # the shown profile drops out of the list, keep its edits
+        self.profile_select.blockSignals(True)
+        self.profile_model.set_names(names)
+        row = self.profile_model.row_of(current)
+        self.profile_select.setCurrentIndex(row)
+        self.profile_select.blockSignals(False)
+        if row < 0 and self.profile_model.rowCount():
+            self.profile_select.setCurrentIndex(0)
 
     def load_settings(self):
-        if not os.path.exists(self.settings_path):
-            # Initialize empty profiles file
-            with open(self.settings_path, "w") as f:
-                json.dump({"profiles": []}, f, indent=4)
+        from profile_store import open_store
 
         try:
-            with open(self.settings_path, "r") as f:
-                data = json.load(f)
-
-            self.profiles = data.get("profiles", [])
-            self.last_loaded_profile = data.get("last_loaded_profile", 0)
+            self.store = open_store(PROFILES_DB, self.settings_path)
 
             # Load profile names into the dropdown
-            self.profile_select.clear()
-            for p in self.profiles:
-                self.profile_select.addItem(p.get("name", "Unnamed Profile"))
+            names = self.store.names()
+            self.profile_model.set_names(names)
 
-            if self.profiles:
-                last_loaded_profile = data.get("last_loaded_profile", 0)
-                if 0 <= last_loaded_profile < len(self.profiles):
-                    self.profile_select.setCurrentIndex(last_loaded_profile)
-                else:
-                    self.profile_select.setCurrentIndex(0)
+            if names:
+                row = self.profile_model.row_of(self.store.get_meta("last_profile"))
+                self.profile_select.setCurrentIndex(max(row, 0))
 
-            self.output_box.append("Loaded settings.json\n")
+            self.output_box.append(f"Loaded {len(names)} profile(s) from {PROFILES_DB}\n")
 
         except Exception as e:
             self.output_box.append(f"Failed to load settings: {e}\n")
@@ -267,8 +458,19 @@ class JFlashGUI(QWidget):
             QMessageBox.warning(self, "Error", "No profile selected.")
             return
 
-        # Update profile object
-        self.profiles[index] = {
+        # Only the shown profile is written, and only if it changed
+        profile = self.current_profile()
+        self.store.set_meta("last_profile", profile["name"])
+        if self.store.put(profile):
+            self.update_profile_index("add", profile)
+            self.output_box.append(f"Saved profile '{profile['name']}'\n")
+
+
+    def current_profile(self):
+        """The profile as currently shown in the form, in settings.json format"""
+        stored = (self.store.get(self.profile_select.currentText()) if self.store else None) or {}
+        return {
+            **stored,  # keys without a widget (post_actions, step_timeout, sector_size)
             "name": self.profile_select.currentText(),
             "project_file": self.prj_path.text().strip(),
             "bootloader": self.bootloader_widget.get_file_info()[0].strip(),
@@ -281,15 +483,11 @@ class JFlashGUI(QWidget):
             "bootloader_enabled": self.bootloader_widget.chk_enable.isChecked(),
             "image_enabled": self.kernel_widget.chk_enable.isChecked(),
             "param_enabled": self.param_widget.chk_enable.isChecked(),
-            "chip_erase": self.chip_erase.isChecked()
+            "chip_erase": self.chip_erase.isChecked(),
+            "delta_flash": self.delta_flash.isChecked(),
+            "trim_fill": self.trim_fill.isChecked()
         }
 
-        with open(self.settings_path, "w") as f:
-            json.dump({"last_loaded_profile": self.last_loaded_profile, "profiles": self.profiles}, f, indent=4)
-
-        self.output_box.append("Saved profile to settings.json\n")
-
-
     # ------------------------------------------------------------
     # FILE SELECTION
     # ------------------------------------------------------------
@@ -298,124 +496,207 @@ class JFlashGUI(QWidget):
         if file:
             self.prj_path.setText(file)
 
+    def check_layout(self, *_):
+        """Show where the enabled images overlap, leave flash or leave gaps, as the form is edited"""
+        from address_map import check_layout, memory_map
+        from flash_core import IMAGE_SLOTS, ADDRESS_PATTERN, image_extents
+        from record_image import ImageFormatError
+
+        profile = self.current_profile() if self.started else {}
+        images, problems, placed = [], [], 0
+        for widget, (_, _, _, label) in zip((self.bootloader_widget, self.kernel_widget, self.param_widget), IMAGE_SLOTS):
+            if not widget.chk_enable.isChecked():
+                continue
+            file_path, addr, _ = widget.get_file_info()
+            if not ADDRESS_PATTERN.fullmatch(addr):
+                problems.append(f"{label} address must be 8 hex digits")
+                continue
+            try:
+                # .hex / .srec files are parsed by the widget's loader, which re-runs this check
+                extents = image_extents(label, file_path, int(addr, 16), os.path.getsize(file_path), parse=False)
+            except OSError:
+                continue  # no file picked yet, reported at flash time
+            except ImageFormatError as e:
+                problems.append(f"{label}: {e}")
+                continue
+            if extents is not None:
+                images += extents
+                placed += 1
+
+        issues = check_layout(images, memory_map(self.prj_path.text().strip(), profile))
+        problems += [str(issue) for issue in issues if issue.is_error]
+        notes = [str(issue) for issue in issues if not issue.is_error]
+        if problems:
+            set_severity(self.layout_label, "error")
+            self.layout_label.setText("\n".join(problems + notes))
+        elif notes:
+            set_severity(self.layout_label, "info")
+            self.layout_label.setText("\n".join(notes))
+        else:
+            set_severity(self.layout_label, "ok")
+            self.layout_label.setText(f"Layout OK: {placed} image(s)" if placed else "")
+
     # ------------------------------------------------------------
     # CONFIG SELECTION
     # ------------------------------------------------------------
     def on_swd_combo_change(self, text):
-        set_config(self.project_file, "JTAG", "Speed1", text)
-
-    def worker_done_callback(self, start_time):
-        time.sleep(1)
-        self.btn_run.setEnabled(True)
-        self.output_box.append(f"\n--- Finished in {time.time() - start_time:.2f} seconds ---\n")
+        if self.project_file:
+            set_config_later(self.project_file, "JTAG", "Speed1", text)
+
+    def on_flash_progress(self, event):
+        text = event.phase.capitalize()
+        if event.percent is not None:
+            text += f" {event.percent}%"
+        if event.bytes is not None:
+            text += f" ({event.bytes} bytes)"
+        self.status_label.setText(text)
+
+    def on_step_changed(self, step):
+        if step.state == "running":
+            self.status_label.setText(f"{step.name.capitalize()}...")
+            self.output_box.append("\nRunning Command:\n" + " ".join(step.cmd) + "\n")
+        elif step.elapsed is not None:
+            line = f"[{step.name}] {step.state.upper()} in {step.elapsed:.2f} s"
+            if step.error:
+                line += f" ({step.error})"
+            self.output_box.append(line)
+
+    def set_running(self, running):
+        self.btn_run.setEnabled(not running)
+        self.btn_cancel.setEnabled(running)
+
+    def cancel_flash(self):
+        for worker in (getattr(self, "worker", None), getattr(self, "gang_worker", None)):
+            if worker is not None and worker.isRunning():
+                worker.cancel()
+        self.output_box.append("\n--- Cancelling ---")
+
+    def worker_done_callback(self):
+        self.set_running(False)
+        result = self.worker.result
+        if result is None:
+            return
+        from metrics import record_run
+        record = record_run(self.job, self.job_serial, result.state, result.elapsed, result.phases)
+        self.status_label.setText(f"{result.state.capitalize()}")
+        self.output_box.append(f"\n--- {result.state.upper()}: finished in {result.elapsed:.2f} seconds ---")
+        self.output_box.append(f"Timing: {record.summary()}\n")
 
     def on_exit(self):
-        self.last_loaded_profile = self.profile_select.currentIndex()
+        # Never leave a JFlash process or worker thread behind
+        prepare_worker = getattr(self, "prepare_worker", None)
+        if prepare_worker is not None:
+            prepare_worker.wait()
+        for worker in (getattr(self, "worker", None), getattr(self, "gang_worker", None)):
+            if worker is not None and worker.isRunning():
+                worker.cancel()
+                worker.wait()
+        try:
+            flush_configs()
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Could not save the project edits:\n{e}")
+
+        if not self.started:
+            return  # settings were never loaded, do not overwrite them
         self.save_settings()
 
     # ------------------------------------------------------------
     # FLASH EXECUTION
     # ------------------------------------------------------------
     def run_flash(self):
-        # Ensure JFlash is available in PATH
-        if shutil.which("JFlash.exe") is None:
-            QMessageBox.critical(
-                self,
-                "Error",
-                "JFlash.exe not found in PATH.\nPlease add JFlash.exe to system PATH."
-            )
-            return
-
-        jflash = "JFlash.exe"
-
-        project = self.prj_path.text().strip()
-        if not os.path.exists(project):
-            QMessageBox.critical(self, "Error", "Project file path is invalid.")
+        self.set_running(True)
+        self.btn_cancel.setEnabled(False)  # pre-flight is short and not cancellable
+        self.status_label.setText("Pre-flight...")
+        self.prepare_worker = PrepareWorker(self.current_profile())
+        self.prepare_worker.prepared.connect(self.on_prepared)
+        self.prepare_worker.failed.connect(self.on_prepare_failed)
+        self.prepare_worker.start()
+
+    def on_prepare_failed(self, message):
+        self.set_running(False)
+        self.status_label.setText("Pre-flight failed")
+        QMessageBox.critical(self, "Error", message)
+
+    def on_prepared(self, job, steps):
+        if job.preflight:
+            self.output_box.append("\nPre-flight:\n" + "\n".join(check.describe() for check in job.preflight))
+        if job.fill_trim is not None:
+            self.output_box.append(job.fill_trim.describe())
+
+        if len(job.serials) > 1:
+            self.run_gang(job, steps)
             return
 
-        # File list
-        binaries = [
-            self.bootloader_widget.get_file_info(),
-            self.kernel_widget.get_file_info(),
-            self.param_widget.get_file_info()
-        ]
-        binaries = [(f, a) for f, a, chk in binaries if chk]
+        self.output_box.append("\n" + job.plan.describe() + "\n")
 
-        if not binaries and not self.chip_erase.isChecked():
-            QMessageBox.critical(self, "Error", "No binaries selected to flash.")
-            return
-
-        # Validate paths
-        for file_path, _ in binaries:
-            if not os.path.exists(file_path):
-                QMessageBox.critical(self, "Error", f"Binary file not found:\n{file_path}")
-                return
-
-        # Validate hex addresses
-        for label, addr in [
-            ("Bootloader", self.bootloader_widget.addr.text()),
-            ("Kernel", self.kernel_widget.addr.text()),
-            ("BootParam", self.param_widget.addr.text())
-        ]:
-            a = addr.strip()
-            if len(a) != 8 or any(c not in "0123456789ABCDEFabcdef" for c in a):
-                QMessageBox.critical(self, "Error", f"{label} address is invalid.\nMust be 8-digit hex.")
-                return
-
-        # Build command
-        cmd = [jflash, "-openprj", project.replace("/", "\\")]
-        sn = self.jlink_sn.text().strip()
-        if sn:
-            cmd.extend(["-usb", sn])
-
-        if self.chip_erase.isChecked():
-            erase_cmd = cmd + ["-erasechip", "-auto", "-exit"]
-            self.output_box.append("\nRunning Erase Command:\n" + " ".join(erase_cmd) + "\n")
-            start_time = time.time()
-            self.worker = FlashWorker(erase_cmd)
-            self.worker.output.connect(self.output_box.append)
-            self.worker.finished.connect(lambda: self.worker_done_callback(start_time))
-            self.worker.start()
-            self.worker.wait()  # Wait for erase to finish before proceeding
-
-        for bin_file, addr in binaries:
-            bin_file = bin_file.replace("/", "\\")
-
-            # TRPK → BIN conversion
-            if bin_file.endswith(".trpk"):
-                new_file = os.path.splitext(bin_file)[0] + ".bin"
-                if not os.path.exists(new_file):
-                    shutil.copy2(bin_file, new_file)
-                bin_file = new_file
-
-            # Append command sequence
-            cmd.extend([
-                f"-open\"{bin_file}\",{addr}",
-                "-auto"
-            ])
-
-        cmd.append("-exit")
-
-        # Show command
-        self.output_box.append("\nRunning Command:\n" + " ".join(cmd) + "\n")
+        sn = job.serials[0] if job.serials else ""
+        self.job, self.job_serial = job, sn
 
         # Start worker thread
-        start_time = time.time()
-        self.worker = FlashWorker(cmd)
+        self.worker = FlashWorker(steps)
         self.worker.output.connect(self.output_box.append)
-        self.worker.finished.connect(lambda: self.worker_done_callback(start_time))
-        self.btn_run.setEnabled(False)
+        self.worker.progress.connect(self.on_flash_progress)
+        self.worker.step_changed.connect(self.on_step_changed)
+        self.worker.finished.connect(self.worker_done_callback)
+        self.set_running(True)
         self.worker.start()
 
-
-def main():
-    app = QApplication(sys.argv)
-    app.setStyleSheet(get_theme())
+    def run_gang(self, job, steps):
+        """Flash the same images through several probes at once, steps are the first probe's"""
+        serials = job.serials
+        self.output_box.append("\n" + job.plan.describe() + "\n")
+        self.output_box.append(f"\nGang flashing {len(serials)} probes: {', '.join(serials)}\n")
+        for step in steps:
+            self.output_box.append(f"Per-probe step '{step.name}':\n" + " ".join(step.cmd) + "\n")
+
+        self.job = job
+        self.gang_worker = GangWorker(serials, job.steps_for)
+        self.gang_worker.output.connect(self.output_box.append)
+        self.gang_worker.probe_update.connect(self.on_probe_update)
+        self.gang_worker.finished.connect(self.gang_done_callback)
+        self.set_running(True)
+        self.gang_worker.start()
+
+    def on_probe_update(self, probe):
+        probes = self.gang_worker.probes
+        done = sum(p.status in ("passed", "failed") for p in probes.values())
+        failed = sum(p.status == "failed" for p in probes.values())
+        self.status_label.setText(f"Gang: {done}/{len(probes)} done, {failed} failed")
+        if probe.status in ("passed", "failed"):
+            self.output_box.append(f"[{probe.serial}] {probe.status.upper()} in {probe.elapsed or 0:.2f} s")
+
+    def gang_done_callback(self):
+        result = self.gang_worker.result
+        self.set_running(False)
+        if result is None:
+            return
+        from metrics import record_run
+        self.output_box.append("\n--- Gang summary ---")
+        for probe in result.probes:
+            record_run(self.job, probe.serial, probe.status, probe.elapsed or 0.0, probe.phases)
+            line = f"{probe.serial:<12} {probe.status:<7} {probe.elapsed or 0:7.2f} s"
+            if probe.returncode:
+                line += f"  exit {probe.returncode}"
+            if probe.error:
+                line += f"  {probe.error}"
+            self.output_box.append(line)
+        verdict = "PASS" if result.passed else "FAIL"
+        self.output_box.append(f"--- {verdict}: {result.summary()} ---\n")
+
+
+def build_window(app):
+    """Create and show the main window, anything the first frame does not need is deferred"""
+    app.setStyleSheet(get_theme() + material_stylesheet())
     window = JFlashGUI()
     app.aboutToQuit.connect(window.on_exit)
-    app.setWindowIcon(QIcon('assets/thunder.ico'))
     window.resize(700, 650)
     window.show()
+    return window
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = build_window(app)
     sys.exit(app.exec())
 
 
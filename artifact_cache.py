@@ -0,0 +1,291 @@
+"""
+Content-addressed cache for the binaries handed to JFlash (.trpk → .bin
+conversions, .hex / .srec / ELF segments and merged images from the flash planner).
+
+Objects are stored as objects/<sha256[:2]>/<sha256>.bin, so identical images
+from different profiles share one artifact and a rebuilt source always maps
+to a new object. Sources are linked in with a reflink (copy-on-write clone)
+where the filesystem supports it, else a hardlink, else a plain copy. The
+cache is bounded by size and evicts least recently used objects. The
+artifacts of .hex / .srec / ELF files are remembered per source (size,
+mtime) like put_file's hashes, so an unchanged image is not read again.
+
+The GUI, the CLI and gang runs can share one cache: every change of
+index.json happens under an exclusive lock on index.lock, on the index as
+the other processes left it.
+"""
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+CACHE_DIR = os.environ.get("JFLASH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".jflash_cache"))
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+HASH_CHUNK = 1 << 20
+FICLONE = 0x40049409  # Linux ioctl: clone src_fd's extents into dst_fd
+
+
+class ArtifactCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = os.path.join(root, "index.lock")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self._index_stamp = None
+        self._index = self._load_index()
+
+    # ---------------- Index ----------------
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+                st = os.fstat(f.fileno())
+            self._index_stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("objects", {})   # sha -> {size, mtime_ns, last_used}
+        index.setdefault("sources", {})   # abs path -> {size, mtime_ns, sha}
+        index.setdefault("segments", {})  # abs path -> {size, mtime_ns, parts: [[address, sha], ...]}
+        return index
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"), suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._index, f)
+            f.flush()
+            st = os.fstat(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self._index_stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the index against other threads and processes, with the index
+        re-read if another process replaced it since this one last did
+        """
+        with self._lock, open(self.lock_path, "ab") as lock_file:
+            lock_exclusive(lock_file)
+            try:
+                try:
+                    st = os.stat(self.index_path)
+                    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+                except OSError:
+                    stamp = None
+                if stamp != self._index_stamp:
+                    self._index = self._load_index()
+                yield
+            finally:
+                unlock(lock_file)
+
+    def object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.bin")
+
+    # ---------------- Lookup / insert ----------------
+    def file_hash(self, path):
+        """SHA-256 of path, memoised on (size, mtime) so unchanged sources are not re-read"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        memo = self._index["sources"].get(path)
+        if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+            return memo["sha"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        self._index["sources"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha": sha}
+        return sha
+
+    def _valid(self, sha):
+        """An object is only reused if it was not modified since it was stored (hardlinks share inodes)"""
+        entry = self._index["objects"].get(sha)
+        try:
+            st = os.stat(self.object_path(sha))
+        except OSError:
+            return False
+        return entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+    def _register(self, sha):
+        st = os.stat(self.object_path(sha))
+        self._index["objects"][sha] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "last_used": time.time()}
+
+    def put_file(self, src):
+        """Cached artifact path for the content of src, linking it in if it is not cached yet"""
+        with self._locked():
+            sha = self.file_hash(src)
+            if self._valid(sha):
+                self._index["objects"][sha]["last_used"] = time.time()
+            else:
+                dst = self.object_path(sha)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                if os.path.exists(dst):
+                    os.remove(dst)
+                link_or_copy(src, dst)
+                self._register(sha)
+                self._evict(keep=sha)
+            self._save_index()
+            return self.object_path(sha)
+
+    def put_bytes(self, data):
+        """Cached artifact path for data, written only if no artifact has that content yet"""
+        sha = hashlib.sha256(data).hexdigest()
+        with self._locked():
+            if self._valid(sha):
+                self._index["objects"][sha]["last_used"] = time.time()
+                self._save_index()
+                return self.object_path(sha)
+        fd, tmp_path = self.temp_file()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self.commit(tmp_path, sha)
+
+    def cached_segments(self, src):
+        """
+        [(artifact path, address)] stored by put_segments for src, or None if
+        src changed since or one of the artifacts was evicted
+        """
+        path = os.path.abspath(src)
+        st = os.stat(path)
+        with self._locked():
+            memo = self._index["segments"].get(path)
+            if not memo or memo["size"] != st.st_size or memo["mtime_ns"] != st.st_mtime_ns:
+                return None
+            if not all(self._valid(sha) for _, sha in memo["parts"]):
+                return None
+            now = time.time()
+            for _, sha in memo["parts"]:
+                self._index["objects"][sha]["last_used"] = now
+            self._save_index()
+            return [(self.object_path(sha), address) for address, sha in memo["parts"]]
+
+    def put_segments(self, src, stamp, segments):
+        """
+        Store the (address, data) segments of image file src, one artifact
+        each, and remember them under stamp, the (mtime_ns, size) src had
+        when it was read
+        """
+        parts = [(self.put_bytes(data), address) for address, data in segments]
+        with self._locked():
+            self._index["segments"][os.path.abspath(src)] = {
+                "size": stamp[1], "mtime_ns": stamp[0],
+                "parts": [[address, os.path.splitext(os.path.basename(path))[0]] for path, address in parts],
+            }
+            self._save_index()
+        return parts
+
+    def temp_file(self):
+        """(fd, path) of a scratch file inside the cache, to be finished with commit()"""
+        return tempfile.mkstemp(dir=os.path.join(self.root, "tmp"), suffix=".tmp")
+
+    def commit(self, tmp_path, sha):
+        """Move a finished scratch file with content hash sha into the cache"""
+        with self._locked():
+            dst = self.object_path(sha)
+            if self._valid(sha):
+                os.remove(tmp_path)
+                self._index["objects"][sha]["last_used"] = time.time()
+            else:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                os.replace(tmp_path, dst)
+                self._register(sha)
+                self._evict(keep=sha)
+            self._save_index()
+            return dst
+
+    def _evict(self, keep):
+        """Drop least recently used objects until the cache fits, never the one just stored"""
+        objects = self._index["objects"]
+        total = sum(entry["size"] for entry in objects.values())
+        for sha in sorted(objects, key=lambda s: objects[s]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha == keep:
+                continue
+            total -= objects.pop(sha)["size"]
+            try:
+                os.remove(self.object_path(sha))
+            except OSError:
+                pass
+        live = set(objects)
+        self._index["sources"] = {
+            path: memo for path, memo in self._index["sources"].items() if memo["sha"] in live
+        }
+        self._index["segments"] = {
+            path: memo for path, memo in self._index["segments"].items()
+            if all(sha in live for _, sha in memo["parts"])
+        }
+
+
+def lock_exclusive(f):
+    """Block until this process holds the lock on open file f"""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK gives up after 10 attempts, keep waiting
+                continue
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def unlock(f):
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def link_or_copy(src, dst):
+    """Populate dst with src's content as cheaply as the filesystem allows"""
+    if _reflink(src, dst):
+        return "reflink"
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(src, dst)
+        return "copy"
+
+
+def _reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False  # Windows
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError as e:
+        if os.path.exists(dst):
+            os.remove(dst)
+        if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+            raise
+        return False
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArtifactCache()
+    return _default_cache
@@ -0,0 +1,101 @@
+"""
+Load-test gang flashing against the JFlash simulator (jflash_sim.py).
+
+    python benchmarks/bench_gang.py [--probes 32] [--workers 8] [--scale 0.05]
+                                    [--fail-rate 0.05] [--hang-rate 0.02]
+                                    [--timeout 5] [--image-kb 512] [--json]
+
+Runs one gang of --probes simulated probes through the real flash_core /
+gang / pipeline code. Reports pass/fail/timeout counts, the wall time,
+boards per hour at the simulated timing and per-probe latency percentiles.
+Hanging sessions show whether step timeouts release their pool workers.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, REPO)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--probes", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--scale", type=float, default=0.05, help="simulator time scale")
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--hang-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=5.0, help="step timeout in seconds")
+    parser.add_argument("--image-kb", type=int, default=512)
+    parser.add_argument("--seed", default="1")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.update({
+            "JFLASH_CACHE_DIR": os.path.join(scratch, "cache"),
+            "JFLASH_SIM_SCALE": str(args.scale),
+            "JFLASH_SIM_FAIL_RATE": str(args.fail_rate),
+            "JFLASH_SIM_HANG_RATE": str(args.hang_rate),
+            "JFLASH_SIM_SEED": args.seed,
+        })
+        from flash_core import prepare_flash
+        from gang import run_gang
+
+        project = os.path.join(scratch, "board.jflash")
+        with open(project, "w") as f:
+            f.write("[JTAG]\n  Speed1 = 4000\n")
+        image = os.path.join(scratch, "app.bin")
+        with open(image, "wb") as f:
+            f.write(os.urandom(args.image_kb * 1024))
+
+        serials = [str(600000000 + i) for i in range(args.probes)]
+        job = prepare_flash({
+            "name": "load test",
+            "project_file": project,
+            "image_file": image, "image_enabled": True, "addr_image": "08080000",
+            "jlink_sn": ",".join(serials),
+            "step_timeout": args.timeout,
+        }, os.path.join(REPO, "jflash_sim.py"))
+
+        start = time.monotonic()
+        result = run_gang(serials, job.steps_for, max_workers=args.workers)
+        wall = time.monotonic() - start
+
+    outcomes = {}
+    for probe in result.probes:
+        kind = "passed" if probe.status == "passed" else ("timeout" if "timeout" in probe.error else "failed")
+        outcomes[kind] = outcomes.get(kind, 0) + 1
+    elapsed = [probe.elapsed or 0.0 for probe in result.probes]
+    report = {
+        "probes": args.probes,
+        "workers": args.workers,
+        "scale": args.scale,
+        "outcomes": outcomes,
+        "wall": wall,
+        "boards_per_hour": outcomes.get("passed", 0) / wall * 3600 * args.scale if wall else 0.0,
+        "probe_p50": statistics.median(elapsed),
+        "probe_p95": percentile(elapsed, 0.95),
+        "probe_max": max(elapsed),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{args.probes} probes on {args.workers} workers, simulator scale {args.scale}")
+    print("  " + ", ".join(f"{count} {kind}" for kind, count in sorted(outcomes.items())))
+    print(f"  wall {wall:.2f} s, {report['boards_per_hour']:.0f} boards/hour at real timing")
+    print(f"  per probe: p50 {report['probe_p50']:.2f} s, p95 {report['probe_p95']:.2f} s, max {report['probe_max']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compare hexdump.format_rows against the per-row formatting loop the hex
+viewer used before it was replaced.
+
+    python benchmarks/bench_hexdump.py [--sizes 1,16,64]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hexdump import format_rows  # noqa: E402
+
+
+def legacy_format(data):
+    """The original Hexviewer.update_display loop, minus the Qt calls"""
+    lines = []
+    ascii_lines = []
+    for i in range(0, len(data), 16):
+        chunk = data[i:i+16]
+        hex_bytes = " ".join(f"{b:02X}" for b in chunk).ljust(47)
+        ascii_bytes = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
+        lines.append(f"{i:08X}  {hex_bytes}")
+        ascii_lines.append(f"{ascii_bytes}")
+    return lines, ascii_lines
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1,16,64", help="comma separated input sizes in MB")
+    args = parser.parse_args()
+
+    print(f"{'size':>8}  {'legacy (s)':>11}  {'bulk (s)':>9}  {'speedup':>8}")
+    for size_mb in (int(s) for s in args.sizes.split(",")):
+        data = os.urandom(size_mb * 1024 * 1024)
+
+        legacy_time, expected = timed(legacy_format, data)
+        bulk_time, actual = timed(format_rows, 0, data)
+        if actual != expected:
+            sys.exit(f"output mismatch at {size_mb} MB")
+
+        print(f"{size_mb:>6}MB  {legacy_time:>11.3f}  {bulk_time:>9.3f}  {legacy_time / bulk_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start time of the GUI under the offscreen Qt platform.
+
+    python benchmarks/bench_startup.py [--runs 10] [--profiles 50]
+
+Each run is a fresh interpreter started in its own scratch directory
+holding a settings.json with --profiles profiles and the artifact cache. Reported per run (milliseconds
+since the child interpreter started): imports done, first frame painted,
+and deferred startup (settings + project file) finished.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+marks = {}
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QObject, QEvent, QTimer
+import app as jflash_app
+marks["imports"] = time.perf_counter() - start
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "first_paint" not in marks:
+            marks["first_paint"] = time.perf_counter() - start
+        return False
+
+def on_ready():
+    marks["ready"] = time.perf_counter() - start
+    QTimer.singleShot(0, qt_app.quit)
+
+qt_app = QApplication(sys.argv[:1])
+paint_filter = FirstPaint()
+qt_app.installEventFilter(paint_filter)
+window = jflash_app.build_window(qt_app)
+window.ready.connect(on_ready)
+QTimer.singleShot(10000, qt_app.quit)  # never hang the benchmark
+qt_app.exec()
+print(json.dumps({k: v * 1000 for k, v in marks.items()}))
+"""
+
+
+def write_settings(directory, count):
+    project = os.path.join(directory, "board.jflash")
+    with open(project, "w") as f:
+        f.write("AppVersion = 1\n[JTAG]\n  Speed1 = 4000\n")
+    profiles = [{
+        "name": f"Profile {i}",
+        "project_file": project,
+        "image_file": "",
+        "addr_image": "08080000",
+    } for i in range(count)]
+    with open(os.path.join(directory, "settings.json"), "w") as f:
+        json.dump({"profiles": profiles}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--profiles", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print raw per-run results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        # A fresh directory per run: no profiles.db left by the previous run's import, no shared cache
+        with tempfile.TemporaryDirectory() as scratch:
+            os.symlink(os.path.join(REPO, "assets"), os.path.join(scratch, "assets"))
+            write_settings(scratch, args.profiles)
+            env = dict(os.environ, QT_QPA_PLATFORM="offscreen", JFLASH_CACHE_DIR=os.path.join(scratch, "cache"))
+            wall = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD, REPO],
+                cwd=scratch, env=env, capture_output=True, text=True, check=True
+            ).stdout
+            run = json.loads(out.strip().splitlines()[-1])
+            run["process"] = (time.perf_counter() - wall) * 1000
+            results.append(run)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mark':<12} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for mark in ("imports", "first_paint", "ready", "process"):
+        values = [r[mark] for r in results if mark in r]
+        if values:
+            print(f"{mark:<12} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
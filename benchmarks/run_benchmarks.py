@@ -0,0 +1,341 @@
+"""
+Benchmark suite for the tool's hot paths, headless on Linux.
+
+    python benchmarks/run_benchmarks.py [--quick] [--cases parser,flash]
+                                        [--out results.json]
+                                        [--baseline results.json] [--tolerance 0.25]
+
+Cases:
+    parser_get_config_cold  parse + lookup on a large .jflash project
+    parser_get_config_warm  lookup served from the parsed-project cache
+    parser_set_config       one coalesced rewrite of two keys on the same project
+    hexview_update_display  Hexviewer.update_display at random rows of a large image (offscreen Qt)
+    hexview_search          hex, masked and text patterns searched at once over the large image
+    binary_diff             differing ranges of the large image against a copy with scattered changes
+    settings_import         first start: settings.json imported into the profile store
+    settings_load           profile names and the last profile from the store
+    settings_save           saving one changed profile
+    prepare_flash           validation, conversion and command building of run_flash
+    fill_trim               erased-fill run detection and splitting of a padded image (chip erase)
+    flash_session           a full single-probe pipeline against the JFlash simulator (jflash_sim.py)
+
+Every case reports median/min/max seconds over its repetitions. --out writes
+the results as JSON; with --baseline, any case whose median is slower than
+the baseline's by more than --tolerance (a fraction) is listed and the exit
+code is 1, so the suite can gate a CI job.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+JFLASH_SIM = os.path.join(REPO, "jflash_sim.py")
+sys.path.insert(0, REPO)
+
+
+class SkipCase(Exception):
+    """The case cannot run here (e.g. PyQt6 missing), reported instead of a timing"""
+
+
+def repeat(fn, runs, setup=None):
+    samples = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ---------------- Fixtures ----------------
+def write_project(path, sections):
+    with open(path, "w") as f:
+        f.write("AppVersion = 72000\n[JTAG]\n  Speed1 = 4000\n  Speed0 = 4000\n")
+        for i in range(sections):
+            f.write(f"[SECTION{i}]\n" + "".join(f"  Key{j} = 0x{i * 64 + j:08X}\n" for j in range(32)))
+
+
+def write_image(path, size):
+    with open(path, "wb") as f:
+        f.write(random.Random(size).randbytes(size))
+
+
+def make_profile(i, project, images):
+    return {
+        "name": f"Variant {i:05d}",
+        "project_file": project,
+        "bootloader": images[0], "bootloader_enabled": True, "addr_bootloader": "08000000",
+        "image_file": images[1], "image_enabled": True, "addr_image": "08080000",
+        "param_file": images[2], "param_enabled": True, "addr_param": "083FE000",
+        "jlink_sn": str(600000000 + i),
+        "chip_erase": False,
+    }
+
+
+# ---------------- Cases ----------------
+def case_parser_get_config_cold(ctx):
+    import parser
+    return repeat(lambda: parser.get_config(ctx.project, "JTAG", "Speed1"), ctx.runs,
+                  setup=lambda: parser.invalidate_project(ctx.project))
+
+
+def case_parser_get_config_warm(ctx):
+    import parser
+    parser.get_config(ctx.project, "JTAG", "Speed1")
+    return repeat(lambda: [parser.get_config(ctx.project, "JTAG", "Speed1") for _ in range(1000)], ctx.runs)
+
+
+def case_parser_set_config(ctx):
+    import parser
+    speeds = iter(["1000", "2000"] * ctx.runs)
+    return repeat(lambda: parser.set_configs(ctx.project, {
+        ("JTAG", "Speed1"): next(speeds), ("JTAG", "Speed0"): "4000"
+    }), ctx.runs)
+
+
+def case_hexview_update_display(ctx):
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from hex_viewer import Hexviewer
+    except ImportError as e:
+        raise SkipCase(f"PyQt6 not available: {e}")
+    app = QApplication.instance() or QApplication([])
+    viewer = Hexviewer(ctx.large_image)
+    viewer.resize(900, 600)
+    viewer.show()
+    app.processEvents()
+    viewer.load_file()
+    rows = random.Random(1).sample(range(viewer.row_count()), ctx.runs)
+    positions = iter(rows)
+
+    def jump():
+        viewer._row_cache.clear()  # every jump lands on rows that were never formatted
+        viewer.scroll_bar.blockSignals(True)
+        viewer.scroll_bar.setValue(next(positions))
+        viewer.scroll_bar.blockSignals(False)
+
+    samples = repeat(viewer.update_display, ctx.runs, setup=jump)
+    viewer.close_file()
+    viewer.close()
+    return samples
+
+
+def case_hexview_search(ctx):
+    from byte_search import HEX, TEXT, find_all, parse_patterns
+    from mapped_file import MappedFile
+    patterns = (parse_patterns("DE AD BE EF|7F 45 4C 46|4? 5? ?? 46", HEX)
+                + parse_patterns("version", TEXT, ignore_case=True))
+    with MappedFile(ctx.large_image) as image:
+        return repeat(lambda: find_all(image, patterns), max(3, ctx.runs // 4))
+
+
+def case_binary_diff(ctx):
+    from binary_diff import diff_ranges
+    from mapped_file import MappedFile
+    changed = os.path.join(ctx.scratch, "large_changed.bin")
+    with open(ctx.large_image, "rb") as f:
+        data = bytearray(f.read())
+    for offset in random.Random(2).sample(range(len(data)), 256):
+        data[offset] ^= 0xFF
+    with open(changed, "wb") as f:
+        f.write(data)
+    with MappedFile(ctx.large_image) as left, MappedFile(changed) as right:
+        return repeat(lambda: diff_ranges(left, right), max(3, ctx.runs // 4))
+
+
+def case_settings_import(ctx):
+    from profile_store import open_store
+    db = os.path.join(ctx.scratch, "import.db")
+
+    def reset():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db + suffix):
+                os.remove(db + suffix)
+
+    return repeat(lambda: open_store(db, ctx.settings_json).close(), max(1, ctx.runs // 4), setup=reset)
+
+
+def case_settings_load(ctx):
+    from profile_store import ProfileStore
+
+    def load():
+        store = ProfileStore(ctx.store_path)
+        names = store.names()
+        store.get(store.get_meta("last_profile") or names[-1])
+        store.close()
+
+    return repeat(load, ctx.runs)
+
+
+def case_settings_save(ctx):
+    from profile_store import ProfileStore
+    store = ProfileStore(ctx.store_path)
+    profile = store.get("Variant 00042")
+    counter = iter(range(10 ** 9))
+
+    def save():
+        profile["jlink_sn"] = str(next(counter))
+        store.put(profile)
+
+    samples = repeat(save, ctx.runs)
+    store.close()
+    return samples
+
+
+def case_prepare_flash(ctx):
+    from flash_core import prepare_flash
+    profile = make_profile(0, ctx.project, ctx.images)
+    return repeat(lambda: prepare_flash(profile, JFLASH_SIM).commands_for(profile["jlink_sn"]), ctx.runs)
+
+
+def case_fill_trim(ctx):
+    from fill_trim import trim_fill
+    padded = os.path.join(ctx.scratch, "padded.bin")
+    with open(ctx.large_image, "rb") as f:
+        data = f.read(os.path.getsize(ctx.large_image) // 4)
+    with open(padded, "wb") as f:
+        f.write(data + b"\xff" * (3 * len(data)))
+    return repeat(lambda: trim_fill([(padded, "08080000")], True, 0x2000), max(3, ctx.runs // 4))
+
+
+def case_flash_session(ctx):
+    from flash_core import prepare_flash
+    from pipeline import Pipeline
+    profile = make_profile(0, ctx.project, ctx.images)
+
+    def flash():
+        job = prepare_flash(profile, JFLASH_SIM)
+        result = Pipeline(job.steps_for(profile["jlink_sn"])).run()
+        if not result.passed:
+            raise RuntimeError(f"simulated flash failed: {[s.as_dict() for s in result.steps]}")
+
+    return repeat(flash, max(3, ctx.runs // 4))
+
+
+CASES = {
+    name[len("case_"):]: fn for name, fn in globals().items() if name.startswith("case_")
+}
+
+
+class Context:
+    def __init__(self, scratch, runs, profiles, sections, image_mb):
+        self.scratch = scratch
+        self.runs = runs
+        self.project = os.path.join(scratch, "board.jflash")
+        write_project(self.project, sections)
+
+        self.images = [os.path.join(scratch, name) for name in ("boot.bin", "app.bin", "param.bin")]
+        for path, size in zip(self.images, (32 * 1024, 512 * 1024, 8 * 1024)):
+            write_image(path, size)
+        self.large_image = os.path.join(scratch, "large.bin")
+        write_image(self.large_image, image_mb * 1024 * 1024)
+
+        self.settings_json = os.path.join(scratch, "settings.json")
+        with open(self.settings_json, "w") as f:
+            json.dump({"profiles": [make_profile(i, self.project, self.images) for i in range(profiles)]}, f, indent=4)
+        from profile_store import open_store
+        self.store_path = os.path.join(scratch, "profiles.db")
+        open_store(self.store_path, self.settings_json).close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results, baseline, tolerance):
+    """Names of cases whose median regressed by more than tolerance against baseline"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or "median" not in old or "median" not in result:
+            continue
+        if result["median"] > old["median"] * (1 + tolerance):
+            regressions.append(f"{name}: {old['median'] * 1000:.2f} ms -> {result['median'] * 1000:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", help=f"comma separated subset or prefixes of: {', '.join(CASES)}")
+    parser.add_argument("--runs", type=int, default=20, help="repetitions per case")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and smaller fixtures")
+    parser.add_argument("--profiles", type=int, default=10000, help="profiles in the settings fixture")
+    parser.add_argument("--sections", type=int, default=2000, help="sections in the project fixture")
+    parser.add_argument("--image-mb", type=int, default=64, help="size of the hex viewer image")
+    parser.add_argument("--sim-scale", type=float, default=0.01, help="JFlash simulator time scale")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.runs, args.profiles, args.sections, args.image_mb = 5, 1000, 200, 8
+
+    selected = list(CASES)
+    if args.cases:
+        wanted = [w.strip() for w in args.cases.split(",") if w.strip()]
+        selected = [name for name in CASES if any(name.startswith(w) for w in wanted)]
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["JFLASH_SIM_SCALE"] = str(args.sim_scale)
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        # Keep artifact / device / metrics files out of the user's cache
+        os.environ["JFLASH_CACHE_DIR"] = os.path.join(scratch, "cache")
+        ctx = Context(scratch, args.runs, args.profiles, args.sections, args.image_mb)
+        for name in selected:
+            try:
+                samples = CASES[name](ctx)
+            except SkipCase as e:
+                results[name] = {"skipped": str(e)}
+                print(f"{name:<26} skipped: {e}", file=sys.stderr)
+                continue
+            results[name] = {
+                "median": statistics.median(samples),
+                "min": min(samples),
+                "max": max(samples),
+                "runs": len(samples),
+                "unit": "s",
+            }
+            print(f"{name:<26} median {results[name]['median'] * 1000:9.3f} ms  "
+                  f"min {results[name]['min'] * 1000:9.3f} ms  ({len(samples)} runs)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
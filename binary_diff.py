@@ -0,0 +1,81 @@
+"""
+Differing byte ranges between two images.
+
+Both images are compared a chunk at a time with bytes equality (a
+memcmp), a differing chunk again block by block. Only blocks that differ
+are looked at closer: the two blocks are XORed as big integers and the
+runs of non-zero bytes in the result are found with a bytes regex, so no
+Python code runs per byte. Equal stretches of two 8 MB builds cost next
+to nothing.
+"""
+import re
+from bisect import bisect_right
+
+CHUNK_SIZE = 1 << 20
+BLOCK_SIZE = 4096
+NONZERO_RUN = re.compile(rb"[^\x00]+")
+
+
+def _block_ranges(a, b, offset):
+    """[start, end) ranges where the equal-length blocks a and b differ"""
+    xor = int.from_bytes(a, "big") ^ int.from_bytes(b, "big")
+    diff = xor.to_bytes(len(a), "big")
+    return [(offset + m.start(), offset + m.end()) for m in NONZERO_RUN.finditer(diff)]
+
+
+def _chunk_ranges(a, b, offset, block_size):
+    ranges = []
+    for pos in range(0, len(a), block_size):
+        block_a, block_b = a[pos:pos + block_size], b[pos:pos + block_size]
+        if block_a != block_b:
+            ranges.extend(_block_ranges(block_a, block_b, offset + pos))
+    return ranges
+
+
+def iter_diff_ranges(a, b, chunk_size=CHUNK_SIZE, block_size=BLOCK_SIZE):
+    """
+    Yield [start, end) ranges where a and b differ, in order and merged
+    across chunk boundaries. a and b are anything whose slices are bytes
+    (bytes, a MappedFile, a PieceTable). Bytes past the end of the shorter
+    one count as different.
+    """
+    common = min(len(a), len(b))
+    pending = None
+    for pos in range(0, common, chunk_size):
+        end = min(common, pos + chunk_size)
+        chunk_a, chunk_b = bytes(a[pos:end]), bytes(b[pos:end])
+        if chunk_a == chunk_b:
+            continue
+        for start, stop in _chunk_ranges(chunk_a, chunk_b, pos, block_size):
+            if pending is not None and pending[1] == start:
+                pending = (pending[0], stop)
+                continue
+            if pending is not None:
+                yield pending
+            pending = start, stop
+
+    if len(a) != len(b):
+        tail = (common, max(len(a), len(b)))
+        if pending is not None and pending[1] == common:
+            tail = (pending[0], tail[1])
+        elif pending is not None:
+            yield pending
+        pending = tail
+    if pending is not None:
+        yield pending
+
+
+def diff_ranges(a, b, chunk_size=CHUNK_SIZE, block_size=BLOCK_SIZE):
+    return list(iter_diff_ranges(a, b, chunk_size, block_size))
+
+
+def range_index(ranges, offset):
+    """Index of the range holding offset or the first one after it"""
+    i = bisect_right(ranges, (offset, float("inf"))) - 1
+    if i >= 0 and ranges[i][1] > offset:
+        return i
+    return i + 1
+
+
+def diff_summary(ranges):
+    return f"{len(ranges)} differing range(s), {sum(end - start for start, end in ranges)} bytes"
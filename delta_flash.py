@@ -0,0 +1,156 @@
+"""
+Delta flashing: remember what was last programmed into each device (keyed
+by probe serial) as one hash per flash sector, and on the next flash only
+program the sectors whose content changed.
+
+Sectors are aligned to absolute flash addresses. A changed sector is always
+programmed in full (as far as the image covers it) because JFlash erases
+whole sectors. A record is only written after the JFlash session passed and
+is dropped when it fails, so an unknown device state always falls back to a
+full flash.
+"""
+import configparser
+import hashlib
+import json
+import os
+import threading
+
+from artifact_cache import CACHE_DIR
+from flash_plan import ERASED_VALUE, shares_sector
+from parser import get_config
+
+DEFAULT_SECTOR_SIZE = 0x2000
+DEVICES_FILE = os.path.join(CACHE_DIR, "devices.json")
+_records_lock = threading.Lock()  # shared by every DeviceRecords, gang probes update concurrently
+
+
+def project_sector_size(project, override=""):
+    """Sector size from the profile override, the project's [FLASH] SectorSize, or the default"""
+    for value in (override, _project_value(project)):
+        try:
+            size = int(str(value), 0)
+        except ValueError:
+            continue
+        if size > 0:
+            return size
+    return DEFAULT_SECTOR_SIZE
+
+
+def _project_value(project):
+    try:
+        return get_config(project, "FLASH", "SectorSize").strip()
+    except (OSError, configparser.Error):
+        return ""
+
+
+def sector_hashes(binaries, sector_size):
+    """{sector address: hash} over every sector touched by the (file, 8-digit hex address) binaries"""
+    digests = {}
+    for file_path, addr in sorted(binaries, key=lambda b: int(b[1], 16)):
+        pos = int(addr, 16)
+        with open(file_path, "rb") as f:
+            while True:
+                sector = pos - pos % sector_size
+                chunk = f.read(sector + sector_size - pos)
+                if not chunk:
+                    break
+                digest = digests.setdefault(sector, hashlib.sha1())
+                digest.update((pos - sector).to_bytes(4, "big"))
+                digest.update(chunk)
+                pos += len(chunk)
+    return {f"{sector:08X}": digest.hexdigest() for sector, digest in digests.items()}
+
+
+def changed_sectors(hashes, record):
+    """Sector addresses (ints) in hashes whose content differs from the record"""
+    old = record.get("sectors", {})
+    return sorted(int(sector, 16) for sector, digest in hashes.items() if old.get(sector) != digest)
+
+
+def delta_binaries(binaries, changed, sector_size, cache, store=True):
+    """
+    Cut the changed sectors out of the binaries: one (file, address) per run of
+    consecutive changed sectors within an image, stored in the artifact cache.
+    Cuts of two images that share a sector become one part, the gap filled
+    with the erased value, since programming the second would erase the first.
+    With store=False nothing is written, the paths are where the parts would go.
+    """
+    runs = []
+    for sector in changed:
+        if runs and runs[-1][1] == sector:
+            runs[-1][1] = sector + sector_size
+        else:
+            runs.append([sector, sector + sector_size])
+
+    cuts = []  # [address, bytearray] in address order
+    for file_path, addr in sorted(binaries, key=lambda b: int(b[1], 16)):
+        start = int(addr, 16)
+        end = start + os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            for run_start, run_end in runs:
+                lo, hi = max(start, run_start), min(end, run_end)
+                if lo >= hi:
+                    continue
+                f.seek(lo - start)
+                data = f.read(hi - lo)
+                if cuts and shares_sector(cuts[-1][0] + len(cuts[-1][1]), lo, sector_size):
+                    cuts[-1][1] += ERASED_VALUE * (lo - cuts[-1][0] - len(cuts[-1][1])) + data
+                else:
+                    cuts.append([lo, bytearray(data)])
+
+    parts = []
+    for lo, data in cuts:
+        sha = hashlib.sha256(data).hexdigest()
+        if not store:
+            parts.append((cache.object_path(sha), f"{lo:08X}"))
+            continue
+        fd, tmp_path = cache.temp_file()
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        parts.append((cache.commit(tmp_path, sha), f"{lo:08X}"))
+    return parts
+
+
+class DeviceRecords:
+    """What was last flashed into each device, persisted as JSON"""
+    def __init__(self, path=DEVICES_FILE):
+        self.path = path
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, records):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, serial, project, sector_size):
+        """The record of serial if it was made with the same project and sector size, else {}"""
+        with _records_lock:
+            record = self._load().get(serial, {})
+        if record.get("project") != project or record.get("sector_size") != sector_size:
+            return {}
+        return record
+
+    def update(self, serial, project, sector_size, hashes, replace=False):
+        """Record hashes as flashed into serial, replace drops sectors not in hashes (after a chip erase)"""
+        with _records_lock:
+            records = self._load()
+            record = records.get(serial, {})
+            if replace or record.get("project") != project or record.get("sector_size") != sector_size:
+                record = {"project": project, "sector_size": sector_size, "sectors": {}}
+            record["sectors"].update(hashes)
+            records[serial] = record
+            self._save(records)
+
+    def forget(self, serial):
+        with _records_lock:
+            records = self._load()
+            if records.pop(serial, None) is not None:
+                self._save(records)
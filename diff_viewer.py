@@ -0,0 +1,257 @@
+import os
+import sys
+import time
+from PyQt6.QtWidgets import (
+    QApplication, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton,
+    QPlainTextEdit, QScrollBar, QTextEdit, QMessageBox
+)
+from PyQt6.QtGui import QShortcut, QKeySequence, QTextCharFormat, QTextCursor, QColor
+from PyQt6.QtCore import Qt, QEvent
+from theme import hex_box_style
+from mapped_file import MappedFile
+from record_image import is_segment_file
+from hexdump import ROW_BYTES, HEX_WIDTH, format_rows
+from binary_diff import diff_ranges, diff_summary, range_index
+
+HEX_COLUMN = 10  # text column of the first hex digit, after "XXXXXXXX  "
+ASCII_COLUMN = HEX_COLUMN + HEX_WIDTH + 2
+DIFF_COLOR = "#8b2f3c"
+CURRENT_DIFF_COLOR = "#c0392b"
+
+
+class DiffViewer(QWidget):
+    """
+    Two images side by side, row for row at the same offsets, with the
+    bytes that differ highlighted. The differing ranges are computed once
+    by binary_diff, scrolling only formats and highlights the viewport.
+    """
+    def __init__(self, left_path=None, right_path=None):
+        super().__init__()
+        self.setWindowTitle("Binary diff")
+        self.resize(1400, 600)
+        self.paths = [left_path, right_path]
+        self.files = [None, None]
+        self.ranges = []
+        self._diff_index = None
+        self._visible_rows = 1
+
+        self.init_ui()
+
+    def init_ui(self):
+        toolbar = QHBoxLayout()
+        self.btn_prev = QPushButton("Previous Difference")
+        self.btn_prev.clicked.connect(self.previous_difference)
+        self.btn_next = QPushButton("Next Difference")
+        self.btn_next.clicked.connect(self.next_difference)
+        self.status = QLabel("")
+        toolbar.addWidget(self.btn_prev)
+        toolbar.addWidget(self.btn_next)
+        toolbar.addWidget(self.status, 1)
+
+        panes = QHBoxLayout()
+        self.titles = [QLabel(""), QLabel("")]
+        self.boxes = []
+        for title in self.titles:
+            box = QPlainTextEdit()
+            box.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+            box.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+            box.setReadOnly(True)
+            box.setStyleSheet(hex_box_style())
+            box.installEventFilter(self)
+            box.viewport().installEventFilter(self)
+            column = QVBoxLayout()
+            column.addWidget(title)
+            column.addWidget(box)
+            panes.addLayout(column, 1)
+            self.boxes.append(box)
+
+        # One bar scrolls both images, they always show the same offsets
+        self.scroll_bar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.setStyleSheet(hex_box_style())
+        self.scroll_bar.valueChanged.connect(self.update_display)
+        panes.addWidget(self.scroll_bar)
+
+        QShortcut(QKeySequence("F8"), self, activated=self.next_difference)
+        QShortcut(QKeySequence("Shift+F8"), self, activated=self.previous_difference)
+
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(toolbar)
+        main_layout.addLayout(panes)
+        self.setLayout(main_layout)
+
+    # ---------------- File Access ----------------
+    def load_files(self, left_path=None, right_path=None):
+        """
+        Map both images and compute where they differ. Offsets are compared,
+        not addresses, so .hex / .srec and ELF images are refused.
+        """
+        self.paths = [left_path or self.paths[0], right_path or self.paths[1]]
+        for path in self.paths:
+            if is_segment_file(path):
+                raise ValueError(f"{os.path.basename(path)} carries its own addresses (Intel HEX, S-record "
+                                 f"or ELF), only raw binary images can be compared")
+        self.close_files()
+        self.files = [MappedFile(path) for path in self.paths]
+        for title, path, mapped in zip(self.titles, self.paths, self.files):
+            title.setText(f"{os.path.basename(path)}  ({len(mapped)} bytes)")
+
+        start = time.perf_counter()
+        self.ranges = diff_ranges(*self.files)
+        elapsed = time.perf_counter() - start
+        self.status.setText(f"{diff_summary(self.ranges)}, compared in {elapsed * 1000:.0f} ms"
+                            if self.ranges else f"Identical, compared in {elapsed * 1000:.0f} ms")
+        self.scroll_bar.setValue(0)
+        self.update_display()
+        if self.ranges:
+            self.next_difference()
+
+    def close_files(self):
+        self.ranges = []
+        self._diff_index = None
+        for mapped in self.files:
+            if mapped is not None:
+                mapped.close()
+        self.files = [None, None]
+
+    def closeEvent(self, event):
+        self.close_files()
+        super().closeEvent(event)
+
+    # ---------------- Navigation ----------------
+    def next_difference(self):
+        if not self.ranges:
+            return
+        if self._diff_index is None:
+            index = range_index(self.ranges, self.scroll_bar.value() * ROW_BYTES)
+        else:
+            index = self._diff_index + 1
+        self.show_difference(index % len(self.ranges))
+
+    def previous_difference(self):
+        if not self.ranges:
+            return
+        if self._diff_index is None:
+            index = range_index(self.ranges, self.scroll_bar.value() * ROW_BYTES) - 1
+        else:
+            index = self._diff_index - 1
+        self.show_difference(index % len(self.ranges))
+
+    def show_difference(self, index):
+        """Scroll range index into view, a third of a page from the top"""
+        self._diff_index = index
+        start, end = self.ranges[index]
+        first_row, last_row = start // ROW_BYTES, (end - 1) // ROW_BYTES
+        top = self.scroll_bar.value()
+        if first_row < top or last_row >= top + self._visible_rows:
+            self.scroll_bar.setValue(max(0, first_row - self._visible_rows // 3))
+        self.highlight()
+        self.status.setText(f"Difference {index + 1} of {len(self.ranges)}: {start:08X}-{end:08X} "
+                            f"({end - start} bytes) | {diff_summary(self.ranges)}")
+
+    # ---------------- Virtual Scrolling ----------------
+    def row_count(self):
+        return (max((len(f) for f in self.files if f is not None), default=0) + ROW_BYTES - 1) // ROW_BYTES
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Wheel:
+            steps = event.angleDelta().y() // 120 or (1 if event.angleDelta().y() < 0 else -1)
+            self.scroll_bar.setValue(self.scroll_bar.value() - steps * 3)
+            return True
+
+        if event.type() == QEvent.Type.KeyPress:
+            key = event.key()
+            bar = self.scroll_bar
+            if key == Qt.Key.Key_PageDown:
+                bar.setValue(bar.value() + bar.pageStep())
+            elif key == Qt.Key.Key_PageUp:
+                bar.setValue(bar.value() - bar.pageStep())
+            elif key == Qt.Key.Key_Down:
+                bar.setValue(bar.value() + 1)
+            elif key == Qt.Key.Key_Up:
+                bar.setValue(bar.value() - 1)
+            else:
+                return False
+            return True
+
+        if event.type() == QEvent.Type.Resize and obj is self.boxes[0].viewport():
+            line_height = self.boxes[0].fontMetrics().lineSpacing()
+            self._visible_rows = max(1, obj.height() // max(1, line_height))
+            self.update_display()
+
+        return False
+
+    def update_display(self):
+        """Format the rows in the viewport for both images and highlight their differences"""
+        total_rows = self.row_count()
+        page = self._visible_rows
+
+        self.scroll_bar.blockSignals(True)
+        self.scroll_bar.setRange(0, max(0, total_rows - page))
+        self.scroll_bar.setPageStep(page)
+        self.scroll_bar.blockSignals(False)
+
+        top = self.scroll_bar.value()
+        bottom = min(total_rows, top + page)
+        for box, mapped in zip(self.boxes, self.files):
+            lines = []
+            if mapped is not None:
+                hex_lines, ascii_lines = format_rows(top * ROW_BYTES, mapped[top * ROW_BYTES:bottom * ROW_BYTES])
+                lines = [f"{hex_line}  {ascii_line}" for hex_line, ascii_line in zip(hex_lines, ascii_lines)]
+            box.setPlainText("\n".join(lines))
+        self.highlight()
+
+    def highlight(self):
+        """Mark the differing bytes of the visible rows, hex and ASCII columns, in both panes"""
+        top = self.scroll_bar.value()
+        view_start = top * ROW_BYTES
+        view_end = view_start + self._visible_rows * ROW_BYTES
+        first = range_index(self.ranges, view_start)
+
+        spans = []  # (start, end, current) clipped to the viewport
+        for index in range(first, len(self.ranges)):
+            start, end = self.ranges[index]
+            if start >= view_end:
+                break
+            spans.append((max(start, view_start), min(end, view_end), index == self._diff_index))
+
+        for box in self.boxes:
+            document = box.document()
+            selections = []
+            for start, end, current in spans:
+                fmt = QTextCharFormat()
+                fmt.setBackground(QColor(CURRENT_DIFF_COLOR if current else DIFF_COLOR))
+                for row in range(start // ROW_BYTES, (end - 1) // ROW_BYTES + 1):
+                    block = document.findBlockByNumber(row - top)
+                    if not block.isValid():
+                        continue
+                    lo = max(start, row * ROW_BYTES) - row * ROW_BYTES
+                    hi = min(end, (row + 1) * ROW_BYTES) - row * ROW_BYTES
+                    line_length = block.length() - 1
+                    for col_start, col_end in ((HEX_COLUMN + lo * 3, HEX_COLUMN + hi * 3 - 1),
+                                               (ASCII_COLUMN + lo, ASCII_COLUMN + hi)):
+                        if col_start >= line_length:
+                            continue  # this image ends before the difference
+                        selection = QTextEdit.ExtraSelection()
+                        cursor = QTextCursor(block)
+                        cursor.setPosition(block.position() + col_start)
+                        cursor.setPosition(block.position() + min(col_end, line_length),
+                                           QTextCursor.MoveMode.KeepAnchor)
+                        selection.cursor = cursor
+                        selection.format = fmt
+                        selections.append(selection)
+            box.setExtraSelections(selections)
+
+
+def main():
+    app = QApplication(sys.argv)
+    viewer = DiffViewer()
+    viewer.show()
+    if len(sys.argv) > 2:
+        try:
+            viewer.load_files(sys.argv[1], sys.argv[2])
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(viewer, "Error", f"Failed to open images:\n{e}")
+    sys.exit(app.exec())
+
+if __name__ == "__main__":
+    main()
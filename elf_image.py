@@ -0,0 +1,90 @@
+"""
+ELF firmware images as segments, for flashing without an objcopy step.
+
+Only the ELF and program headers are parsed. Every PT_LOAD segment with
+file content becomes a Segment at its physical (load) address, and its
+data is a memoryview straight into the memory-mapped file, so nothing is
+copied until the bytes are written to the artifact cache or shown. The
+.bss part of a segment (memsz past filesz) is not flash content and is
+left out.
+
+The mapping stays open until the image is closed, use it as a context
+manager.
+"""
+import struct
+
+from mapped_file import MappedFile
+from record_image import ImageFormatError, Segment, SegmentImage
+
+ELF_EXTENSIONS = (".elf", ".axf", ".out")
+ELF_MAGIC = b"\x7fELF"
+PT_LOAD = 1
+
+# (ELF header after e_ident, program header) per EI_CLASS
+HEADER_FORMATS = {
+    1: ("HHIIIIIHHHHHH", "IIIIIIII"),   # ELFCLASS32
+    2: ("HHIQQQIHHHHHH", "IIQQQQQQ"),   # ELFCLASS64
+}
+
+
+def _program_headers(path, buffer):
+    """(offset, paddr, filesz) of the loadable segments with content, and the entry point"""
+    ident = bytes(buffer[:16])
+    if len(ident) < 16 or ident[:4] != ELF_MAGIC:
+        raise ImageFormatError(path, 0, "not an ELF file")
+    if ident[4] not in HEADER_FORMATS or ident[5] not in (1, 2):
+        raise ImageFormatError(path, 0, "unsupported ELF class or byte order")
+    order = "<" if ident[5] == 1 else ">"
+    header_format, phdr_format = (struct.Struct(order + f) for f in HEADER_FORMATS[ident[4]])
+
+    if len(buffer) < 16 + header_format.size:
+        raise ImageFormatError(path, 0, "truncated ELF header")
+    header = header_format.unpack_from(buffer, 16)
+    entry, phoff, phentsize, phnum = header[3], header[4], header[8], header[9]
+    if phnum and phentsize < phdr_format.size:
+        raise ImageFormatError(path, 0, "bad program header size")
+    if phoff + phnum * phentsize > len(buffer):
+        raise ImageFormatError(path, 0, "program headers past the end of the file")
+
+    loads = []
+    for i in range(phnum):
+        fields = phdr_format.unpack_from(buffer, phoff + i * phentsize)
+        if ident[4] == 1:
+            p_type, p_offset, _, p_paddr, p_filesz = fields[:5]
+        else:
+            p_type, _, p_offset, _, p_paddr, p_filesz = fields[:6]
+        if p_type != PT_LOAD or not p_filesz:
+            continue
+        if p_offset + p_filesz > len(buffer):
+            raise ImageFormatError(path, 0, f"segment {i} runs past the end of the file")
+        loads.append((p_offset, p_paddr, p_filesz))
+    return loads, entry
+
+
+def read_elf(path, stamp=None):
+    """SegmentImage of the PT_LOAD segments of path, its data viewing the mapped file"""
+    mapped = MappedFile(path)
+    buffer = mapped.buffer()
+    views = []
+
+    def close():
+        for view in views:
+            view.release()
+        buffer.release()
+        mapped.close()
+
+    try:
+        loads, entry = _program_headers(path, buffer)
+        segments = []
+        for offset, address, size in sorted(loads, key=lambda load: load[1]):
+            if segments and address < segments[-1].end:
+                raise ImageFormatError(path, 0, f"load segments overlap at {address:08X}")
+            views.append(buffer[offset:offset + size])
+            segments.append(Segment(address, views[-1]))
+    except Exception:
+        close()
+        raise
+    if not segments:
+        close()
+        raise ImageFormatError(path, 0, "no loadable segments")
+    return SegmentImage(path, segments, entry, stamp, close)
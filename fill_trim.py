@@ -0,0 +1,131 @@
+"""
+Erased-fill trimming: cut long runs of the erased value (0xFF) out of the
+images before they are programmed.
+
+After a chip erase every byte of flash already reads 0xFF, so programming
+a run of 0xFF only rewrites what is there. Each image is scanned through
+its memory mapping: mmap.find (C fast search) looks for min_run erased
+bytes in a row, an anchored regex extends the hit to the end of the run,
+and the image is split into the pieces around the runs, fill at the end
+of an image is simply dropped. Cut points are aligned to
+TRIM_ALIGN so no programming unit is ever split between two pieces, and
+no run of MAX_FILL_GAP or less is cut: the flash planner would merge the
+pieces around it again and program the fill after all.
+
+Without a chip erase JFlash erases only the sectors the data touches; a
+sector left out entirely would keep its old content, so the images are
+then passed through whole and the result says why.
+"""
+import re
+
+from artifact_cache import default_cache
+from flash_plan import MAX_FILL_GAP
+from mapped_file import MappedFile
+
+ERASED = b"\xff"
+ERASED_RUN = re.compile(rb"\xff*")
+TRIM_ALIGN = 0x100       # cut points are multiples of this, larger than any flash programming unit
+TAIL_CHUNK = 1 << 16     # bytes looked at per step when trimming trailing fill
+
+
+class TrimResult:
+    def __init__(self, binaries, skipped=0, runs=0, reason=""):
+        self.binaries = binaries  # [(file, address)] to plan and program
+        self.skipped = skipped    # erased bytes no longer programmed
+        self.runs = runs
+        self.reason = reason      # why nothing was trimmed, if it was not attempted
+
+    def as_dict(self):
+        return {"skipped": self.skipped, "runs": self.runs, "pieces": len(self.binaries), "reason": self.reason}
+
+    def describe(self):
+        if self.reason:
+            return f"Erased fill: not trimmed, {self.reason}"
+        if not self.runs:
+            return "Erased fill: no runs long enough to skip"
+        return (f"Erased fill: skipping {self.skipped} bytes in {self.runs} run(s), "
+                f"programming {len(self.binaries)} piece(s)")
+
+
+def _align_up(value, align):
+    return -(-value // align) * align
+
+
+def _align_down(value, align):
+    return value // align * align
+
+
+def _trailing_start(mapped):
+    """Offset where the trailing run of erased bytes begins (len(mapped) if there is none)"""
+    end = len(mapped)
+    while end:
+        start = max(0, end - TAIL_CHUNK)
+        kept = len(mapped[start:end].rstrip(ERASED))
+        if kept:
+            return start + kept
+        end = start
+    return 0
+
+
+def erased_runs(mapped, address, min_run, align=TRIM_ALIGN):
+    """
+    [start, end) offsets of the erased runs of an image mapped at address
+    worth skipping: at least min_run bytes once shrunk to aligned cut
+    points
+    """
+    size = len(mapped)
+    tail = _trailing_start(mapped)
+    needle = ERASED * min_run
+    buffer = mapped.buffer()
+    runs = []
+    try:
+        pos = mapped.find(needle)
+        while 0 <= pos < tail:
+            end = ERASED_RUN.match(buffer, pos).end()  # stops before tail, buffer[tail - 1] is data
+            lo = pos if pos == 0 else _align_up(address + pos, align) - address
+            hi = _align_down(address + end, align) - address
+            if hi - lo >= min_run:
+                runs.append((lo, hi))
+            pos = mapped.find(needle, end)
+    finally:
+        buffer.release()
+
+    if tail < size:
+        lo = tail if tail == 0 else _align_up(address + tail, align) - address
+        if size - lo >= min_run:
+            runs.append((lo, size))
+    return runs
+
+
+def trim_fill(binaries, chip_erase, min_run, cache=None, align=TRIM_ALIGN):
+    """
+    TrimResult for (file, 8-digit hex address) binaries: every image with
+    erased runs worth skipping is replaced by its pieces around them,
+    stored in the artifact cache; the others are passed through.
+    """
+    if not chip_erase:
+        return TrimResult(list(binaries), reason="needs Full Chip Erase (sector erase would keep skipped sectors' old data)")
+    min_run = max(min_run, MAX_FILL_GAP + 1)  # shorter gaps are filled back in by group_images
+
+    trimmed, skipped, run_count = [], 0, 0
+    for file_path, addr in binaries:
+        address = int(addr, 16)
+        with MappedFile(file_path) as mapped:
+            runs = erased_runs(mapped, address, min_run, align)
+            if not runs:
+                trimmed.append((file_path, addr))
+                continue
+            run_count += len(runs)
+            skipped += sum(hi - lo for lo, hi in runs)
+
+            buffer = mapped.buffer()
+            try:
+                pos = 0
+                for lo, hi in runs + [(len(mapped), len(mapped))]:
+                    if lo > pos:
+                        with buffer[pos:lo] as piece:
+                            trimmed.append(((cache or default_cache()).put_bytes(piece), f"{address + pos:08X}"))
+                    pos = hi
+            finally:
+                buffer.release()
+    return TrimResult(trimmed, skipped, run_count)
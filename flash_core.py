@@ -0,0 +1,325 @@
+"""
+Qt-free flashing core shared by the GUI (app.py) and the headless CLI
+(jflash_cli.py): profile validation, .trpk, .hex / .srec and ELF conversion
+and JFlash command construction. Nothing in here may import PyQt6.
+"""
+import configparser
+import os
+import re
+import shlex
+
+from address_map import check_layout, memory_map
+from artifact_cache import default_cache
+from delta_flash import (DeviceRecords, project_sector_size, sector_hashes,
+                         changed_sectors, delta_binaries)
+from jflash import find_jflash, split_serials, program_command
+from metrics import PhaseClock
+from parser import flush_configs, get_config
+from fill_trim import trim_fill
+from flash_plan import plan_flash
+from pipeline import Step, DEFAULT_STEP_TIMEOUT, PASSED
+from preflight import run_preflight
+from record_image import ImageFormatError, is_loaded, is_segment_file, load_image
+
+# (file key, address key, enabled key, label used in error messages)
+IMAGE_SLOTS = [
+    ("bootloader", "addr_bootloader", "bootloader_enabled", "Bootloader"),
+    ("image_file", "addr_image", "image_enabled", "Kernel"),
+    ("param_file", "addr_param", "param_enabled", "BootParam"),
+]
+DEFAULT_ADDRESSES = {
+    "addr_bootloader": "08000000",
+    "addr_image": "08080000",
+    "addr_param": "083FE000",
+}
+ADDRESS_PATTERN = re.compile(r"[0-9A-Fa-f]{8}")
+
+# Exit codes of the CLI, also reported in its JSON summary
+EXIT_OK = 0
+EXIT_FLASH_FAILED = 1
+EXIT_INVALID = 2
+EXIT_NO_JFLASH = 3
+
+
+class FlashError(Exception):
+    """A profile cannot be flashed, the message is shown to the operator as is"""
+    def __init__(self, message, exit_code=EXIT_INVALID):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+class FlashJob:
+    """A validated profile, ready to run"""
+    def __init__(self, jflash, project, binaries, serials, chip_erase,
+                 post_actions=(), step_timeout=DEFAULT_STEP_TIMEOUT,
+                 delta=False, sector_size=None, records=None):
+        self.jflash = jflash
+        self.project = project
+        self.binaries = binaries      # [(file, address)] after .trpk / .hex / .srec / ELF conversion
+        self.serials = serials        # [] means "whichever probe is attached"
+        self.chip_erase = chip_erase
+        self.post_actions = list(post_actions)  # shell-style command lines run after flashing
+        self.step_timeout = step_timeout
+        self.delta = delta            # program only the sectors that changed since the last flash
+        self.sector_size = sector_size or project_sector_size(project)
+        self.records = records or DeviceRecords()
+        self.plan = plan_flash(jflash, project, binaries, chip_erase, self.sector_size)
+        self._hashes = None
+        # Metrics tags, filled in by prepare_flash
+        self.profile_name = ""
+        self.swd_speed = ""
+        self.prep_times = {}          # validation / conversion seconds
+        self.preflight = []           # preflight.ImageCheck per enabled image
+        self.fill_trim = None         # fill_trim.TrimResult when erased-fill trimming was asked for
+
+    def image_sizes(self):
+        """(address, size) of every planned image"""
+        return [(f"{group[0].address:08X}", group[-1].end - group[0].address) for group in self.plan.groups]
+
+    @property
+    def hashes(self):
+        """Sector hashes of the planned images, computed once per job"""
+        if self._hashes is None:
+            self._hashes = sector_hashes(self.plan.binaries, self.sector_size)
+        return self._hashes
+
+    def delta_for(self, serial, store=True):
+        """
+        The (file, address) parts to program into serial instead of the full
+        images, or None for a full flash (delta off, chip erase, no serial or
+        no usable record of the device). store=False only names the parts.
+        """
+        if not (self.delta and serial and self.plan.binaries) or self.chip_erase:
+            return None
+        record = self.records.get(serial, self.project, self.sector_size)
+        if not record:
+            return None
+        changed = changed_sectors(self.hashes, record)
+        return delta_binaries(self.plan.binaries, changed, self.sector_size, default_cache(), store)
+
+    def commands_for(self, serial="", dry_run=False):
+        """The JFlash command lines for serial, a dry run writes no delta parts"""
+        parts = self.delta_for(serial, store=not dry_run)
+        if parts is None:
+            return self.plan.commands_for(serial)
+        return [program_command(self.jflash, self.project, serial, parts)] if parts else []
+
+    def record_result(self, serial, step, full=True):
+        """
+        Remember what a JFlash step left in the device, whether or not this
+        job flashes by delta: a passed full flash or chip erase replaces the
+        record, a passed delta adds to it, anything else forgets it.
+        """
+        if not serial:
+            return
+        if step.state == PASSED:
+            self.records.update(serial, self.project, self.sector_size, self.hashes,
+                                replace=full or self.chip_erase)
+        else:
+            self.records.forget(serial)
+
+    def steps_for(self, serial=""):
+        """Pipeline steps for one probe: the planned JFlash session(s), then post-actions"""
+        parts = self.delta_for(serial)
+        if parts is not None:
+            name = "delta program + verify"
+            commands = [program_command(self.jflash, self.project, serial, parts)] if parts else []
+        else:
+            if self.plan.binaries:
+                name = "erase + program + verify" if self.chip_erase else "program + verify"
+            else:
+                name = "erase"
+            commands = self.plan.commands_for(serial)
+        steps = [
+            Step(name, cmd, self.step_timeout,
+                 on_done=lambda step: self.record_result(serial, step, full=parts is None))
+            for cmd in commands
+        ]
+        for action in self.post_actions:
+            argv = shlex.split(action.replace("{serial}", serial), posix=os.name != "nt")
+            if not argv:
+                continue
+            steps.append(Step(f"post: {argv[0]}", argv, self.step_timeout, phase="post"))
+        return steps
+
+
+def enabled_binaries(profile):
+    """(file, address) for every enabled image slot of a profile"""
+    return [
+        (profile.get(file_key, "").strip(), profile.get(addr_key, DEFAULT_ADDRESSES[addr_key]).strip())
+        for file_key, addr_key, enabled_key, _ in IMAGE_SLOTS
+        if profile.get(enabled_key, False)
+    ]
+
+
+def enabled_images(profile):
+    """(label, file, address) for every enabled image slot of a profile, addresses as ints"""
+    return [
+        (label, profile.get(file_key, "").strip(), int(profile.get(addr_key, DEFAULT_ADDRESSES[addr_key]).strip(), 16))
+        for file_key, addr_key, enabled_key, label in IMAGE_SLOTS
+        if profile.get(enabled_key, False)
+    ]
+
+
+def image_extents(label, path, address, size, parse=True):
+    """
+    (label, start, size) of the flash an image covers: one extent at the
+    typed address for a binary, one per segment at the file's own
+    addresses for a .hex / .srec or ELF image (ImageFormatError if it is
+    corrupt). With parse=False a .hex / .srec file that is not parsed yet
+    gives None instead, for callers on the GUI thread.
+    """
+    if not is_segment_file(path):
+        return [(label, address, size)]
+    if not parse and not is_loaded(path):
+        return None
+    with load_image(path) as image:
+        segments = [(segment.address, len(segment.data)) for segment in image.segments]
+    if len(segments) == 1:
+        return [(label, *segments[0])]
+    return [(f"{label} [{i + 1}]", start, length) for i, (start, length) in enumerate(segments)]
+
+
+def check_images(profile):
+    """
+    Pre-flight the enabled images (readability, hashes) and check their
+    layout against each other and the flash; FlashError listing every problem.
+    """
+    checks = run_preflight(enabled_images(profile))
+    problems = [f"{check.label}: {check.error}" for check in checks if not check.ok]
+    extents = []
+    for check in checks:
+        if not check.ok:
+            continue
+        try:
+            image_extent = image_extents(check.label, check.path, check.address, check.size)
+        except ImageFormatError as e:
+            problems.append(f"{check.label}: {e}")
+            continue
+        check.address = image_extent[0][1]  # the file's own address for .hex / .srec / ELF
+        extents += image_extent
+    layout = check_layout(extents, memory_map(profile.get("project_file", "").strip(), profile))
+    problems += [str(issue) for issue in layout if issue.is_error]
+    if problems:
+        raise FlashError("Pre-flight check failed:\n" + "\n".join(problems))
+    return checks
+
+
+def validate_profile(profile, jflash=None):
+    """Raise FlashError for the first problem that would stop a flash, in the order the GUI checks them"""
+    if jflash is None:
+        raise FlashError(
+            "JFlash.exe not found in PATH.\nPlease add JFlash.exe to system PATH.",
+            EXIT_NO_JFLASH
+        )
+
+    if not os.path.exists(profile.get("project_file", "").strip()):
+        raise FlashError("Project file path is invalid.")
+
+    binaries = enabled_binaries(profile)
+    if not binaries and not profile.get("chip_erase", False):
+        raise FlashError("No binaries selected to flash.")
+
+    for file_path, _ in binaries:
+        if not os.path.exists(file_path):
+            raise FlashError(f"Binary file not found:\n{file_path}")
+
+    for _, addr_key, _, label in IMAGE_SLOTS:
+        addr = profile.get(addr_key, DEFAULT_ADDRESSES[addr_key]).strip()
+        if not ADDRESS_PATTERN.fullmatch(addr):
+            raise FlashError(f"{label} address is invalid.\nMust be 8-digit hex.")
+
+
+def convert_trpk(binaries, cache=None):
+    """
+    .trpk images are flashed as .bin. The .bin is the artifact cache entry
+    for the .trpk's content, so a rebuilt .trpk can never flash a stale copy
+    and identical images share one artifact.
+    """
+    converted = []
+    for bin_file, addr in binaries:
+        if bin_file.endswith(".trpk"):
+            bin_file = (cache or default_cache()).put_file(bin_file)
+        converted.append((bin_file, addr))
+    return converted
+
+
+def convert_segment_files(binaries, cache=None):
+    """
+    .hex / .srec and ELF images are flashed as one .bin per segment, at
+    the addresses in the file, so no objcopy step is needed and gaps are
+    only filled in where the planner merges segments sharing a sector. The planner, delta flashing and fill trimming all work
+    on flat images, so the segments are copied out once: like .trpk
+    conversions the .bin files are artifact cache entries, and a file whose
+    size and mtime did not change reuses them without being read again.
+    """
+    converted = []
+    for bin_file, addr in binaries:
+        if not is_segment_file(bin_file):
+            converted.append((bin_file, addr))
+            continue
+        cache = cache or default_cache()
+        parts = cache.cached_segments(bin_file)
+        if parts is None:
+            try:
+                with load_image(bin_file) as image:
+                    parts = cache.put_segments(
+                        bin_file, image.stamp, [(segment.address, segment.data) for segment in image.segments]
+                    )
+            except ImageFormatError as e:
+                raise FlashError(str(e))
+        converted += [(path, f"{address:08X}") for path, address in parts]
+    return converted
+
+
+def project_speed(project):
+    """SWD speed (kHz) the project is set to, for tagging metrics"""
+    try:
+        return get_config(project, "JTAG", "Speed1").strip()
+    except (OSError, configparser.Error):
+        return ""
+
+
+def prepare_flash(profile, jflash=None):
+    """
+    Validate and pre-flight a profile dict (as stored in the profile store)
+    and turn it into a FlashJob. This reads every image once, so the GUI
+    calls it off its thread.
+    """
+    clock = PhaseClock()
+    jflash = jflash or find_jflash()
+    with clock.timed("validation"):
+        validate_profile(profile, jflash)
+        checks = check_images(profile)
+    try:
+        flush_configs()  # JFlash must see project edits still held by the write-behind writer
+    except (OSError, ValueError) as e:
+        raise FlashError(f"Could not save the project edits:\n{e}")
+
+    project = profile["project_file"].strip()
+    chip_erase = profile.get("chip_erase", False)
+    sector_size = project_sector_size(project, profile.get("sector_size", ""))
+    with clock.timed("conversion"):
+        binaries = convert_trpk(convert_segment_files(enabled_binaries(profile)))
+        fill = None
+        if profile.get("trim_fill", False):
+            # Erased runs of a sector and more than the planner's fill gap are left to the chip erase
+            fill = trim_fill(binaries, chip_erase, sector_size)
+            binaries = fill.binaries
+        job = FlashJob(
+            jflash,
+            project,
+            binaries,
+            split_serials(profile.get("jlink_sn", "")),
+            chip_erase,
+            profile.get("post_actions", []),
+            float(profile.get("step_timeout", DEFAULT_STEP_TIMEOUT)),
+            profile.get("delta_flash", False),
+            sector_size
+        )
+    job.fill_trim = fill
+    job.profile_name = profile.get("name", "")
+    job.swd_speed = project_speed(project)
+    job.prep_times = clock.durations
+    job.preflight = checks
+    return job
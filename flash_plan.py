@@ -0,0 +1,153 @@
+"""
+Flash planner: turns the enabled images of a job into as few JFlash
+sessions and -auto cycles as possible.
+
+- A chip erase is folded into the programming session (-erasechip before
+  the first -open) instead of running as its own JFlash process.
+- Images that are back to back in flash are concatenated into one merged
+  binary and programmed with a single -auto. When the chip is erased first,
+  small gaps between images are filled with the erased value, which leaves
+  the target byte-identical.
+- Images that share a flash sector are always merged, chip erase or not:
+  programming the second one would erase the sector and lose the first.
+  The gap between them reads as erased either way.
+"""
+import hashlib
+import os
+
+from artifact_cache import default_cache
+from jflash import erase_command, program_command
+
+SESSION_COST = 2.5      # seconds per JFlash process: probe connect, target init, project load
+AUTO_COST = 0.4         # seconds of fixed overhead per -auto cycle
+MAX_FILL_GAP = 0x1000   # largest gap filled with ERASED_VALUE when merging after a chip erase
+ERASED_VALUE = b"\xff"
+
+
+class ImageSpan:
+    def __init__(self, path, address):
+        self.path = path
+        self.address = address
+        self.size = os.path.getsize(path)
+
+    @property
+    def end(self):
+        return self.address + self.size
+
+
+class FlashPlan:
+    def __init__(self, jflash, project, chip_erase, groups, image_count):
+        self.jflash = jflash
+        self.project = project
+        self.chip_erase = chip_erase
+        self.groups = groups            # [[ImageSpan, ...]] programmed as one -auto each
+        self.binaries = []              # [(file, address)] actually passed to JFlash
+        self.image_count = image_count
+
+    # ---------------- Cost model ----------------
+    @property
+    def baseline_sessions(self):
+        """One process for the erase plus one for the images, as run_flash used to do"""
+        return int(self.chip_erase) + int(self.image_count > 0)
+
+    @property
+    def baseline_autos(self):
+        return int(self.chip_erase) + self.image_count
+
+    @property
+    def sessions(self):
+        return 1 if self.chip_erase or self.binaries else 0
+
+    @property
+    def autos(self):
+        return len(self.binaries) or int(self.chip_erase)
+
+    @property
+    def predicted_savings(self):
+        return ((self.baseline_sessions - self.sessions) * SESSION_COST
+                + (self.baseline_autos - self.autos) * AUTO_COST)
+
+    def commands_for(self, serial=""):
+        if not self.binaries:
+            return [erase_command(self.jflash, self.project, serial)] if self.chip_erase else []
+        return [program_command(self.jflash, self.project, serial, self.binaries, self.chip_erase)]
+
+    def as_dict(self):
+        return {
+            "chip_erase": self.chip_erase,
+            "binaries": self.binaries,
+            "sessions": self.sessions,
+            "autos": self.autos,
+            "baseline_sessions": self.baseline_sessions,
+            "baseline_autos": self.baseline_autos,
+            "predicted_savings": self.predicted_savings,
+        }
+
+    def describe(self):
+        lines = ["Flash plan:"]
+        if self.chip_erase:
+            lines.append("  chip erase (same session)")
+        for group, (file_path, addr) in zip(self.groups, self.binaries):
+            end = group[-1].end
+            if len(group) == 1:
+                lines.append(f"  {addr}-{end:08X}  {os.path.basename(file_path)}")
+            else:
+                names = " + ".join(os.path.basename(span.path) for span in group)
+                lines.append(f"  {addr}-{end:08X}  merged: {names}")
+        lines.append(
+            f"  {self.sessions} JFlash session(s), {self.autos} -auto cycle(s) "
+            f"(was {self.baseline_sessions} / {self.baseline_autos}), "
+            f"predicted saving ~{self.predicted_savings:.1f} s per board"
+        )
+        return "\n".join(lines)
+
+
+def shares_sector(end, address, sector_size):
+    """Whether data starting at address lands in the sector holding the byte before end"""
+    return bool(sector_size) and address >= end and address // sector_size == (end - 1) // sector_size
+
+
+def group_images(spans, chip_erase, sector_size=0):
+    """Split address-sorted spans into runs that can be programmed as one image"""
+    max_gap = MAX_FILL_GAP if chip_erase else 0
+    groups = []
+    for span in sorted(spans, key=lambda s: s.address):
+        if groups and (0 <= span.address - groups[-1][-1].end <= max_gap
+                       or shares_sector(groups[-1][-1].end, span.address, sector_size)):
+            groups[-1].append(span)
+        else:
+            groups.append([span])
+    return groups
+
+
+def write_merged(group, cache=None, chunk_size=1 << 20):
+    """Concatenate a group into one binary, stored in the artifact cache under its content hash"""
+    cache = cache or default_cache()
+    digest = hashlib.sha256()
+    fd, tmp_path = cache.temp_file()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            pos = group[0].address
+            for span in group:
+                fill = ERASED_VALUE * (span.address - pos)
+                out.write(fill)
+                digest.update(fill)
+                with open(span.path, "rb") as f:
+                    while chunk := f.read(chunk_size):
+                        out.write(chunk)
+                        digest.update(chunk)
+                pos = span.end
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return cache.commit(tmp_path, digest.hexdigest())
+
+
+def plan_flash(jflash, project, binaries, chip_erase, sector_size=0):
+    """Build a FlashPlan for (file, 8-digit hex address) binaries"""
+    spans = [ImageSpan(path, int(addr, 16)) for path, addr in binaries]
+    plan = FlashPlan(jflash, project, chip_erase, group_images(spans, chip_erase, sector_size), len(spans))
+    for group in plan.groups:
+        path = group[0].path if len(group) == 1 else write_merged(group)
+        plan.binaries.append((path, f"{group[0].address:08X}"))
+    return plan
@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import Pipeline, PASSED
+
+MAX_GANG_WORKERS = 8  # concurrent JFlash processes, one per probe
+
+
+class ProbeResult:
+    """Status and timing of one probe in a gang run"""
+    def __init__(self, serial):
+        self.serial = serial
+        self.status = "pending"   # pending, running, passed or failed
+        self.returncode = None
+        self.elapsed = None
+        self.error = ""
+        self.phases = {}
+
+    def as_dict(self):
+        return {
+            "serial": self.serial,
+            "status": self.status,
+            "returncode": self.returncode,
+            "elapsed": self.elapsed,
+            "error": self.error,
+            "phases": self.phases,
+        }
+
+
+class GangResult:
+    def __init__(self, probes, elapsed):
+        self.probes = probes
+        self.elapsed = elapsed
+
+    @property
+    def passed(self):
+        return all(p.status == "passed" for p in self.probes)
+
+    def summary(self):
+        ok = sum(p.status == "passed" for p in self.probes)
+        return f"{ok}/{len(self.probes)} probes passed in {self.elapsed:.2f} seconds"
+
+    def as_dict(self):
+        return {
+            "passed": self.passed,
+            "elapsed": self.elapsed,
+            "probes": [p.as_dict() for p in self.probes],
+        }
+
+
+def run_gang(serials, steps_for, max_workers=MAX_GANG_WORKERS,
+             on_lines=None, on_update=None, cancel_event=None):
+    """
+    Flash every probe in serials concurrently on a bounded thread pool.
+
+    steps_for(serial) returns the pipeline Steps to run for that probe; a
+    probe stops at its first step that does not pass.
+    on_lines(serial, lines) receives batched output and on_update(result)
+    is called whenever a ProbeResult changes state. Both are called from
+    pool threads. Setting cancel_event kills running probes and skips the
+    ones that have not started.
+    """
+    probes = [ProbeResult(sn) for sn in serials]
+    cancel_event = cancel_event or threading.Event()
+    lock = threading.Lock()
+
+    def update(probe, **changes):
+        with lock:
+            for key, value in changes.items():
+                setattr(probe, key, value)
+        if on_update is not None:
+            on_update(probe)
+
+    def flash_probe(probe):
+        if cancel_event.is_set():
+            update(probe, status="failed", error="cancelled")
+            return
+        update(probe, status="running")
+        pipeline = Pipeline(
+            steps_for(probe.serial),
+            on_lines=(lambda lines: on_lines(probe.serial, lines)) if on_lines else None,
+            cancel_event=cancel_event
+        )
+        result = pipeline.run()
+        failed = next((step for step in result.steps if step.state != PASSED), None)
+        update(
+            probe,
+            status="passed" if failed is None else "failed",
+            returncode=failed.returncode if failed else 0,
+            error=f"{failed.name}: {failed.state} {failed.error}".strip() if failed else "",
+            elapsed=result.elapsed,
+            phases=result.phases
+        )
+
+    start = time.monotonic()
+    workers = max(1, min(max_workers, len(probes)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gang") as pool:
+        list(pool.map(flash_probe, probes))
+    return GangResult(probes, time.monotonic() - start)
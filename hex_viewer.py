@@ -1,90 +1,522 @@
 import sys
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QHBoxLayout,
-    QPlainTextEdit, QMessageBox
+    QApplication, QWidget, QHBoxLayout, QVBoxLayout, QLineEdit, QComboBox, QCheckBox, QLabel,
+    QPushButton, QPlainTextEdit, QMessageBox, QScrollBar, QFileDialog
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QShortcut, QKeySequence, QTextCursor
+from PyQt6.QtCore import Qt, QEvent, QThread, pyqtSignal
 from theme import hex_box_style
+from mapped_file import MappedFile
+from hexdump import ROW_BYTES, format_rows, export_dump
+from piece_table import PieceTable, patch_file, rewrite_file, recover_journal
+from byte_search import HEX, TEXT, MAX_MATCHES, SearchError, parse_patterns, iter_matches
+from record_image import is_segment_file, load_image
+
+ROW_CACHE_SIZE = 4096  # formatted rows kept around the viewport
+HEX_COLUMN = 10  # text column of the first hex digit, after "XXXXXXXX  "
+
+
+class SearchWorker(QThread):
+    """Scans the image for patterns off the GUI thread, matches arrive a chunk at a time"""
+    found = pyqtSignal(list)       # [(offset, length, pattern index)]
+    done = pyqtSignal(int, bool)   # matches, stopped early (cancelled or MAX_MATCHES)
+
+    def __init__(self, data, patterns):
+        super().__init__()
+        self.data = data
+        self.patterns = patterns
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        count = 0
+        for found in iter_matches(self.data, self.patterns, cancelled=lambda: self._cancelled):
+            found = found[:MAX_MATCHES - count]
+            count += len(found)
+            self.found.emit(found)
+            if count >= MAX_MATCHES:
+                self.done.emit(count, True)
+                return
+        self.done.emit(count, self._cancelled)
+
 
 class Hexviewer(QWidget):
+    """
+    Virtualized hex viewer. The file is memory-mapped and only the rows in
+    the viewport (plus a page of look-ahead either side) are ever formatted.
+    Typed hex digits overwrite bytes through a PieceTable, so edits, undo and
+    saving never touch more of the file than was actually changed.
+    """
     def __init__(self, file_path=None):
         super().__init__()
-        self.setWindowTitle("Hex viewer")
+        self.setWindowTitle("Hex viewer[*]")
         self.resize(900, 600)
         self.file_path = file_path
-        self.data = bytearray()
+        self.data = b""
+        self.base_address = 0  # address of data[0], from the file for .hex / .srec / ELF images
+        self._image = None     # record_image.SegmentImage of such an image
+        self._mapped = None
+        self.table = None
+        self._row_cache = OrderedDict()
+        self._visible_rows = 1
+        self._search = None
+        self._search_key = None
+        self._match_offsets = []
+        self._matches = []
+        self._match_index = None
 
         self.init_ui()
 
     def init_ui(self):
 
+        # ---------------- Search Bar ----------------
+        search_layout = QHBoxLayout()
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Find: DE AD ?? EF, 4? masks a nibble, | separates patterns")
+        self.search_box.returnPressed.connect(self.find_next)
+        self.search_mode = QComboBox()
+        self.search_mode.addItem("Hex", HEX)
+        self.search_mode.addItem("Text", TEXT)
+        self.match_case = QCheckBox("Match case")
+        self.match_case.setChecked(True)
+        self.btn_prev = QPushButton("Previous")
+        self.btn_prev.clicked.connect(self.find_previous)
+        self.btn_next = QPushButton("Next")
+        self.btn_next.clicked.connect(self.find_next)
+        self.search_status = QLabel("")
+
+        search_layout.addWidget(self.search_box, 1)
+        search_layout.addWidget(self.search_mode)
+        search_layout.addWidget(self.match_case)
+        search_layout.addWidget(self.btn_prev)
+        search_layout.addWidget(self.btn_next)
+        search_layout.addWidget(self.search_status)
+
         viewer_layout = QHBoxLayout()
 
         # ---------------- Hex Display ----------------
         self.hex_box = QPlainTextEdit()
         self.hex_box.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
-        self.hex_box.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.hex_box.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.hex_box.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
         self.hex_box.setReadOnly(True)
+        # Keep a keyboard caret, digits typed at it are applied in eventFilter
+        self.hex_box.setTextInteractionFlags(
+            Qt.TextInteractionFlag.TextSelectableByMouse | Qt.TextInteractionFlag.TextSelectableByKeyboard
+        )
 
         # ASCII display
         self.ascii_box = QPlainTextEdit()
         self.ascii_box.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.ascii_box.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.ascii_box.setReadOnly(True)
 
+        # Both boxes only ever hold one screen of rows, this bar scrolls the file
+        self.scroll_bar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.valueChanged.connect(self.update_display)
+
         viewer_layout.addWidget(self.hex_box, 3)
         viewer_layout.addWidget(self.ascii_box, 1)
+        viewer_layout.addWidget(self.scroll_bar)
 
         # Style for dark theme and visible scrollbar handle
         self.hex_box.setStyleSheet(hex_box_style())
         self.ascii_box.setStyleSheet(hex_box_style())
+        self.scroll_bar.setStyleSheet(hex_box_style())
 
-        # Disable vertical scrollbar on ASCII box
-        self.ascii_box.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        # Route wheel, key and resize events into the virtual scroll position
+        for box in (self.hex_box, self.ascii_box):
+            box.installEventFilter(self)
+            box.viewport().installEventFilter(self)
 
-        # Sync ASCII box scroll with hex box
-        self.hex_box.verticalScrollBar().valueChanged.connect(
-            lambda value: self.ascii_box.verticalScrollBar().setValue(value)
-        )
+        # Whole-file dump for printing / attaching to reports
+        QShortcut(QKeySequence("Ctrl+E"), self, activated=self.export_file)
+        QShortcut(QKeySequence("Ctrl+S"), self, activated=self.save_file)
+        QShortcut(QKeySequence("Ctrl+Z"), self, activated=self.undo)
+        QShortcut(QKeySequence("Ctrl+Y"), self, activated=self.redo)
+        QShortcut(QKeySequence("Ctrl+Shift+Z"), self, activated=self.redo)
+        QShortcut(QKeySequence("Ctrl+D"), self, activated=self.compare_file)
+        QShortcut(QKeySequence("Ctrl+F"), self, activated=self.focus_search)
+        QShortcut(QKeySequence("F3"), self, activated=self.find_next)
+        QShortcut(QKeySequence("Shift+F3"), self, activated=self.find_previous)
+
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(search_layout)
+        main_layout.addLayout(viewer_layout)
+        self.setLayout(main_layout)
+
+    # ---------------- File Access ----------------
+    def load_file(self, file_path=None):
+        """
+        Memory-map file_path (or self.file_path) and show its first page.
+        .hex / .srec and ELF images are shown read-only at their own
+        addresses, with the gaps between segments as FF.
+        """
+        if file_path:
+            self.file_path = file_path
+        self.close_file()
+        if is_segment_file(self.file_path):
+            self._image = load_image(self.file_path)
+            self.data = self._image.flat()
+            self.base_address = self._image.start
+            self.setWindowModified(False)
+            self.scroll_bar.setValue(0)
+            self.update_display()
+            return
+        recover_journal(self.file_path)  # finish a save that was interrupted
+        self._mapped = MappedFile(self.file_path)
+        self.table = PieceTable(self._mapped)
+        self.data = self.table
+        self.setWindowModified(False)
+        self.scroll_bar.setValue(0)
+        self.update_display()
 
-        self.setLayout(viewer_layout)
+    def close_file(self):
+        self.cancel_search()
+        self._clear_matches()
+        self._row_cache.clear()
+        self.data = b""
+        self.base_address = 0
+        self.table = None
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
 
+    def closeEvent(self, event):
+        self.close_file()
+        super().closeEvent(event)
 
     def save_file(self):
-        hex_text = self.hex_box.toPlainText().replace(" ", "").replace("\n", "")
-        if not self.file_path:
+        """
+        Write edits back to disk. Overwrite-only edits patch just the dirty
+        ranges in place, anything that changed the length is rewritten to a
+        temp file and renamed over the original.
+        """
+        if not self.file_path or self.table is None or not self.table.is_modified():
             return
+        self.cancel_search()  # a rewrite replaces the mapping it reads from
         try:
-            self.data = bytearray.fromhex(hex_text)
-            with open(self.file_path, "wb") as f:
-                f.write(self.data)
+            if self.table.in_place():
+                patch_file(self.file_path, self.table.dirty_ranges())
+            else:
+                try:
+                    rewrite_file(self.file_path, self.table, before_replace=self._mapped.close)
+                finally:
+                    if self._mapped.closed:
+                        self._mapped = MappedFile(self.file_path)
+                        self.table.original = self._mapped
+            self.table.commit(self._mapped)
+            self.setWindowModified(False)
+            self._row_cache.clear()
+            self.update_display()
             QMessageBox.information(self, "Saved", "File saved successfully!")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save file:\n{e}")
 
+    def export_file(self):
+        if not len(self.data):
+            return
+        out_path, _ = QFileDialog.getSaveFileName(self, "Export Hex Dump", f"{self.file_path}.txt", "Text (*.txt)")
+        if not out_path:
+            return
+        try:
+            export_dump(self.data, out_path, self.base_address)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export dump:\n{e}")
+
+    def compare_file(self):
+        """Open a side-by-side diff of this image against another one"""
+        if not self.file_path:
+            return
+        if is_segment_file(self.file_path):
+            QMessageBox.information(self, "Compare", "Only raw binary images can be compared, "
+                                    "this file carries its own addresses.")
+            return
+        other, _ = QFileDialog.getOpenFileName(self, "Compare With", self.file_path, "Binary (*.bin);;All Files (*)")
+        if not other:
+            return
+        from diff_viewer import DiffViewer
+        self.diff_viewer = DiffViewer(self.file_path, other)  # store as attribute to keep it alive
+        self.diff_viewer.show()
+        try:
+            self.diff_viewer.load_files()
+        except (OSError, ValueError) as e:
+            self.diff_viewer.close()
+            QMessageBox.critical(self, "Error", f"Failed to compare files:\n{e}")
+
+    # ---------------- Editing ----------------
+    def undo(self):
+        if self.table is not None and self.table.undo():
+            self._after_edit()
+
+    def redo(self):
+        if self.table is not None and self.table.redo():
+            self._after_edit()
+
+    def _after_edit(self):
+        self._search_key = None  # matches may be stale, the next search starts over
+        self.setWindowModified(self.table.is_modified())
+        self._row_cache.clear()
+        self.update_display()
+
+    def _type_nibble(self, digit):
+        """Overwrite the nibble under the hex caret with digit and advance the caret"""
+        cursor = self.hex_box.textCursor()
+        block = cursor.blockNumber()
+        index, nibble = divmod(max(0, cursor.positionInBlock() - HEX_COLUMN), 3)
+        if nibble == 2:  # caret on the space between two bytes
+            index, nibble = index + 1, 0
+        offset = (self.scroll_bar.value() + block) * ROW_BYTES + index
+        if index >= ROW_BYTES or offset >= len(self.table):
+            return
+
+        old = self.table[offset]
+        value = int(digit, 16)
+        new = (value << 4) | (old & 0x0F) if nibble == 0 else (old & 0xF0) | value
+        self.cancel_search()
+        self._search_key = None
+        self.table.overwrite(offset, bytes([new]))
+        self.setWindowModified(True)
+        self._row_cache.pop(offset // ROW_BYTES, None)
+        self.update_display()
+
+        if nibble == 0:
+            column = HEX_COLUMN + index * 3 + 1
+        elif index + 1 < ROW_BYTES:
+            column = HEX_COLUMN + (index + 1) * 3
+        else:
+            column = HEX_COLUMN
+            if block + 1 < self.hex_box.blockCount():
+                block += 1
+            else:
+                self.scroll_bar.setValue(self.scroll_bar.value() + 1)
+        self._set_caret(block, column)
+
+    def _set_caret(self, block, column):
+        text_block = self.hex_box.document().findBlockByNumber(block)
+        if not text_block.isValid():
+            return
+        cursor = self.hex_box.textCursor()
+        cursor.setPosition(text_block.position() + min(column, text_block.length() - 1))
+        self.hex_box.setTextCursor(cursor)
+
+    # ---------------- Search ----------------
+    def focus_search(self):
+        self.search_box.setFocus()
+        self.search_box.selectAll()
+
+    def start_search(self):
+        """Search the image for the patterns in the search box, replacing the previous results"""
+        self.cancel_search()
+        self._clear_matches()
+        if not len(self.data):
+            return False
+        mode = self.search_mode.currentData()
+        try:
+            patterns = parse_patterns(self.search_box.text(), mode, ignore_case=not self.match_case.isChecked())
+        except SearchError as e:
+            self.search_status.setText(str(e))
+            return False
+
+        self._search_key = (self.search_box.text(), mode, self.match_case.isChecked())
+        self._search = SearchWorker(self.data, patterns)
+        self._search.found.connect(self._on_found)
+        self._search.done.connect(self._on_search_done)
+        self.search_status.setText("Searching...")
+        self._search.start()
+        return True
+
+    def cancel_search(self):
+        if self._search is not None:
+            self._search.cancel()
+            self._search.wait()
+            self._search = None
+
+    def _clear_matches(self):
+        self._matches = []
+        self._match_offsets = []
+        self._match_index = None
+        self._search_key = None
+
+    def _on_found(self, found):
+        if self.sender() is not self._search:
+            return  # results of a search that was replaced
+        self._matches.extend(found)
+        self._match_offsets.extend(offset for offset, _, _ in found)
+        if self._match_index is None:
+            # First results: show the first match from the viewport on
+            index = bisect_left(self._match_offsets, self.scroll_bar.value() * ROW_BYTES)
+            if index < len(self._matches):
+                self._show_match(index)
+        self._update_search_status(searching=True)
+
+    def _on_search_done(self, count, stopped):
+        if self.sender() is not self._search:
+            return
+        self._search.wait()  # run() returns right after emitting done
+        self._search = None
+        if not count:
+            self.search_status.setText("Not found")
+            return
+        if self._match_index is None:  # every match is above the viewport, wrap to the first
+            self._show_match(0)
+        self._update_search_status(truncated=stopped)
+
+    def _update_search_status(self, searching=False, truncated=False):
+        total = f"{len(self._matches)}{'+' if truncated or searching else ''}"
+        current = "-" if self._match_index is None else self._match_index + 1
+        self.search_status.setText(f"{current} of {total}{' ...' if searching else ''}")
+
+    def _search_changed(self):
+        return self._search_key != (self.search_box.text(), self.search_mode.currentData(),
+                                    self.match_case.isChecked())
+
+    def find_next(self):
+        if self._search_changed():
+            self.start_search()
+            return
+        if not self._matches:
+            return
+        if self._match_index is None:
+            index = bisect_left(self._match_offsets, self.scroll_bar.value() * ROW_BYTES)
+        else:
+            index = self._match_index + 1
+        self._show_match(index % len(self._matches))
+        self._update_search_status(searching=self._search is not None)
+
+    def find_previous(self):
+        if self._search_changed():
+            self.start_search()
+            return
+        if not self._matches:
+            return
+        if self._match_index is None:
+            index = bisect_right(self._match_offsets, self.scroll_bar.value() * ROW_BYTES) - 1
+        else:
+            index = self._match_index - 1
+        self._show_match(index % len(self._matches))
+        self._update_search_status(searching=self._search is not None)
+
+    def _show_match(self, index):
+        """Scroll match index into view, a third of a page from the top, and select it"""
+        self._match_index = index
+        offset, length, _ = self._matches[index]
+        first_row, last_row = offset // ROW_BYTES, (offset + length - 1) // ROW_BYTES
+        top = self.scroll_bar.value()
+        if first_row < top or last_row >= top + self._visible_rows:
+            top = max(0, first_row - self._visible_rows // 3)
+            self.scroll_bar.setValue(top)
+            top = self.scroll_bar.value()
+
+        block = self.hex_box.document().findBlockByNumber(first_row - top)
+        end_block = self.hex_box.document().findBlockByNumber(last_row - top)
+        if not block.isValid() or not end_block.isValid():
+            return
+        cursor = self.hex_box.textCursor()
+        cursor.setPosition(block.position() + HEX_COLUMN + offset % ROW_BYTES * 3)
+        cursor.setPosition(end_block.position() + HEX_COLUMN + (offset + length - 1) % ROW_BYTES * 3 + 2,
+                           QTextCursor.MoveMode.KeepAnchor)
+        self.hex_box.setTextCursor(cursor)
+
+    # ---------------- Virtual Scrolling ----------------
+    def row_count(self):
+        return (len(self.data) + ROW_BYTES - 1) // ROW_BYTES
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Wheel:
+            steps = event.angleDelta().y() // 120 or (1 if event.angleDelta().y() < 0 else -1)
+            self.scroll_bar.setValue(self.scroll_bar.value() - steps * 3)
+            return True
+
+        if event.type() == QEvent.Type.KeyPress:
+            key = event.key()
+            bar = self.scroll_bar
+            if key == Qt.Key.Key_PageDown:
+                bar.setValue(bar.value() + bar.pageStep())
+            elif key == Qt.Key.Key_PageUp:
+                bar.setValue(bar.value() - bar.pageStep())
+            elif key == Qt.Key.Key_Down and obj.textCursor().blockNumber() == obj.blockCount() - 1:
+                bar.setValue(bar.value() + 1)
+            elif key == Qt.Key.Key_Up and obj.textCursor().blockNumber() == 0:
+                bar.setValue(bar.value() - 1)
+            elif key == Qt.Key.Key_Home and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+                bar.setValue(bar.minimum())
+            elif key == Qt.Key.Key_End and event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+                bar.setValue(bar.maximum())
+            elif (obj is self.hex_box and self.table is not None and len(event.text()) == 1
+                  and event.text() in "0123456789abcdefABCDEF"
+                  and not event.modifiers() & Qt.KeyboardModifier.ControlModifier):
+                self._type_nibble(event.text())
+            else:
+                return False
+            return True
+
+        if event.type() == QEvent.Type.Resize and obj is self.hex_box.viewport():
+            line_height = self.hex_box.fontMetrics().lineSpacing()
+            self._visible_rows = max(1, obj.height() // max(1, line_height))
+            self.update_display()
+
+        return False
+
+    def _rows(self, first, last):
+        """Formatted (hex, ascii) pairs for rows [first, last), served from the cache"""
+        missing = [r for r in range(first, last) if r not in self._row_cache]
+        if missing:
+            lo, hi = missing[0], missing[-1] + 1
+            hex_lines, ascii_lines = format_rows(self.base_address + lo * ROW_BYTES,
+                                                 self.data[lo * ROW_BYTES:hi * ROW_BYTES])
+            for row, hex_line, ascii_line in zip(range(lo, hi), hex_lines, ascii_lines):
+                self._row_cache[row] = (hex_line, ascii_line)
+
+        rows = []
+        for row in range(first, last):
+            self._row_cache.move_to_end(row)
+            rows.append(self._row_cache[row])
+
+        while len(self._row_cache) > ROW_CACHE_SIZE:
+            self._row_cache.popitem(last=False)
+        return rows
+
     # ---------------- Display and Editing ----------------
     def update_display(self):
-        """Regenerate hex + ASCII display"""
-        lines = []
-        ascii_lines = []
-        for i in range(0, len(self.data), 16):
-            chunk = self.data[i:i+16]
-            hex_bytes = " ".join(f"{b:02X}" for b in chunk).ljust(47)
-            ascii_bytes = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
-            lines.append(f"{i:08X}  {hex_bytes}")
-            ascii_lines.append(f"{ascii_bytes}")
+        """Regenerate hex + ASCII display for the rows in the viewport"""
+        total_rows = self.row_count()
+        page = self._visible_rows
+
+        self.scroll_bar.blockSignals(True)
+        self.scroll_bar.setRange(0, max(0, total_rows - page))
+        self.scroll_bar.setPageStep(page)
+        self.scroll_bar.blockSignals(False)
+
+        top = self.scroll_bar.value()
+        bottom = min(total_rows, top + page)
+        rows = self._rows(top, bottom)
+
+        # Warm the cache one page either side so small scrolls format nothing
+        self._rows(max(0, top - page), top)
+        self._rows(bottom, min(total_rows, bottom + page))
 
         self.hex_box.blockSignals(True)
-        self.hex_box.setPlainText("\n".join(lines))
+        self.hex_box.setPlainText("\n".join(hex_line for hex_line, _ in rows))
         self.hex_box.blockSignals(False)
 
         self.ascii_box.blockSignals(True)
-        self.ascii_box.setPlainText("\n".join(ascii_lines))
+        self.ascii_box.setPlainText("\n".join(ascii_line for _, ascii_line in rows))
         self.ascii_box.blockSignals(False)
 
+
 def main():
     app = QApplication(sys.argv)
     viewer = Hexviewer()
+    if len(sys.argv) > 1:
+        viewer.load_file(sys.argv[1])
     viewer.show()
     sys.exit(app.exec())
 
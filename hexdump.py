@@ -0,0 +1,84 @@
+"""
+Bulk hex/ASCII formatting.
+
+Whole ranges are converted with a single bytes.hex() call and a single
+bytes.translate() call, rows are then plain string slices of those two
+results. There is no per-byte Python code anywhere on this path.
+"""
+import sys
+from array import array
+
+ROW_BYTES = 16
+HEX_WIDTH = ROW_BYTES * 3 - 1  # "XX " per byte without the trailing space
+CHUNK_ROWS = 65536  # rows formatted per pass when streaming a whole file
+
+# Printable ASCII maps to itself, everything else to "."
+ASCII_TABLE = bytes(b if 32 <= b < 127 else ord(".") for b in range(256))
+
+
+def format_rows(offset, data):
+    """
+    Format data (starting at file offset) into parallel lists of hex lines
+    and ASCII lines, one entry per 16-byte row, as shown in the hex viewer.
+    """
+    raw = bytes(data)
+    # Pad a short last row with spaces so the columns stay aligned
+    hex_text = raw.hex(" ").upper().ljust(-(-len(raw) // ROW_BYTES) * ROW_BYTES * 3)
+    ascii_text = raw.translate(ASCII_TABLE).decode("ascii")
+
+    hex_lines = [
+        f"{addr}  {hex_text[pos * 3:pos * 3 + HEX_WIDTH]}"
+        for addr, pos in zip(_addresses(offset, len(raw)), range(0, len(raw), ROW_BYTES))
+    ]
+    ascii_lines = [ascii_text[pos:pos + ROW_BYTES] for pos in range(0, len(raw), ROW_BYTES)]
+    return hex_lines, ascii_lines
+
+
+def _addresses(offset, length):
+    """Row address strings, sliced out of one hex() call over a packed big-endian array"""
+    if offset + length > 0xFFFFFFFF:
+        return [f"{addr:08X}" for addr in range(offset, offset + length, ROW_BYTES)]
+    addrs = array("I", range(offset, offset + length, ROW_BYTES))
+    if sys.byteorder == "little":
+        addrs.byteswap()
+    text = addrs.tobytes().hex().upper()
+    return [text[pos:pos + 8] for pos in range(0, len(text), 8)]
+
+
+def format_dump(offset, data):
+    """Classic single-column dump text: address, hex bytes and |ascii|"""
+    hex_lines, ascii_lines = format_rows(offset, data)
+    return "".join(f"{h}  |{a}|\n" for h, a in zip(hex_lines, ascii_lines))
+
+
+def iter_dump(data, offset=0, chunk_rows=CHUNK_ROWS):
+    """Yield dump text for data in blocks of chunk_rows rows"""
+    step = chunk_rows * ROW_BYTES
+    for pos in range(0, len(data), step):
+        yield format_dump(offset + pos, data[pos:pos + step])
+
+
+def export_dump(data, out_path, offset=0):
+    """Write a full dump of data to out_path without building it all in memory"""
+    with open(out_path, "w", encoding="ascii", newline="\n") as f:
+        for block in iter_dump(data, offset):
+            f.write(block)
+
+
+def main():
+    from mapped_file import MappedFile
+
+    if len(sys.argv) < 2:
+        print("usage: python hexdump.py <image> [output.txt]")
+        sys.exit(2)
+
+    with MappedFile(sys.argv[1]) as src:
+        if len(sys.argv) > 2:
+            export_dump(src, sys.argv[2])
+        else:
+            for block in iter_dump(src):
+                sys.stdout.write(block)
+
+
+if __name__ == "__main__":
+    main()
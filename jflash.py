@@ -0,0 +1,215 @@
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import NamedTuple, Optional
+
+JFLASH_EXE = "JFlash.exe"
+FLUSH_INTERVAL = 0.1   # seconds between batched output / progress callbacks
+STALL_SECONDS = 10.0   # silence from JFlash before a stall is reported
+
+_EOF = object()
+
+
+class JFlashTimeout(Exception):
+    """The process ran past its timeout and was killed"""
+
+
+class JFlashCancelled(Exception):
+    """The process was killed because the run was cancelled"""
+
+
+class ProgressEvent(NamedTuple):
+    phase: str                 # connect, erase, program, verify, done or error
+    percent: Optional[int]
+    bytes: Optional[int]
+    line: str
+
+
+# Checked in order, the first match decides the phase of a line. Verify comes
+# before program: "Target programmed and verified successfully" ends the verify
+PHASE_PATTERNS = [
+    ("error", re.compile(r"\b(error|failed|cannot|could not)\b", re.IGNORECASE)),
+    ("done", re.compile(r"\bcompleted\b", re.IGNORECASE)),
+    ("connect", re.compile(r"\bconnect(ing|ed)?\b", re.IGNORECASE)),
+    ("verify", re.compile(r"\b(verify|verifying|verified|compare|comparing|compared)\b", re.IGNORECASE)),
+    ("erase", re.compile(r"\b(erase|erasing|erased)\b", re.IGNORECASE)),
+    ("program", re.compile(r"\b(program|programming|programmed)\b", re.IGNORECASE)),
+]
+TIMED_PHASES = ("connect", "erase", "program", "verify")
+PERCENT_PATTERN = re.compile(r"(\d{1,3})\s*%")
+BYTES_PATTERN = re.compile(r"(\d+)\s*bytes", re.IGNORECASE)
+SUCCESS_PATTERN = re.compile(r"\bsuccessfully\b", re.IGNORECASE)
+
+
+def find_jflash():
+    """
+    Resolve the JFlash executable. JFLASH_EXE in the environment overrides
+    the name looked up on PATH, which is how a stand-in is used on Linux.
+    """
+    return shutil.which(os.environ.get("JFLASH_EXE", JFLASH_EXE))
+
+
+def split_serials(text):
+    """Probe serials from a comma / whitespace separated list"""
+    return [sn for sn in re.split(r"[\s,;]+", text.strip()) if sn]
+
+
+def base_command(jflash, project, serial=""):
+    cmd = [jflash, "-openprj", project.replace("/", "\\")]
+    if serial:
+        cmd.extend(["-usb", serial])
+    return cmd
+
+
+def erase_command(jflash, project, serial=""):
+    return base_command(jflash, project, serial) + ["-erasechip", "-auto", "-exit"]
+
+
+def program_command(jflash, project, serial, binaries, chip_erase=False):
+    """
+    binaries is a list of (file, 8-digit hex address) pairs. With chip_erase
+    the chip is erased at the start of the same session instead of needing
+    a separate erase_command() run.
+    """
+    cmd = base_command(jflash, project, serial)
+    if chip_erase:
+        cmd.append("-erasechip")
+    for bin_file, addr in binaries:
+        bin_file = bin_file.replace("/", "\\")
+        cmd.extend([
+            f"-open\"{bin_file}\",{addr}",
+            "-auto"
+        ])
+    cmd.append("-exit")
+    return cmd
+
+
+def parse_progress(line):
+    """Turn one line of JFlash output into a ProgressEvent, or None if it carries no progress"""
+    for phase, pattern in PHASE_PATTERNS:
+        if pattern.search(line):
+            break
+    else:
+        return None
+
+    percent = None
+    match = PERCENT_PATTERN.search(line)
+    if match:
+        percent = min(100, int(match.group(1)))
+    elif phase == "done" or SUCCESS_PATTERN.search(line):
+        percent = 100
+
+    match = BYTES_PATTERN.search(line)
+    return ProgressEvent(phase, percent, int(match.group(1)) if match else None, line)
+
+
+def run_streamed(cmd, on_lines, on_progress=None, on_stall=None,
+                 flush_interval=FLUSH_INTERVAL, stall_after=STALL_SECONDS,
+                 timeout=None, cancel_event=None, clock=None):
+    """
+    Run cmd with stdout and stderr merged and stream its output as it is
+    produced. Lines are handed to on_lines in batches at most every
+    flush_interval seconds. Progress events are coalesced the same way,
+    keeping only the newest event per run of the same phase. on_stall(seconds)
+    fires once each time the process goes quiet for stall_after seconds.
+
+    The process is killed if it runs longer than timeout seconds
+    (JFlashTimeout) or once cancel_event is set (JFlashCancelled), both are
+    checked at least every flush_interval. Otherwise returns the exit code.
+
+    clock (a metrics.PhaseClock) is marked as the session moves through
+    spawn (until JFlash reports a phase), connect, erase, program, verify and
+    exit (from the last line of output until the process has exited).
+    """
+    if clock is not None:
+        clock.mark("spawn")
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, errors="replace", bufsize=1
+    )
+    lines = queue.Queue()
+    reader = threading.Thread(target=_pump, args=(proc.stdout, lines), daemon=True)
+    reader.start()
+
+    pending_lines = []
+    pending_events = []
+    started = last_flush = last_output = time.monotonic()
+    seen_output = False
+    stalled = False
+    abort = None
+
+    while True:
+        try:
+            line = lines.get(timeout=flush_interval)
+        except queue.Empty:
+            line = None
+        if line is _EOF:
+            break
+
+        now = time.monotonic()
+        if line is not None:
+            pending_lines.append(line)
+            last_output = now
+            seen_output = True
+            stalled = False
+            event = parse_progress(line)
+            if event is not None and clock is not None and event.phase in TIMED_PHASES:
+                clock.mark(event.phase, now)
+            if event is not None:
+                if pending_events and pending_events[-1].phase == event.phase:
+                    previous = pending_events[-1]
+                    pending_events[-1] = event._replace(
+                        percent=event.percent if event.percent is not None else previous.percent,
+                        bytes=event.bytes if event.bytes is not None else previous.bytes
+                    )
+                else:
+                    pending_events.append(event)
+
+        if pending_lines and now - last_flush >= flush_interval:
+            _flush(pending_lines, pending_events, on_lines, on_progress)
+            last_flush = now
+
+        if not stalled and now - last_output >= stall_after:
+            stalled = True
+            if on_stall is not None:
+                on_stall(now - last_output)
+
+        if abort is None:
+            if cancel_event is not None and cancel_event.is_set():
+                abort = JFlashCancelled("cancelled")
+            elif timeout is not None and now - started > timeout:
+                abort = JFlashTimeout(f"timed out after {timeout:.0f} s")
+            if abort is not None:
+                # Keep reading until EOF so the output up to the kill is not lost
+                proc.kill()
+
+    _flush(pending_lines, pending_events, on_lines, on_progress)
+    if clock is not None and seen_output:
+        clock.mark("exit", last_output)
+    returncode = proc.wait()
+    if clock is not None:
+        clock.stop()
+    if abort is not None:
+        raise abort
+    return returncode
+
+
+def _pump(stream, lines):
+    for line in stream:
+        lines.put(line.rstrip("\r\n"))
+    stream.close()
+    lines.put(_EOF)
+
+
+def _flush(pending_lines, pending_events, on_lines, on_progress):
+    if pending_lines:
+        on_lines(list(pending_lines))
+        pending_lines.clear()
+    if on_progress is not None:
+        for event in pending_events:
+            on_progress(event)
+    pending_events.clear()
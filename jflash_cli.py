@@ -0,0 +1,129 @@
+"""
+Headless flashing for line-station scripts.
+
+    python -m jflash_cli --profile "Board A" [--settings profiles.db|settings.json]
+                         [--serial SN[,SN...]] [--dry-run]
+
+Runs the same validation and command construction as the GUI (flash_core)
+without importing Qt. JFlash output goes to stderr, a JSON summary goes to
+stdout and the exit code is one of flash_core.EXIT_*.
+
+A dry run converts and merges the images like a real run, so the commands
+it prints name artifact cache entries that exist and a later run reuses
+them. Only the delta parts, which depend on the device, are not written.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from flash_core import (
+    prepare_flash, FlashError,
+    EXIT_OK, EXIT_FLASH_FAILED, EXIT_INVALID
+)
+from metrics import record_run
+from pipeline import Pipeline
+from profile_store import ProfileStore, PROFILES_DB
+
+SETTINGS_FILE = PROFILES_DB if os.path.exists(PROFILES_DB) else "settings.json"
+
+
+def load_profile(settings_path, name):
+    """Look a profile up by name in a profile store (.db) or a settings.json file"""
+    if settings_path.endswith(".db"):
+        if not os.path.exists(settings_path):
+            raise FlashError(f"Profile store not found: {settings_path}")
+        store = ProfileStore(settings_path)
+        try:
+            profile = store.get(name)
+        finally:
+            store.close()
+        if profile is not None:
+            return profile
+    else:
+        with open(settings_path, "r") as f:
+            profiles = json.load(f).get("profiles", [])
+        for profile in profiles:
+            if profile.get("name") == name:
+                return profile
+    raise FlashError(f"Profile not found: {name}")
+
+
+def run_single(job, serial):
+    """Run the pipeline for one probe, stopping at the first step that does not pass"""
+    result = Pipeline(
+        job.steps_for(serial),
+        on_lines=lambda lines: print("\n".join(lines), file=sys.stderr),
+        on_step=lambda step: print(" ".join(step.cmd), file=sys.stderr) if step.state == "running" else None
+    ).run()
+    failed = next((step for step in result.steps if step.state != "passed"), None)
+    status = "passed" if failed is None else "failed"
+    record_run(job, serial, status, result.elapsed, result.phases)
+    return {
+        "serial": serial,
+        "status": status,
+        "returncode": failed.returncode if failed else 0,
+        "elapsed": result.elapsed,
+        "error": f"{failed.name}: {failed.state} {failed.error}".strip() if failed else "",
+        "steps": [step.as_dict() for step in result.steps],
+        "phases": result.phases,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="jflash_cli", description="Flash a saved profile without the GUI.")
+    parser.add_argument("--profile", required=True, help="profile name in the settings file")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="profiles.db or settings.json (default: profiles.db if present)")
+    parser.add_argument("--serial", help="probe serial(s), overrides the profile's jlink_sn")
+    parser.add_argument("--dry-run", action="store_true", help="validate, convert and print the commands without flashing")
+    args = parser.parse_args(argv)
+
+    summary = {"profile": args.profile, "ok": False, "exit_code": EXIT_INVALID, "error": ""}
+    start = time.monotonic()
+    try:
+        try:
+            profile = load_profile(args.settings, args.profile)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            raise FlashError(f"Failed to load settings: {e}")
+        if args.serial is not None:
+            profile = dict(profile, jlink_sn=args.serial)
+        job = prepare_flash(profile)
+        serials = job.serials or [""]
+        summary["preflight"] = [check.as_dict() for check in job.preflight]
+        summary["plan"] = job.plan.as_dict()
+        if job.fill_trim is not None:
+            summary["fill_trim"] = job.fill_trim.as_dict()
+        summary["commands"] = {sn: job.commands_for(sn, dry_run=True) for sn in serials}  # the steps write the parts
+
+        if args.dry_run:
+            summary["exit_code"] = EXIT_OK
+        elif len(serials) > 1:
+            from gang import run_gang
+            result = run_gang(
+                serials, job.steps_for,
+                on_lines=lambda sn, lines: print("\n".join(f"[{sn}] {line}" for line in lines), file=sys.stderr)
+            )
+            for p in result.probes:
+                record_run(job, p.serial, p.status, p.elapsed or 0.0, p.phases)
+            summary["probes"] = [p.as_dict() for p in result.probes]
+            summary["exit_code"] = EXIT_OK if result.passed else EXIT_FLASH_FAILED
+        else:
+            probe = run_single(job, serials[0])
+            summary["probes"] = [probe]
+            summary["exit_code"] = EXIT_OK if probe["status"] == "passed" else EXIT_FLASH_FAILED
+    except FlashError as e:
+        summary["error"] = str(e)
+        summary["exit_code"] = e.exit_code
+    except (OSError, ValueError, sqlite3.Error) as e:
+        summary["error"] = str(e)
+
+    summary["ok"] = summary["exit_code"] == EXIT_OK
+    summary["elapsed"] = time.monotonic() - start
+    print(json.dumps(summary, indent=2))
+    return summary["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+JFlash simulator: stands in for JFlash.exe so the flashing pipeline, gang
+scheduling, timeouts and the GUI can be exercised without probes.
+
+    JFLASH_EXE=/path/to/jflash_sim.py python app.py
+    JFLASH_EXE=/path/to/jflash_sim.py python -m jflash_cli --profile "Board A"
+
+Accepts the command lines built by jflash.py (-openprj, -usb, -erasechip,
+-open"file",addr, -auto, -exit) and prints J-Flash style log output.
+Connect, erase, program and verify times are modelled from the image
+sizes and the project's [JTAG] Speed1. Behaviour is configured through a
+JSON file named by JFLASH_SIM_CONFIG, with any key overridable as an
+environment variable JFLASH_SIM_<KEY> (upper case), see SIM_DEFAULTS.
+It is the one JFlash stand-in, used by the benchmarks and the tests.
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+
+SIM_DEFAULTS = {
+    "scale": 1.0,            # multiplies every modelled delay, 0.01 runs a factory shift in seconds
+    "startup": 0.8,          # process start and project load
+    "connect": 0.35,         # probe connect and target init
+    "chip_erase": 1.5,       # seconds for -erasechip
+    "erase_kbps": 256.0,     # sector erase rate
+    "write_kbps": 120.0,     # flash write rate, the slower of this and the SWD link applies
+    "swd_efficiency": 0.35,  # usable fraction of the SWD clock for data transfer
+    "default_speed": 4000,   # kHz when the project has no Speed1
+    "progress_steps": 4,     # progress lines per program phase
+    "fail_rate": 0.0,        # probability that a session fails in a random phase
+    "hang_rate": 0.0,        # probability that a session stops responding in a random phase
+    "fail": {},              # {serial: phase} sessions of serial fail in phase
+    "hang": {},              # {serial: phase} sessions of serial hang in phase
+    "seed": None,            # random seed, per serial, for reproducible fault injection
+    "log": "",               # file each invocation's argv is appended to, one JSON list per line
+}
+PHASES = ("connect", "erase", "program", "verify")
+OPEN_PATTERN = re.compile(r'-open"?([^",]+)"?,([0-9A-Fa-f]+)')
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_BAD_ARGS = 2
+
+
+class SimFault(Exception):
+    def __init__(self, phase, message):
+        super().__init__(message)
+        self.phase = phase
+
+
+def load_config(environ=os.environ):
+    config = dict(SIM_DEFAULTS)
+    path = environ.get("JFLASH_SIM_CONFIG")
+    if path:
+        with open(path, "r") as f:
+            config.update(json.load(f))
+    for key, default in SIM_DEFAULTS.items():
+        value = environ.get(f"JFLASH_SIM_{key.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, dict):
+            # "SN1:program,SN2:connect"
+            config[key] = dict(item.split(":", 1) for item in value.split(",") if ":" in item)
+        elif isinstance(default, float):
+            config[key] = float(value)
+        elif isinstance(default, int):
+            config[key] = int(value)
+        else:
+            config[key] = value
+    return config
+
+
+def parse_args(argv):
+    """(project, serial, chip_erase, [(file, address)]) from a JFlash command line"""
+    project, serial, chip_erase, images = "", "", False, []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ("-openprj", "-usb") and i + 1 < len(argv):
+            if arg == "-openprj":
+                project = argv[i + 1]
+            else:
+                serial = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith("-openprj"):
+            project = arg[len("-openprj"):]
+        elif arg == "-erasechip":
+            chip_erase = True
+        elif arg.startswith("-open"):
+            match = OPEN_PATTERN.match(arg)
+            if not match:
+                raise ValueError(f"Bad -open argument: {arg}")
+            images.append((match.group(1), int(match.group(2), 16)))
+        elif arg not in ("-auto", "-exit", "-hide", "-min"):
+            raise ValueError(f"Unknown command line option {arg}")
+        i += 1
+    return project, serial, chip_erase, images
+
+
+def local_path(path):
+    """Commands carry Windows separators, map them back on POSIX"""
+    return path.replace("\\", "/") if os.sep == "/" else path
+
+
+def project_speed(project, default):
+    try:
+        from parser import get_config
+        return int(get_config(local_path(project), "JTAG", "Speed1"))
+    except Exception:
+        return default
+
+
+class Simulator:
+    def __init__(self, config, serial, out=sys.stdout):
+        self.config = config
+        self.serial = serial
+        self.out = out
+        seed = config["seed"]
+        self.random = random.Random(None if seed is None else f"{seed}:{serial}")
+        self.fault = self._pick_fault()
+
+    def _pick_fault(self):
+        """(kind, phase) of the fault this session will hit, or None"""
+        for kind in ("hang", "fail"):
+            phase = self.config[kind].get(self.serial)
+            if phase:
+                return kind, phase
+        roll = self.random.random()
+        if roll < self.config["hang_rate"]:
+            return "hang", self.random.choice(PHASES)
+        if roll < self.config["hang_rate"] + self.config["fail_rate"]:
+            return "fail", self.random.choice(PHASES)
+        return None
+
+    def log(self, line):
+        print(line, file=self.out, flush=True)
+
+    def wait(self, seconds):
+        time.sleep(max(0.0, seconds) * self.config["scale"])
+
+    def phase(self, phase):
+        """Apply the configured fault when entering phase"""
+        if self.fault is None or self.fault[1] != phase:
+            return
+        kind = self.fault[0]
+        if kind == "hang":
+            self.log(f" - {phase.capitalize()}...")
+            while True:          # stopped responding: only a kill ends this
+                time.sleep(3600)
+        raise SimFault(phase, {
+            "connect": "ERROR: Could not connect to target.",
+            "erase": "ERROR: Failed to erase sectors.",
+            "program": "ERROR: Failed to program target.",
+            "verify": f"ERROR: Verify failed @ address 0x{self.random.randrange(0x08000000, 0x08100000):08X}.",
+        }[phase])
+
+    def run(self, project, chip_erase, images):
+        config = self.config
+        speed = project_speed(project, config["default_speed"])
+        link_kbps = speed * config["swd_efficiency"] / 8  # kHz clock -> KB/s of payload
+        write_kbps = min(config["write_kbps"], link_kbps)
+
+        self.log("Application log started")
+        self.log(" - J-Flash V7.96 (simulated)")
+        self.log(f"Opening project file [{project}]...")
+        if not os.path.exists(local_path(project)):
+            raise SimFault("connect", f"ERROR: Could not open project file [{project}].")
+        self.wait(config["startup"])
+        self.log(" - Project opened successfully")
+
+        loaded = []
+        for file_name, addr in images:
+            self.log(f"Opening data file [{file_name}]...")
+            try:
+                with open(local_path(file_name), "rb") as f:
+                    data = f.read()
+            except OSError:
+                raise SimFault("connect", f"ERROR: Could not open data file [{file_name}].")
+            crc = zlib.crc32(data)
+            self.log(f" - Data file opened successfully ({len(data)} bytes, 1 range, CRC of data = 0x{crc:08X})")
+            loaded.append((addr, len(data)))
+
+        self.log("Connecting ...")
+        self.log(f" - Connecting via USB to J-Link device {self.serial or 0}")
+        self.log(f" - Target interface speed: {speed} kHz (Fixed)")
+        self.phase("connect")
+        self.wait(config["connect"])
+        self.log(" - Connected successfully")
+
+        if chip_erase:
+            self.log("Erasing chip ...")
+            self.phase("erase")
+            self.wait(config["chip_erase"])
+            self.log(" - Chip erased successfully")
+
+        for addr, size in loaded:
+            kb = size / 1024
+            self.log(f"Auto programming target ({size} bytes, 1 range) ...")
+            if not chip_erase:
+                self.log(" - Erasing affected sectors ...")
+                self.phase("erase")
+                self.wait(kb / config["erase_kbps"])
+                self.log(" - Erase operation finished")
+            self.log(f" - Programming target ({size} bytes, 1 range) ...")
+            self.phase("program")
+            steps = max(1, config["progress_steps"])
+            for step in range(1, steps + 1):
+                self.wait(kb / write_kbps / steps)
+                self.log(f" - Programming {step * 100 // steps}% ({size * step // steps} bytes)")
+            self.log(f" - Verifying target ({size} bytes, 1 range) ...")
+            self.phase("verify")
+            self.wait(kb / link_kbps / 4)  # CRC compare on the target, far less than a read-back
+            self.log(f" - Target programmed and verified successfully @ 0x{addr:08X}")
+
+        self.log("Disconnecting ...")
+        self.log(" - Disconnected")
+        self.log("Application log closed")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        config = load_config()
+        if config["log"]:
+            with open(config["log"], "a") as f:
+                f.write(json.dumps(argv) + "\n")
+        project, serial, chip_erase, images = parse_args(argv)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", flush=True)
+        return EXIT_BAD_ARGS
+
+    sim = Simulator(config, serial)
+    try:
+        sim.run(project, chip_erase, images)
+    except SimFault as e:
+        sim.log(str(e))
+        sim.log("Application log closed")
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
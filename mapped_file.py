@@ -0,0 +1,51 @@
+import mmap
+import os
+
+
+class MappedFile:
+    """
+    Read-only, memory-mapped view of a file on disk.
+
+    Pages are faulted in by the OS only when they are sliced, so opening a
+    file costs the same whether it is 4 KB or 64 MB.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses zero-length maps, empty files are served from b""
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if self._map is None:
+            return b""[key]
+        return self._map[key]
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def find(self, sub, start=0):
+        """Offset of the first sub at or after start, -1 if there is none (C fast search, no copy)"""
+        if self._map is None:
+            return -1
+        return self._map.find(sub, start)
+
+    def buffer(self):
+        """Zero-copy memoryview over the whole mapping."""
+        return memoryview(self._map if self._map is not None else b"")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,258 @@
+"""
+Flash timing metrics: where each board's cycle time goes, split by phase,
+kept in a rolling local history and exportable as CSV or as a Prometheus
+textfile (node_exporter textfile collector format).
+
+    python -m metrics --csv runs.csv --prom jflash.prom [--history FILE]
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from artifact_cache import CACHE_DIR
+
+# validation and conversion happen once per job, the rest once per JFlash
+# session from the process' output; post covers post-action steps
+PHASES = ("validation", "conversion", "spawn", "connect", "erase", "program", "verify", "exit", "post")
+HISTORY_FILE = os.path.join(CACHE_DIR, "metrics.jsonl")
+MAX_HISTORY = 1000   # runs kept, older ones are dropped when the file is compacted
+PROM_FILE = os.environ.get("JFLASH_PROM_FILE", "")  # rewritten after every run when set
+
+
+class PhaseClock:
+    """
+    Accumulates wall time per phase. mark(phase) ends the running phase and
+    starts the next one; repeated phases (one program per image) add up.
+    """
+    def __init__(self):
+        self.durations = {}
+        self._phase = None
+        self._since = None
+
+    def mark(self, phase, now=None):
+        now = time.monotonic() if now is None else now
+        if phase == self._phase:
+            return
+        self.stop(now)
+        self._phase, self._since = phase, now
+
+    def stop(self, now=None):
+        if self._phase is not None:
+            now = time.monotonic() if now is None else now
+            self.durations[self._phase] = self.durations.get(self._phase, 0.0) + now - self._since
+        self._phase = self._since = None
+
+    @contextmanager
+    def timed(self, phase):
+        self.mark(phase)
+        try:
+            yield
+        finally:
+            self.stop()
+
+
+class RunRecord:
+    """One probe's run: tags, outcome and seconds per phase"""
+    def __init__(self, profile, serial, status, elapsed, phases,
+                 swd_speed="", image_bytes=0, images="", timestamp=None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.profile = profile
+        self.serial = serial
+        self.status = status
+        self.elapsed = elapsed
+        self.phases = {phase: round(seconds, 4) for phase, seconds in phases.items()}
+        self.swd_speed = swd_speed
+        self.image_bytes = image_bytes
+        self.images = images        # "address:size" per planned image, ';' separated
+
+    @classmethod
+    def for_job(cls, job, serial, status, elapsed, phases):
+        return cls(
+            job.profile_name, serial, status, elapsed,
+            {**job.prep_times, **phases},
+            job.swd_speed,
+            sum(size for _, size in job.image_sizes()),
+            ";".join(f"{addr}:{size}" for addr, size in job.image_sizes())
+        )
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def summary(self):
+        parts = [f"{phase} {self.phases[phase]:.2f}s" for phase in PHASES if phase in self.phases]
+        return " | ".join(parts)
+
+
+class MetricsHistory:
+    """Rolling run history as JSON lines, appended per run and compacted to the newest MAX_HISTORY"""
+    def __init__(self, path=HISTORY_FILE, max_runs=MAX_HISTORY, prom_file=PROM_FILE):
+        self.path = path
+        self.max_runs = max_runs
+        self.prom_file = prom_file
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record.as_dict()) + "\n")
+            records = None
+            if self._line_count() > self.max_runs * 3 // 2:
+                records = self._read()[-self.max_runs:]
+                self._write(records)
+            if self.prom_file:
+                export_prometheus(records or self._read(), self.prom_file)
+
+    def records(self):
+        with self._lock:
+            return self._read()
+
+    def _line_count(self):
+        with open(self.path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b""))
+
+    def _read(self):
+        records = []
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        records.append(RunRecord.from_dict(json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue  # torn last line after a crash
+        except OSError:
+            pass
+        return records
+
+    def _write(self, records):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record.as_dict()) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+CSV_FIELDS = ["timestamp", "profile", "serial", "status", "elapsed", "swd_speed", "image_bytes", "images"]
+
+
+def export_csv(records, out_path):
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS + [f"{phase}_s" for phase in PHASES])
+        for record in records:
+            writer.writerow(
+                [getattr(record, field) for field in CSV_FIELDS]
+                + [record.phases.get(phase, "") for phase in PHASES]
+            )
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def export_prometheus(records, out_path):
+    """
+    Gauges for the newest run of every (profile, serial) and per-profile
+    averages and counts over the history. Written to a temp file and renamed,
+    as the textfile collector may read it at any time.
+    """
+    latest = {}
+    per_profile = {}
+    for record in records:
+        latest[(record.profile, record.serial)] = record
+        per_profile.setdefault(record.profile, []).append(record)
+
+    lines = [
+        "# HELP jflash_last_phase_seconds Duration of each phase in the newest run of a probe.",
+        "# TYPE jflash_last_phase_seconds gauge",
+    ]
+    for (profile, serial), record in sorted(latest.items()):
+        for phase in PHASES:
+            if phase in record.phases:
+                lines.append(
+                    f'jflash_last_phase_seconds{{profile="{_label(profile)}",serial="{_label(serial)}",'
+                    f'phase="{phase}"}} {record.phases[phase]}'
+                )
+    lines += [
+        "# HELP jflash_last_run_seconds Total duration of the newest run of a probe.",
+        "# TYPE jflash_last_run_seconds gauge",
+    ]
+    for (profile, serial), record in sorted(latest.items()):
+        lines.append(f'jflash_last_run_seconds{{profile="{_label(profile)}",serial="{_label(serial)}"}} {record.elapsed:.4f}')
+    lines += [
+        "# HELP jflash_phase_seconds_avg Average phase duration over the run history.",
+        "# TYPE jflash_phase_seconds_avg gauge",
+    ]
+    for profile, runs in sorted(per_profile.items()):
+        for phase in PHASES:
+            values = [run.phases[phase] for run in runs if phase in run.phases]
+            if values:
+                lines.append(
+                    f'jflash_phase_seconds_avg{{profile="{_label(profile)}",phase="{phase}"}} '
+                    f'{sum(values) / len(values):.4f}'
+                )
+    lines += [
+        "# HELP jflash_history_runs Runs in the history by outcome.",
+        "# TYPE jflash_history_runs gauge",
+    ]
+    for profile, runs in sorted(per_profile.items()):
+        for status in sorted({run.status for run in runs}):
+            count = sum(run.status == status for run in runs)
+            lines.append(f'jflash_history_runs{{profile="{_label(profile)}",status="{status}"}} {count}')
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, out_path)
+
+
+_default_history = None
+
+
+def default_history():
+    global _default_history
+    if _default_history is None:
+        _default_history = MetricsHistory()
+    return _default_history
+
+
+def record_run(job, serial, status, elapsed, phases):
+    """Add one probe's run of a flash_core.FlashJob to the default history"""
+    record = RunRecord.for_job(job, serial, status, elapsed, phases)
+    try:
+        default_history().add(record)
+    except OSError:
+        pass  # a full disk or read-only cache must not fail the flash itself
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="metrics", description="Export the flash timing history.")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"history file (default: {HISTORY_FILE})")
+    parser.add_argument("--csv", help="write every run as CSV")
+    parser.add_argument("--prom", help="write a Prometheus textfile")
+    args = parser.parse_args(argv)
+
+    records = MetricsHistory(args.history, prom_file="").records()
+    if args.csv:
+        export_csv(records, args.csv)
+    if args.prom:
+        export_prometheus(records, args.prom)
+    if not (args.csv or args.prom):
+        for record in records[-20:]:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+            print(f"{stamp}  {record.profile:<20} {record.serial:<12} {record.status:<7} "
+                  f"{record.elapsed:7.2f}s  {record.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,45 @@
 import configparser
 import os
+import shutil
+import tempfile
+import threading
 
-def get_config(filename: str, section: str, key: str):
+
+class ProjectConfig:
+    """A parsed .jflash project: {section: {key: value}} with typed lookups"""
+    def __init__(self, path, sections, stamp):
+        self.path = path
+        self.sections = sections
+        self.stamp = stamp  # (mtime_ns, size) of the file that was parsed
+
+    def get(self, section: str, key: str) -> str:
+        try:
+            values = self.sections[section]
+        except KeyError:
+            raise configparser.NoSectionError(section) from None
+        try:
+            return values[key]
+        except KeyError:
+            raise configparser.NoOptionError(key, section) from None
+
+    def get_int(self, section: str, key: str) -> int:
+        """Integer value, decimal or 0x-prefixed hex"""
+        return int(self.get(section, key).strip(), 0)
+
+    def has(self, section: str, key: str) -> bool:
+        return key in self.sections.get(section, {})
+
+
+_projects = {}  # abs path -> ProjectConfig
+_projects_lock = threading.Lock()
+
+
+def _stamp(filename):
+    st = os.stat(filename)
+    return st.st_mtime_ns, st.st_size
+
+
+def parse_project(filename: str, stamp=None) -> ProjectConfig:
     with open(filename) as f:
         content = f.read()
 
@@ -9,20 +47,53 @@ def get_config(filename: str, section: str, key: str):
     content = "[DUMMY]\n" + content
     config = configparser.ConfigParser()
     config.optionxform = str
-    from io import StringIO
-    config.read_file(StringIO(content))
-    value = config.get(section, key)
+    config.read_string(content)
+    sections = {section: dict(config.items(section, raw=True)) for section in config.sections()}
+    return ProjectConfig(filename, sections, stamp)
 
-    return value
 
-def set_config(filename: str, section: str, key: str, value: str):
+def load_project(filename: str) -> ProjectConfig:
+    """Parsed project, re-read only when the file's mtime or size changed"""
+    path = os.path.abspath(filename)
+    stamp = _stamp(path)
+    with _projects_lock:
+        project = _projects.get(path)
+    if project is not None and project.stamp == stamp:
+        return project
+
+    project = parse_project(path, stamp)
+    with _projects_lock:
+        _projects[path] = project
+    return project
+
+
+def invalidate_project(filename: str):
+    with _projects_lock:
+        _projects.pop(os.path.abspath(filename), None)
+
+
+def get_config(filename: str, section: str, key: str):
+    pending = config_writer.pending(filename, section, key)
+    if pending is not None:
+        return pending
+    return load_project(filename).get(section, key)
+
+WRITE_DELAY = 0.5  # seconds an edit may wait for more edits to the same file
+
+
+def set_configs(filename: str, updates: dict):
+    """
+    Apply {(section, key): value} to a project file in one rewrite. Nothing is
+    written if no value changes; otherwise the new file is written next to the
+    old one and renamed over it, so a crash never leaves it half-written.
+    """
     if not os.path.exists(filename):
-        return
+        return False
     with open(filename) as f:
         lines = f.readlines()
 
+    pending = dict(updates)
     current_section = None
-    updated = False
     new_lines = []
 
     for line in lines:
@@ -32,23 +103,120 @@ def set_config(filename: str, section: str, key: str, value: str):
             new_lines.append(line)
             continue
 
-        if '=' in line and current_section == section and not updated:
+        if '=' in line and (current_section, line.split('=', 1)[0].strip()) in pending:
             k, v = line.split('=', 1)
             k = k.strip()
-            if k == key:
-                new_lines.append(f"  {k} = {value}\n")
-                updated = True
-                continue
-
+            value = pending.pop((current_section, k))
+            if v.strip() != str(value):
+                line = f"  {k} = {value}\n"
         new_lines.append(line)
 
     # If key not found, append at the end of the first occurrence of section
-    if not updated:
+    for (section, key), value in pending.items():
         for i, line in enumerate(new_lines):
             if line.strip() == f"[{section}]":
                 new_lines.insert(i+1, f"  {key} = {value}\n")
                 break
 
-    with open(filename, 'w') as f:
-        f.writelines(new_lines)
-    
\ No newline at end of file
+    if new_lines == lines:
+        return False
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(new_lines)
+        shutil.copymode(filename, tmp_path)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Same size and a coarse mtime could hide this write from load_project
+    invalidate_project(filename)
+    return True
+
+def set_config(filename: str, section: str, key: str, value: str):
+    return set_configs(filename, {(section, key): value})
+
+
+class ConfigWriter:
+    """
+    Write-behind for set_config: edits are held for WRITE_DELAY seconds,
+    later edits of the same key replace earlier ones, and all pending keys of
+    a file are written in one set_configs() rewrite.
+    """
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self._pending = {}   # abs path -> {(section, key): value}
+        self._timers = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # keeps rewrites of a file in edit order
+
+    def set(self, filename: str, section: str, key: str, value: str):
+        path = os.path.abspath(filename)
+        with self._lock:
+            self._pending.setdefault(path, {})[(section, key)] = value
+            timer = self._timers.pop(path, None)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.delay, self._write_behind, args=(path,))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
+
+    def pending(self, filename: str, section: str, key: str):
+        with self._lock:
+            return self._pending.get(os.path.abspath(filename), {}).get((section, key))
+
+    def _write_behind(self, path):
+        try:
+            self.flush(path)
+        except (OSError, ValueError):
+            pass  # the edits stay pending, the next flush() retries and raises
+
+    def flush(self, filename=None):
+        """
+        Write pending edits now, for one file or all of them. Edits that could
+        not be written stay pending and the first error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                paths = [os.path.abspath(filename)] if filename else list(self._pending)
+                batches = []
+                for path in paths:
+                    timer = self._timers.pop(path, None)
+                    if timer is not None:
+                        timer.cancel()
+                    if path in self._pending:
+                        batches.append((path, self._pending.pop(path)))
+            errors = []
+            for path, updates in batches:
+                try:
+                    set_configs(path, updates)
+                except (OSError, ValueError) as e:
+                    with self._lock:
+                        # Edits made since the batch was taken are newer
+                        self._pending[path] = {**updates, **self._pending.get(path, {})}
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+
+
+config_writer = ConfigWriter()
+
+
+def set_config_later(filename: str, section: str, key: str, value: str):
+    """set_config through the write-behind writer, skipped if the value is already current"""
+    if config_writer.pending(filename, section, key) is None:
+        try:
+            if get_config(filename, section, key).strip() == str(value):
+                return
+        except (OSError, configparser.Error):
+            pass
+    config_writer.set(filename, section, key, value)
+
+
+def flush_configs():
+    """Write every pending project edit now, raises OSError / ValueError if one could not be written"""
+    config_writer.flush()
@@ -0,0 +1,246 @@
+import os
+import struct
+import tempfile
+import zlib
+from bisect import bisect_right
+
+ORIGINAL = 0
+ADDED = 1
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_MAGIC = b"JFPT1\n"
+
+
+class PieceTable:
+    """
+    Editable byte buffer layered over a read-only original (usually a
+    MappedFile). Edits only ever append to a side buffer and rewrite the
+    piece list, so they cost O(pieces) regardless of the image size.
+
+    Each piece is (source, start, length) where source is ORIGINAL or ADDED.
+    """
+    def __init__(self, original):
+        self.original = original
+        self.added = bytearray()
+        self.pieces = [(ORIGINAL, 0, len(original))] if len(original) else []
+        self._undo = []
+        self._redo = []
+        self._reindex()
+
+    def _reindex(self):
+        self._starts = []
+        pos = 0
+        for _, _, length in self.pieces:
+            self._starts.append(pos)
+            pos += length
+        self._length = pos
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("piece table index out of range")
+            return self[key:key + 1][0]
+
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            return self[start:stop][::step]
+
+        out = bytearray()
+        i = max(0, bisect_right(self._starts, start) - 1)
+        while start < stop and i < len(self.pieces):
+            source, piece_start, length = self.pieces[i]
+            skip = start - self._starts[i]
+            take = min(length - skip, stop - start)
+            buf = self.original if source == ORIGINAL else self.added
+            out += buf[piece_start + skip:piece_start + skip + take]
+            start += take
+            i += 1
+        return bytes(out)
+
+    # ---------------- Editing ----------------
+    def overwrite(self, offset, data):
+        """Replace len(data) bytes at offset, the length of the buffer is unchanged"""
+        if offset < 0 or offset + len(data) > self._length:
+            raise IndexError("overwrite past end of buffer")
+        self._splice(offset, len(data), data)
+
+    def insert(self, offset, data):
+        self._splice(offset, 0, data)
+
+    def delete(self, offset, length):
+        self._splice(offset, length, b"")
+
+    def _splice(self, offset, remove, data):
+        self._undo.append(self.pieces)
+        self._redo.clear()
+
+        new_pieces = []
+        if data:
+            added = (ADDED, len(self.added), len(data))
+            self.added += data
+        end = offset + remove
+        pos = 0
+        inserted = False
+        for source, start, length in self.pieces:
+            piece_end = pos + length
+            # Keep the parts of this piece that fall outside [offset, end)
+            if pos < offset:
+                new_pieces.append((source, start, min(length, offset - pos)))
+            if not inserted and piece_end >= offset and data:
+                new_pieces.append(added)
+                inserted = True
+            if piece_end > end:
+                cut = max(0, end - pos)
+                new_pieces.append((source, start + cut, length - cut))
+            pos = piece_end
+        if data and not inserted:
+            new_pieces.append(added)
+
+        self.pieces = _merge(new_pieces)
+        self._reindex()
+
+    def undo(self):
+        if not self._undo:
+            return False
+        self._redo.append(self.pieces)
+        self.pieces = self._undo.pop()
+        self._reindex()
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._undo.append(self.pieces)
+        self.pieces = self._redo.pop()
+        self._reindex()
+        return True
+
+    # ---------------- Saving ----------------
+    def is_modified(self):
+        return self.pieces != ([(ORIGINAL, 0, len(self.original))] if len(self.original) else [])
+
+    def in_place(self):
+        """True when every original byte still sits at its own offset (overwrite-only edits)"""
+        if self._length != len(self.original):
+            return False
+        return all(
+            source != ORIGINAL or start == self._starts[i]
+            for i, (source, start, _) in enumerate(self.pieces)
+        )
+
+    def dirty_ranges(self):
+        """(offset, bytes) for every run that differs from the original, only valid if in_place()"""
+        return [
+            (self._starts[i], bytes(self.added[start:start + length]))
+            for i, (source, start, length) in enumerate(self.pieces)
+            if source == ADDED
+        ]
+
+    def commit(self, original):
+        """Make the saved content the new baseline, edits so far can no longer be undone"""
+        self.original = original
+        self.added = bytearray()
+        self.pieces = [(ORIGINAL, 0, len(original))] if len(original) else []
+        self._undo.clear()
+        self._redo.clear()
+        self._reindex()
+
+
+def _merge(pieces):
+    """Drop empty pieces and join neighbours that are contiguous in the same source"""
+    merged = []
+    for piece in pieces:
+        if piece[2] <= 0:
+            continue
+        if merged:
+            source, start, length = merged[-1]
+            if source == piece[0] and start + length == piece[1]:
+                merged[-1] = (source, start, length + piece[2])
+                continue
+        merged.append(piece)
+    return merged
+
+
+# ------------------------------------------------------------
+# WRITING BACK
+# ------------------------------------------------------------
+def patch_file(file_path, ranges):
+    """
+    Write (offset, bytes) ranges into file_path in place. The patches are
+    first made durable in a side journal, so a crash part-way through is
+    repaired by recover_journal() instead of leaving a half-patched image.
+    """
+    journal_path = file_path + JOURNAL_SUFFIX
+    body = b"".join(struct.pack(">QI", offset, len(data)) + data for offset, data in ranges)
+    with open(journal_path, "wb") as f:
+        f.write(JOURNAL_MAGIC + body + struct.pack(">I", zlib.crc32(body)))
+        f.flush()
+        os.fsync(f.fileno())
+
+    _apply_journal(file_path, body)
+    os.remove(journal_path)
+
+
+def rewrite_file(file_path, data, before_replace=None, chunk_size=1 << 20):
+    """
+    Write a whole new image to a temp file next to file_path and rename it
+    over the original. before_replace runs between the two, it is where a
+    caller drops its own mapping of file_path (Windows refuses to replace
+    a mapped file).
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for pos in range(0, len(data), chunk_size):
+                f.write(data[pos:pos + chunk_size])
+            f.flush()
+            os.fsync(f.fileno())
+        if before_replace is not None:
+            before_replace()
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def recover_journal(file_path):
+    """Finish (or discard) an interrupted patch_file(). Returns True if patches were replayed."""
+    journal_path = file_path + JOURNAL_SUFFIX
+    if not os.path.exists(journal_path):
+        return False
+
+    with open(journal_path, "rb") as f:
+        raw = f.read()
+    if not _journal_valid(raw):
+        # Torn journal: the image itself was never touched
+        os.remove(journal_path)
+        return False
+
+    _apply_journal(file_path, raw[len(JOURNAL_MAGIC):-4])
+    os.remove(journal_path)
+    return True
+
+
+def _journal_valid(raw):
+    if not raw.startswith(JOURNAL_MAGIC) or len(raw) < len(JOURNAL_MAGIC) + 4:
+        return False
+    body, crc = raw[len(JOURNAL_MAGIC):-4], raw[-4:]
+    return struct.unpack(">I", crc)[0] == zlib.crc32(body)
+
+
+def _apply_journal(file_path, body):
+    with open(file_path, "r+b") as f:
+        pos = 0
+        while pos < len(body):
+            offset, length = struct.unpack_from(">QI", body, pos)
+            pos += 12
+            f.seek(offset)
+            f.write(body[pos:pos + length])
+            pos += length
+        f.flush()
+        os.fsync(f.fileno())
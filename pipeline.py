@@ -0,0 +1,124 @@
+"""
+Flash job pipeline: an ordered queue of steps (JFlash sessions, then any
+post-actions) run one after another by a small state machine. run() blocks,
+so it is always called from a worker thread; cancel() may be called from
+any thread and kills the step that is running.
+"""
+import threading
+import time
+
+from jflash import run_streamed, JFlashTimeout, JFlashCancelled
+from metrics import PhaseClock
+
+DEFAULT_STEP_TIMEOUT = 300.0  # seconds, per step
+
+# Step states
+PENDING = "pending"
+RUNNING = "running"
+PASSED = "passed"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+
+class Step:
+    def __init__(self, name, cmd, timeout=DEFAULT_STEP_TIMEOUT, on_done=None, phase=None):
+        self.name = name
+        self.cmd = cmd
+        self.timeout = timeout
+        self.phase = phase        # timing phase of the whole step, None to take phases from JFlash output
+        self.on_done = on_done    # called with the step once it has run, whatever the outcome
+        self.state = PENDING
+        self.returncode = None
+        self.elapsed = None
+        self.error = ""
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "returncode": self.returncode,
+            "elapsed": self.elapsed,
+            "error": self.error,
+        }
+
+
+class JobResult:
+    def __init__(self, steps, elapsed, phases=None):
+        self.steps = steps
+        self.elapsed = elapsed
+        self.phases = phases or {}  # seconds per metrics phase
+
+    @property
+    def state(self):
+        """PASSED, or the state of the first step that did not pass"""
+        for step in self.steps:
+            if step.state != PASSED:
+                return step.state
+        return PASSED
+
+    @property
+    def passed(self):
+        return self.state == PASSED
+
+
+class Pipeline:
+    def __init__(self, steps, on_lines=None, on_progress=None, on_step=None,
+                 on_stall=None, cancel_event=None):
+        self.steps = steps
+        self.on_lines = on_lines
+        self.on_progress = on_progress
+        self.on_step = on_step
+        self.on_stall = on_stall
+        self.cancel_event = cancel_event or threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _set_state(self, step, state):
+        step.state = state
+        if self.on_step is not None:
+            self.on_step(step)
+
+    def run(self):
+        start = time.monotonic()
+        clock = PhaseClock()
+        stopped = False
+        for step in self.steps:
+            if self.cancel_event.is_set():
+                self._set_state(step, CANCELLED)
+                continue
+            if stopped:
+                self._set_state(step, SKIPPED)
+                continue
+
+            self._set_state(step, RUNNING)
+            step_start = time.monotonic()
+            if step.phase is not None:
+                clock.mark(step.phase)
+            try:
+                step.returncode = run_streamed(
+                    step.cmd,
+                    on_lines=self.on_lines or (lambda lines: None),
+                    on_progress=self.on_progress,
+                    on_stall=self.on_stall,
+                    timeout=step.timeout,
+                    cancel_event=self.cancel_event,
+                    clock=clock if step.phase is None else None
+                )
+                state = PASSED if step.returncode == 0 else FAILED
+            except JFlashTimeout as e:
+                state, step.error = TIMEOUT, str(e)
+            except JFlashCancelled:
+                state = CANCELLED
+            except OSError as e:
+                state, step.error = FAILED, str(e)
+            clock.stop()
+            step.elapsed = time.monotonic() - step_start
+            self._set_state(step, state)
+            if step.on_done is not None:
+                step.on_done(step)
+            stopped = state != PASSED
+
+        return JobResult(self.steps, time.monotonic() - start, clock.durations)
@@ -0,0 +1,161 @@
+"""
+Pre-flight checks of the images of a flash job, before JFlash is started:
+each image must exist, be readable to the end and be non-empty. Every
+image is also hashed (SHA-256 and CRC32, the value JFlash reports for a
+data file). Where the images may be placed is address_map's job.
+
+Images are checked in parallel. Hashes are cached by (path, mtime, size), in
+memory and in preflight.json in the cache directory, so flashing the same
+images again does not read them again.
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from artifact_cache import CACHE_DIR
+
+CACHE_FILE = os.path.join(CACHE_DIR, "preflight.json")
+READ_CHUNK = 1 << 20
+MAX_WORKERS = 4
+
+
+class ImageCheck:
+    """Outcome of the pre-flight of one image"""
+    def __init__(self, label, path, address):
+        self.label = label
+        self.path = path
+        self.address = address
+        self.size = None
+        self.sha256 = ""
+        self.crc32 = None
+        self.cached = False
+        self.error = ""
+
+    @property
+    def ok(self):
+        return not self.error
+
+    def as_dict(self):
+        return {
+            "label": self.label,
+            "path": self.path,
+            "address": f"{self.address:08X}",
+            "size": self.size,
+            "sha256": self.sha256,
+            "crc32": None if self.crc32 is None else f"{self.crc32:08X}",
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+    def describe(self):
+        if self.error:
+            return f"  {self.label}: {self.error}"
+        return (f"  {self.label}: {os.path.basename(self.path)} {self.size} bytes @ {self.address:08X}, "
+                f"CRC32 {self.crc32:08X}, SHA-256 {self.sha256[:16]}…")
+
+
+class HashCache:
+    """(sha256, crc32) per file, valid while the file's mtime and size are unchanged"""
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, path, st):
+        with self._lock:
+            entry = self._load().get(os.path.abspath(path))
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry["sha256"], entry["crc32"]
+        return None
+
+    def put(self, path, st, sha256, crc32):
+        with self._lock:
+            self._load()[os.path.abspath(path)] = {
+                "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": sha256, "crc32": crc32
+            }
+
+    def save(self):
+        with self._lock:
+            if self._entries is None:
+                return
+            entries = {path: e for path, e in self._entries.items() if os.path.exists(path)}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+
+_default_cache = None
+
+
+def default_hash_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HashCache()
+    return _default_cache
+
+
+def hash_file(path):
+    """(sha256 hex, crc32) of path, reading it once to the end"""
+    sha = hashlib.sha256()
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return sha.hexdigest(), crc
+
+
+def check_image(check, cache):
+    try:
+        st = os.stat(check.path)
+    except OSError as e:
+        check.error = f"cannot access {check.path}: {e.strerror}"
+        return check
+    check.size = st.st_size
+    if st.st_size == 0:
+        check.error = f"{check.path} is empty"
+        return check
+
+    hashes = cache.get(check.path, st)
+    if hashes is not None:
+        check.cached = True
+    else:
+        try:
+            hashes = hash_file(check.path)
+        except OSError as e:
+            check.error = f"cannot read {check.path}: {e.strerror}"
+            return check
+        if os.stat(check.path).st_mtime_ns == st.st_mtime_ns:  # not rewritten while we read it
+            cache.put(check.path, st, *hashes)
+    check.sha256, check.crc32 = hashes
+    return check
+
+
+def run_preflight(images, cache=None, max_workers=MAX_WORKERS):
+    """Check (label, path, address) images in parallel, returns ImageChecks in address order"""
+    cache = cache or default_hash_cache()
+    checks = [ImageCheck(label, path, address) for label, path, address in sorted(images, key=lambda i: i[2])]
+    if not checks:
+        return checks
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(checks)), thread_name_prefix="preflight") as pool:
+        list(pool.map(lambda check: check_image(check, cache), checks))
+    if not all(check.cached for check in checks if check.ok):
+        try:
+            cache.save()
+        except OSError:
+            pass  # the cache is an optimisation, a read-only cache directory must not stop a flash
+    return checks
@@ -0,0 +1,85 @@
+"""
+Type-to-filter search over profiles: a trigram index over each profile's
+name, probe serials and file paths. A query matches a profile when every
+whitespace-separated term is a case-insensitive substring of its text.
+Terms of three or more characters are narrowed down through the trigram
+postings before the substring check; shorter terms scan the texts.
+"""
+from collections import defaultdict
+
+SEARCH_FIELDS = ("name", "jlink_sn", "project_file", "bootloader", "image_file", "param_file")
+
+
+def search_text(profile):
+    return "\n".join(str(profile.get(field, "")) for field in SEARCH_FIELDS).lower()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProfileIndex:
+    def __init__(self, profiles=()):
+        self._seq = {}                  # name -> insertion number, results keep store order
+        self._text = {}                 # name -> search_text
+        self._grams = defaultdict(set)  # trigram -> names
+        self._next = 0
+        for profile in profiles:
+            self.add(profile)
+
+    def __len__(self):
+        return len(self._text)
+
+    def add(self, profile):
+        """Add a profile, or re-index it if its name is already known"""
+        name = profile["name"]
+        text = search_text(profile)
+        old = self._text.get(name)
+        if old == text:
+            return
+        if old is not None:
+            for gram in trigrams(old):
+                self._grams[gram].discard(name)
+        else:
+            self._seq[name] = self._next
+            self._next += 1
+        self._text[name] = text
+        for gram in trigrams(text):
+            self._grams[gram].add(name)
+
+    def remove(self, name):
+        text = self._text.pop(name, None)
+        if text is None:
+            return
+        del self._seq[name]
+        for gram in trigrams(text):
+            postings = self._grams[gram]
+            postings.discard(name)
+            if not postings:
+                del self._grams[gram]
+
+    def search(self, query):
+        """Names matching query, in the order they were added"""
+        terms = query.lower().split()
+        if not terms:
+            return sorted(self._text, key=self._seq.__getitem__)
+
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            if len(term) >= 3:
+                postings = sorted((self._grams.get(gram, set()) for gram in trigrams(term)), key=len)
+                found = set(postings[0]).intersection(*postings[1:])
+                if candidates is not None:
+                    found &= candidates
+            else:
+                found = candidates if candidates is not None else self._text.keys()
+            candidates = {name for name in found if term in self._text[name]}
+            if not candidates:
+                return []
+        return sorted(candidates, key=self._seq.__getitem__)
+
+
+def filter_names(names, query):
+    """Names containing every term of query, a linear scan for while no index is built yet"""
+    terms = query.lower().split()
+    return [name for name in names if all(term in name.lower() for term in terms)]
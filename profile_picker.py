@@ -0,0 +1,73 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class ProfileListModel(QAbstractListModel):
+    """
+    Profile names for the profile combo box. The full (possibly filtered)
+    list is held as plain strings and handed to the view FETCH_BATCH rows at
+    a time through canFetchMore/fetchMore, so filling the combo does not
+    depend on the number of profiles.
+    """
+    FETCH_BATCH = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+        self._loaded = 0
+
+    # ---------------- Qt model interface ----------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self._names[index.row()]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._names)
+
+    def fetchMore(self, parent=QModelIndex()):
+        self._load_to(min(len(self._names), self._loaded + self.FETCH_BATCH))
+
+    # ---------------- Helpers ----------------
+    def _load_to(self, count):
+        if count <= self._loaded:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, count - 1)
+        self._loaded = count
+        self.endInsertRows()
+
+    def set_names(self, names):
+        self.beginResetModel()
+        self._names = list(names)
+        self._loaded = min(len(self._names), self.FETCH_BATCH)
+        self.endResetModel()
+
+    def name(self, row):
+        return self._names[row] if 0 <= row < len(self._names) else ""
+
+    def row_of(self, name):
+        """Row of name, fetching rows up to it so it can be made current; -1 if absent"""
+        try:
+            row = self._names.index(name)
+        except ValueError:
+            return -1
+        self._load_to(row + 1)
+        return row
+
+    def append(self, name):
+        self._names.append(name)
+        if self._loaded == len(self._names) - 1:
+            self._load_to(len(self._names))
+
+    def remove(self, row):
+        if row >= self._loaded:
+            del self._names[row]
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._names[row]
+        self._loaded -= 1
+        self.endRemoveRows()
@@ -0,0 +1,138 @@
+"""
+Profile store: profiles kept as one SQLite row each, addressed by name.
+
+Saving a profile writes only that row, and only when its content changed,
+so load and save cost does not grow with the number of profiles. The
+settings.json format used before is imported the first time a store is
+opened next to one, and can still be exported.
+"""
+import json
+import os
+import sqlite3
+
+PROFILES_DB = "profiles.db"
+SETTINGS_FILE = "settings.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id   INTEGER PRIMARY KEY AUTOINCREMENT,  -- creation order, the order shown in the GUI
+    name TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL                       -- the profile dict as JSON
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class ProfileStore:
+    def __init__(self, path=PROFILES_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._saved = {}  # name -> JSON last read or written, for dirty tracking
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def names(self):
+        return [name for name, in self.db.execute("SELECT name FROM profiles ORDER BY id")]
+
+    def items(self):
+        """Every profile dict, in creation order"""
+        return [json.loads(data) for data, in self.db.execute("SELECT data FROM profiles ORDER BY id")]
+
+    def get(self, name):
+        """The profile called name, or None"""
+        row = self.db.execute("SELECT data FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        self._saved[name] = row[0]
+        return json.loads(row[0])
+
+    def __contains__(self, name):
+        return self.db.execute("SELECT 1 FROM profiles WHERE name = ?", (name,)).fetchone() is not None
+
+    def is_dirty(self, profile):
+        return _encode(profile) != self._saved.get(profile["name"])
+
+    def put(self, profile):
+        """Insert or update a profile by its name, returns False if it was unchanged"""
+        data = _encode(profile)
+        name = profile["name"]
+        if name not in self._saved:
+            self.get(name)
+        if self._saved.get(name) == data:
+            return False
+        with self.db:
+            self.db.execute(
+                "INSERT INTO profiles (name, data) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+                (name, data)
+            )
+        self._saved[name] = data
+        return True
+
+    def delete(self, name):
+        with self.db:
+            self.db.execute("DELETE FROM profiles WHERE name = ?", (name,))
+        self._saved.pop(name, None)
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        if self.get_meta(key) == value:
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    # ---------------- settings.json ----------------
+    def import_json(self, settings_path):
+        """Add the profiles of a settings.json file, the first profile wins on duplicate names"""
+        with open(settings_path, "r") as f:
+            data = json.load(f)
+        profiles = data.get("profiles", [])
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO profiles (name, data) VALUES (?, ?)",
+                [(p.get("name", "Unnamed Profile"), _encode(p)) for p in profiles]
+            )
+        last = data.get("last_loaded_profile", 0)
+        if profiles and 0 <= last < len(profiles):
+            self.set_meta("last_profile", profiles[last].get("name", "Unnamed Profile"))
+        return len(profiles)
+
+    def export_json(self, settings_path):
+        profiles = self.items()
+        names = [p["name"] for p in profiles]
+        last = self.get_meta("last_profile")
+        with open(settings_path, "w") as f:
+            json.dump({
+                "last_loaded_profile": names.index(last) if last in names else 0,
+                "profiles": profiles
+            }, f, indent=4)
+
+
+def _encode(profile):
+    return json.dumps(profile, sort_keys=True)
+
+
+def open_store(path=PROFILES_DB, settings_path=SETTINGS_FILE):
+    """Open the store, importing settings.json the first time"""
+    is_new = not os.path.exists(path)
+    store = ProfileStore(path)
+    if is_new and settings_path and os.path.exists(settings_path):
+        store.import_json(settings_path)
+    return store
@@ -0,0 +1,284 @@
+"""
+Intel HEX and Motorola S-record images as sparse segments.
+
+The file is read a line at a time and each record is decoded with one
+bytes.fromhex call. Data records that continue where the previous one
+ended are appended to the same segment, so an image is held as a few
+(address, bytearray) segments. Memory use follows the payload, the gaps
+between segments are never filled in.
+
+Parsed images are cached by path and (mtime, size) like parser's
+projects, so the layout check, the flash and the hex viewer share one
+parse of an unchanged file. The cache only keeps the MAX_CACHED_IMAGES
+most recently used images. load_image also opens ELF files (elf_image),
+those are mapped rather than parsed and must be closed after use.
+"""
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+INTEL_HEX_EXTENSIONS = (".hex", ".ihex", ".ihx")
+SREC_EXTENSIONS = (".srec", ".s19", ".s28", ".s37", ".mot")
+FILL = 0xFF  # what gaps read as in a FlatView, the erased value of NOR flash
+MAX_CACHED_IMAGES = 4  # parsed images kept, one per image slot and a spare for the hex viewer
+
+# S-record type -> address bytes
+SREC_ADDRESS_BYTES = {"0": 2, "1": 2, "2": 3, "3": 4, "5": 2, "6": 3, "7": 4, "8": 3, "9": 2}
+
+_images = OrderedDict()  # (path, mtime_ns, size) -> SegmentImage, least recently used first
+_images_lock = threading.Lock()
+
+
+class ImageFormatError(ValueError):
+    def __init__(self, path, line, message):
+        super().__init__(f"{os.path.basename(path)} line {line}: {message}" if line else
+                         f"{os.path.basename(path)}: {message}")
+        self.path = path
+        self.line = line
+
+
+class Segment:
+    __slots__ = ("address", "data")
+
+    def __init__(self, address, data):
+        self.address = address
+        self.data = data
+
+    @property
+    def end(self):
+        return self.address + len(self.data)
+
+    def __repr__(self):
+        return f"Segment({self.address:08X}, {len(self.data)} bytes)"
+
+
+class SegmentImage:
+    """The data of an image file as address-ordered, non-overlapping segments"""
+    def __init__(self, path, segments, entry=None, stamp=None, close=None):
+        self.path = path
+        self.segments = segments
+        self.entry = entry      # start address record / ELF entry point, if the file has one
+        self.stamp = stamp
+        self._close = close     # releases the mapping segment data views, None for parsed files
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+            self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def start(self):
+        return self.segments[0].address if self.segments else 0
+
+    @property
+    def end(self):
+        return self.segments[-1].end if self.segments else 0
+
+    @property
+    def payload_size(self):
+        return sum(len(segment.data) for segment in self.segments)
+
+    def flat(self, fill=FILL):
+        return FlatView(self, fill)
+
+
+class FlatView:
+    """
+    Read-only bytes view of start..end of a SegmentImage, gaps read as
+    fill. Only the slices asked for are built, so the hex viewer and the
+    searches can page through a sparse image without it being filled in.
+    """
+    def __init__(self, image, fill=FILL):
+        self.base = image.start
+        self.size = image.end - image.start
+        self.fill = fill
+        self._segments = image.segments
+        self._starts = [segment.address - self.base for segment in image.segments]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += self.size
+            if not 0 <= key < self.size:
+                raise IndexError("FlatView index out of range")
+            return self[key:key + 1][0]
+        start, stop, step = key.indices(self.size)
+        if step != 1:
+            raise ValueError("FlatView slices must be contiguous")
+        if stop <= start:
+            return b""
+
+        out = bytearray([self.fill]) * (stop - start)
+        i = max(0, bisect_right(self._starts, start) - 1)
+        while i < len(self._segments) and self._starts[i] < stop:
+            seg_start = self._starts[i]
+            data = self._segments[i].data
+            lo, hi = max(start, seg_start), min(stop, seg_start + len(data))
+            if lo < hi:
+                out[lo - start:hi - start] = data[lo - seg_start:hi - seg_start]
+            i += 1
+        return bytes(out)
+
+
+class _SegmentBuilder:
+    def __init__(self, path):
+        self.path = path
+        self.segments = []
+
+    def add(self, address, data, line):
+        if not data:
+            return
+        if self.segments and self.segments[-1].end == address:
+            self.segments[-1].data += data
+        else:
+            self.segments.append(Segment(address, bytearray(data)))
+
+    def finish(self):
+        """Segments sorted by address, records given out of order merged where they touch"""
+        merged = []
+        for segment in sorted(self.segments, key=lambda s: s.address):
+            if merged and segment.address < merged[-1].end:
+                raise ImageFormatError(self.path, 0, f"records overlap at {segment.address:08X}")
+            if merged and segment.address == merged[-1].end:
+                merged[-1].data += segment.data
+            else:
+                merged.append(segment)
+        return merged
+
+
+def _decode(path, number, text, skip):
+    try:
+        return bytes.fromhex(text[skip:])
+    except ValueError:
+        raise ImageFormatError(path, number, "not a hex record")
+
+
+def read_intel_hex(path, stamp=None):
+    builder = _SegmentBuilder(path)
+    base, entry, number = 0, None, 0
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] != ":":
+                raise ImageFormatError(path, number, "record does not start with ':'")
+            raw = _decode(path, number, line, 1)
+            if len(raw) < 5 or len(raw) != raw[0] + 5:
+                raise ImageFormatError(path, number, "record length does not match its byte count")
+            if sum(raw) & 0xFF:
+                raise ImageFormatError(path, number, "checksum mismatch")
+
+            kind, offset, data = raw[3], raw[1] << 8 | raw[2], raw[4:-1]
+            if kind == 0x00:
+                builder.add(base + offset, data, number)
+            elif kind == 0x01:
+                break
+            elif kind == 0x02:
+                base = int.from_bytes(data, "big") << 4
+            elif kind == 0x04:
+                base = int.from_bytes(data, "big") << 16
+            elif kind in (0x03, 0x05):
+                entry = int.from_bytes(data, "big")
+            else:
+                raise ImageFormatError(path, number, f"unknown record type {kind:02X}")
+        else:
+            raise ImageFormatError(path, number, "no end-of-file record, the file may be truncated")
+    return SegmentImage(path, builder.finish(), entry, stamp)
+
+
+def read_srec(path, stamp=None):
+    builder = _SegmentBuilder(path)
+    entry, number = None, 0
+    with open(path, "r", encoding="ascii", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            kind = line[1:2]
+            if line[0] not in "Ss" or kind not in SREC_ADDRESS_BYTES:
+                raise ImageFormatError(path, number, "not an S-record")
+            raw = _decode(path, number, line, 2)
+            width = SREC_ADDRESS_BYTES[kind]
+            if len(raw) < width + 2 or len(raw) != raw[0] + 1:
+                raise ImageFormatError(path, number, "record length does not match its byte count")
+            if sum(raw) & 0xFF != 0xFF:
+                raise ImageFormatError(path, number, "checksum mismatch")
+
+            address = int.from_bytes(raw[1:1 + width], "big")
+            if kind in "123":
+                builder.add(address, raw[1 + width:-1], number)
+            elif kind in "789":
+                entry = address
+                break
+        else:
+            raise ImageFormatError(path, number, "no termination record (S7/S8/S9), the file may be truncated")
+    return SegmentImage(path, builder.finish(), entry, stamp)
+
+
+def is_record_file(path):
+    return path.lower().endswith(INTEL_HEX_EXTENSIONS + SREC_EXTENSIONS)
+
+
+def is_segment_file(path):
+    """True for images that carry their own load addresses: .hex / .srec and ELF"""
+    from elf_image import ELF_EXTENSIONS
+    return is_record_file(path) or path.lower().endswith(ELF_EXTENSIONS)
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def is_loaded(path):
+    """
+    True if load_image(path) would not parse anything: ELF files (only their
+    headers are read) and .hex / .srec files already parsed as they are now
+    """
+    path = os.path.abspath(path)
+    if not is_record_file(path):
+        return True
+    key = (path, *_stamp(path))
+    with _images_lock:
+        return key in _images
+
+
+def load_image(path):
+    """
+    SegmentImage of a .hex / .srec file, re-read only when its mtime or size
+    changed, or of an ELF file, mapped anew. Use it as a context manager,
+    closing a parsed image is a no-op.
+    """
+    path = os.path.abspath(path)
+    stamp = _stamp(path)
+    if not is_record_file(path):
+        from elf_image import read_elf
+        return read_elf(path, stamp)
+    key = (path, *stamp)
+    with _images_lock:
+        image = _images.get(key)
+        if image is not None:
+            _images.move_to_end(key)
+            return image
+
+    reader = read_intel_hex if path.lower().endswith(INTEL_HEX_EXTENSIONS) else read_srec
+    image = reader(path, stamp)
+    with _images_lock:
+        for old_key in [k for k in _images if k[0] == path]:
+            del _images[old_key]  # an older version of the file
+        _images[key] = image
+        while len(_images) > MAX_CACHED_IMAGES:
+            _images.popitem(last=False)
+    return image
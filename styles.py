@@ -1,6 +1,15 @@
 from PyQt6.QtWidgets import (QPushButton, QCheckBox, QComboBox)
+from functools import lru_cache
 from PyQt6.QtCore import Qt
 
+# (background, hover, pressed, text) per MaterialButton kind
+BUTTON_COLORS = {
+    "default": ("#33334c", "#666698", "#9999e4", "#ffffff"),
+    "danger": ("#e74c3c", "#ff5252", "#c0392b", "#ffffff"),
+    "success": ("#27ae60", "#2ecc71", "#1e8449", "#ffffff"),
+}
+
+
 class MaterialButton(QPushButton):
     def __init__(self, text="", parent=None, kind="default"):
         super().__init__(text, parent)
@@ -15,43 +24,11 @@ class MaterialButton(QPushButton):
         self.update_style()
 
     def update_style(self):
-        if self.kind == "default":
-            bg = "#33334c"
-            hover = "#666698"
-            pressed = "#9999e4"
-            text_color = "#ffffff"
-        elif self.kind == "danger":
-            bg = "#e74c3c"
-            hover = "#ff5252"
-            pressed = "#c0392b"
-            text_color = "#ffffff"
-        elif self.kind == "success":
-            bg = "#27ae60"
-            hover = "#2ecc71"
-            pressed = "#1e8449"
-            text_color = "#ffffff"
-        else:
-            bg = "#33334c"
-            hover = "#666698"
-            pressed = "#9999e4"
-            text_color = "#ffffff"
-
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background: {bg};
-                color: {text_color};
-                border: none;
-                border-radius: 6px;
-                padding: 8px 14px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background: {hover};
-            }}
-            QPushButton:pressed {{
-                background: {pressed};
-            }}
-        """)
+        # Colors come from material_stylesheet() on the application, a
+        # per-button setStyleSheet would be re-parsed for every instance
+        self.setProperty("kind", self.kind if self.kind in BUTTON_COLORS else "default")
+        self.style().unpolish(self)
+        self.style().polish(self)
     
 class MaterialCheckBox(QCheckBox):
     def __init__(self, text="", parent=None):
@@ -63,31 +40,51 @@ class MaterialComboBox(QComboBox):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.setStyleSheet("""
+        self.setProperty("material", True)
+
+
+# Labels reporting a check result set the "severity" property to one of these
+SEVERITY_STYLE = """
+        QLabel[severity="ok"] { color: #66bb6a; }
+        QLabel[severity="info"] { color: #b0b0c8; }
+        QLabel[severity="error"] { color: #ef5350; }
+"""
+
+
+def set_severity(widget, severity):
+    """Restyle a label for ok / info / error through SEVERITY_STYLE"""
+    if widget.property("severity") == severity:
+        return
+    widget.setProperty("severity", severity)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+
+MATERIAL_COMBO_STYLE = """
         /* ================= QComboBox Main ================= */
-        QComboBox {
+        QComboBox[material="true"] {
             background: #1e1e1e;
             color: #e0e0e0;
             border: 1px solid #3a3a3a;
             border-radius: 6px;
             padding: 6px;
         }
-        QComboBox:hover {
+        QComboBox[material="true"]:hover {
             border: 1px solid #1f6feb;
         }
-        QComboBox::drop-down {
+        QComboBox[material="true"]::drop-down {
             background: transparent;
             border: none;
             width: 28px;
         }
-        QComboBox::down-arrow {
+        QComboBox[material="true"]::down-arrow {
             image: url("assets/arrow_drop_down.svg");
             width: 14px;
             height: 14px;
         }
 
         /* ================= Dropdown List ================= */
-        QComboBox QAbstractItemView {
+        QComboBox[material="true"] QAbstractItemView {
             background: #1e1e1e;
             border: 1px solid #3a3a3a;
             border-radius: 6px;
@@ -98,19 +95,47 @@ class MaterialComboBox(QComboBox):
         }
 
         /* List items */
-        QComboBox QAbstractItemView::item {
+        QComboBox[material="true"] QAbstractItemView::item {
             padding: 6px 10px;
             background: transparent;
             color: #e0e0e0;
         }
-        QComboBox QAbstractItemView::item:hover {
+        QComboBox[material="true"] QAbstractItemView::item:hover {
             background: #2a2a2a;
             border-radius: 4px;
         }
-        QComboBox QAbstractItemView::item:selected {
+        QComboBox[material="true"] QAbstractItemView::item:selected {
             background: #1f6feb;
             color: white;
             border-radius: 4px;
         }
+"""
 
+
+@lru_cache(maxsize=None)
+def material_stylesheet():
+    """
+    Application-level rules for the Material* widgets, installed once next
+    to get_theme() so that creating a widget does not parse any CSS.
+    """
+    rules = []
+    for kind, (bg, hover, pressed, text_color) in BUTTON_COLORS.items():
+        rules.append(f"""
+            QPushButton[kind="{kind}"] {{
+                background: {bg};
+                color: {text_color};
+                border: none;
+                border-radius: 6px;
+                padding: 8px 14px;
+                font-weight: bold;
+            }}
+            QPushButton[kind="{kind}"]:hover {{
+                background: {hover};
+            }}
+            QPushButton[kind="{kind}"]:pressed {{
+                background: {pressed};
+            }}
         """)
+    rules.append(MATERIAL_COMBO_STYLE)
+    rules.append(SEVERITY_STYLE)
+    return "".join(rules)
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO)
+
+JFLASH_SIM = os.path.join(REPO, "jflash_sim.py")
+
+# Artifacts, device records and metrics go to a scratch cache, never ~/.jflash_cache;
+# set before the first import of artifact_cache, which reads it once
+os.environ["JFLASH_CACHE_DIR"] = tempfile.mkdtemp(prefix="jflash_cache_")
+
+
+def write(path, data):
+    """Write bytes or text to a pathlib path and return it as a str"""
+    if isinstance(data, str):
+        path.write_text(data)
+    else:
+        path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from artifact_cache import ArtifactCache
+    return ArtifactCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A minimal .jflash project with a 4 MB flash bank at 08000000"""
+    path = tmp_path / "board.jflash"
+    path.write_text(
+        "AppVersion = 72000\n"
+        "[JTAG]\n  Speed1 = 4000\n"
+        "[FLASH]\n  BaseAddr = 0x08000000\n  Size = 0x00400000\n  SectorSize = 0x400\n"
+    )
+    return str(path)
+
+
+@pytest.fixture
+def sim(monkeypatch, tmp_path):
+    """Runs jflash_sim.py without delays, logging every command line it gets"""
+    log = tmp_path / "sim.log"
+    monkeypatch.setenv("JFLASH_SIM_SCALE", "0")
+    monkeypatch.setenv("JFLASH_SIM_LOG", str(log))
+    for key in ("FAIL", "HANG", "FAIL_RATE", "HANG_RATE", "CONFIG"):
+        monkeypatch.delenv(f"JFLASH_SIM_{key}", raising=False)
+    return log
@@ -0,0 +1,37 @@
+import hashlib
+import subprocess
+import sys
+
+from artifact_cache import ArtifactCache
+from conftest import REPO
+
+WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from artifact_cache import ArtifactCache
+cache = ArtifactCache(sys.argv[2])
+for i in range(40):
+    cache.put_bytes(f"{sys.argv[3]}-{i}".encode())
+"""
+
+
+def test_processes_sharing_a_cache_keep_each_others_entries(tmp_path):
+    root = str(tmp_path / "cache")
+    writers = [
+        subprocess.Popen([sys.executable, "-c", WRITER, REPO, root, name]) for name in ("a", "b", "c")
+    ]
+    assert [writer.wait() for writer in writers] == [0, 0, 0]
+
+    cache = ArtifactCache(root)
+    shas = {hashlib.sha256(f"{name}-{i}".encode()).hexdigest() for name in "abc" for i in range(40)}
+    assert set(cache._index["objects"]) == shas
+    assert all(cache._valid(sha) for sha in shas)
+
+
+def test_an_index_replaced_by_another_process_is_read_again(tmp_path):
+    root = str(tmp_path / "cache")
+    first, second = ArtifactCache(root), ArtifactCache(root)
+    path = first.put_bytes(b"first")
+    second.put_bytes(b"second")
+    assert first.put_bytes(b"first") == path
+    assert len(ArtifactCache(root)._index["objects"]) == 2
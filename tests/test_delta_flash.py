@@ -0,0 +1,109 @@
+import os
+
+from conftest import JFLASH_SIM, write
+from delta_flash import DeviceRecords, changed_sectors, delta_binaries, sector_hashes
+from flash_core import prepare_flash
+from gang import run_gang
+
+SECTOR = 0x400
+
+
+def test_changed_sectors(tmp_path):
+    old = bytearray(os.urandom(4 * SECTOR))
+    image = write(tmp_path / "a.bin", old)
+    record = {"sectors": sector_hashes([(image, "08000000")], SECTOR)}
+    assert changed_sectors(record["sectors"], record) == []
+
+    old[SECTOR + 5] ^= 0xFF
+    old[3 * SECTOR] ^= 0xFF
+    write(tmp_path / "a.bin", old)
+    hashes = sector_hashes([(image, "08000000")], SECTOR)
+    assert changed_sectors(hashes, record) == [0x08000000 + SECTOR, 0x08000000 + 3 * SECTOR]
+    assert changed_sectors(hashes, {}) == sorted(int(sector, 16) for sector in hashes)
+
+
+def test_sectors_are_aligned_to_flash_addresses(tmp_path):
+    # an image starting mid-sector shares its first sector with whatever is below it
+    image = write(tmp_path / "a.bin", os.urandom(SECTOR))
+    hashes = sector_hashes([(image, "08000200")], SECTOR)
+    assert sorted(hashes) == ["08000000", "08000400"]
+
+
+def test_delta_binaries_cut_runs_of_changed_sectors(tmp_path, cache):
+    data = os.urandom(6 * SECTOR)
+    image = write(tmp_path / "a.bin", data)
+    base = 0x08000000
+    changed = [base + SECTOR, base + 2 * SECTOR, base + 5 * SECTOR]
+    parts = delta_binaries([(image, "08000000")], changed, SECTOR, cache)
+    assert [(addr, open(path, "rb").read()) for path, addr in parts] == [
+        ("08000400", data[SECTOR:3 * SECTOR]),
+        ("08001400", data[5 * SECTOR:]),
+    ]
+
+
+def test_delta_binaries_clip_to_the_image(tmp_path, cache):
+    data = os.urandom(SECTOR)
+    image = write(tmp_path / "a.bin", data)
+    parts = delta_binaries([(image, "08000200")], [0x08000000, 0x08000400], SECTOR, cache)
+    assert [(addr, open(path, "rb").read()) for path, addr in parts] == [("08000200", data)]
+
+
+def test_delta_binaries_without_store_write_nothing(tmp_path, cache):
+    data = os.urandom(2 * SECTOR)
+    image = write(tmp_path / "a.bin", data)
+    named = delta_binaries([(image, "08000000")], [0x08000400], SECTOR, cache, store=False)
+    assert not any(os.path.exists(path) for path, _ in named)
+    assert delta_binaries([(image, "08000000")], [0x08000400], SECTOR, cache) == named
+
+
+def test_delta_parts_sharing_a_sector_are_merged(tmp_path, cache):
+    first = write(tmp_path / "a.bin", b"\x01" * 0x100)
+    second = write(tmp_path / "b.bin", b"\x02" * 0x100)
+    parts = delta_binaries([(second, "08000200"), (first, "08000000")], [0x08000000], SECTOR, cache)
+    assert [(addr, open(path, "rb").read()) for path, addr in parts] == [
+        ("08000000", b"\x01" * 0x100 + b"\xff" * 0x100 + b"\x02" * 0x100)
+    ]
+
+
+def test_device_records(tmp_path):
+    records = DeviceRecords(str(tmp_path / "devices.json"))
+    records.update("123", "a.jflash", SECTOR, {"08000000": "x", "08000400": "y"})
+    records.update("123", "a.jflash", SECTOR, {"08000400": "z"})
+    assert records.get("123", "a.jflash", SECTOR)["sectors"] == {"08000000": "x", "08000400": "z"}
+    assert records.get("123", "a.jflash", 2 * SECTOR) == {}
+
+    records.update("123", "a.jflash", SECTOR, {"08000400": "z"}, replace=True)
+    assert records.get("123", "a.jflash", SECTOR)["sectors"] == {"08000400": "z"}
+    records.forget("123")
+    assert records.get("123", "a.jflash", SECTOR) == {}
+
+
+def flash_job(image, project, delta, records):
+    job = prepare_flash({
+        "name": "delta",
+        "project_file": project,
+        "image_file": image, "image_enabled": True, "addr_image": "08000000",
+        "jlink_sn": "123",
+        "delta_flash": delta,
+    }, JFLASH_SIM)
+    job.records = records
+    return job
+
+
+def test_full_flashes_keep_the_device_record(tmp_path, project, sim, monkeypatch):
+    records = DeviceRecords(str(tmp_path / "devices.json"))
+    v1 = os.urandom(4 * SECTOR)
+    v2 = v1[:2 * SECTOR] + os.urandom(SECTOR) + v1[3 * SECTOR:]
+    image_v1 = write(tmp_path / "v1.bin", v1)
+    image_v2 = write(tmp_path / "v2.bin", v2)
+
+    assert run_gang(["123"], flash_job(image_v1, project, True, records).steps_for).passed
+    assert run_gang(["123"], flash_job(image_v2, project, False, records).steps_for).passed
+    # The device holds v2 now, so going back to v1 by delta rewrites the sector that differs
+    job = flash_job(image_v1, project, True, records)
+    assert [addr for _, addr in job.delta_for("123", store=False)] == ["08000800"]
+
+    monkeypatch.setenv("JFLASH_SIM_FAIL", "123:program")
+    assert not run_gang(["123"], flash_job(image_v1, project, False, records).steps_for).passed
+    assert records.get("123", project, SECTOR) == {}
+
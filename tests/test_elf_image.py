@@ -0,0 +1,83 @@
+import os
+import struct
+
+import pytest
+
+from conftest import JFLASH_SIM
+from elf_image import read_elf
+from flash_core import convert_segment_files, prepare_flash
+from record_image import ImageFormatError, load_image
+
+
+def write_elf(path, segments, entry=0x08000101):
+    """Little-endian ELF32 with one PT_LOAD program header per (paddr, data, memsz)"""
+    phoff = 52
+    offset = phoff + 32 * len(segments)
+    headers, body = b"", b""
+    for paddr, data, memsz in segments:
+        headers += struct.pack("<IIIIIIII", 1, offset + len(body), paddr, paddr, len(data), memsz, 5, 4)
+        body += data
+    ident = b"\x7fELF" + bytes([1, 1, 1]) + bytes(9)
+    header = struct.pack("<HHIIIIIHHHHHH", 2, 40, 1, entry, phoff, 0, 0, 52, 32, len(segments), 40, 0, 0)
+    path.write_bytes(ident + header + headers + body)
+    return str(path)
+
+
+def test_load_segments_at_physical_addresses(tmp_path):
+    elf = write_elf(tmp_path / "fw.elf", [(0x08004000, b"\x02" * 16, 16), (0x08000000, b"\x01" * 32, 0x100)])
+    with read_elf(elf) as image:
+        assert [(s.address, bytes(s.data)) for s in image.segments] == [
+            (0x08000000, b"\x01" * 32),   # .bss past filesz is not flash content
+            (0x08004000, b"\x02" * 16),
+        ]
+        assert image.entry == 0x08000101
+    assert image.segments == []
+
+
+def test_overlapping_segments_are_rejected(tmp_path):
+    elf = write_elf(tmp_path / "fw.elf", [(0x08000000, b"\x01" * 32, 32), (0x08000010, b"\x02" * 16, 16)])
+    with pytest.raises(ImageFormatError, match="overlap"):
+        load_image(elf)
+
+
+def test_not_an_elf(tmp_path):
+    path = tmp_path / "fw.elf"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ImageFormatError, match="not an ELF"):
+        load_image(str(path))
+
+
+def test_segments_are_converted_once_per_file_version(tmp_path, cache, monkeypatch):
+    elf = write_elf(tmp_path / "fw.elf", [(0x08000000, b"\x01" * 32, 32), (0x08004000, b"\x02" * 16, 16)])
+    first = convert_segment_files([(elf, "08000000")], cache)
+    assert [(addr, open(path, "rb").read()) for path, addr in first] == [
+        ("08000000", b"\x01" * 32), ("08004000", b"\x02" * 16)
+    ]
+
+    def no_reads(*args):
+        raise AssertionError("unchanged image read again")
+    monkeypatch.setattr(cache, "put_bytes", no_reads)
+    assert convert_segment_files([(elf, "08000000")], cache) == first
+
+    monkeypatch.undo()
+    write_elf(tmp_path / "fw.elf", [(0x08000000, b"\x03" * 32, 32)])
+    os.utime(elf, ns=(0, os.stat(elf).st_mtime_ns + 10 ** 9))
+    [(path, addr)] = convert_segment_files([(elf, "08000000")], cache)
+    assert (addr, open(path, "rb").read()) == ("08000000", b"\x03" * 32)
+
+
+def test_segments_sharing_a_sector_are_programmed_together(tmp_path, project):
+    # The project's sectors are 0x400: the first two segments share one, the third starts the next
+    elf = write_elf(tmp_path / "fw.elf", [
+        (0x08000000, b"\x01" * 32, 32), (0x08000100, b"\x02" * 16, 16), (0x08000400, b"\x03" * 16, 16),
+    ])
+    job = prepare_flash({
+        "name": "segments",
+        "project_file": project,
+        "image_file": elf, "image_enabled": True, "addr_image": "08000000",
+    }, JFLASH_SIM)
+    assert [(addr, open(path, "rb").read()) for path, addr in job.plan.binaries] == [
+        ("08000000", b"\x01" * 32 + b"\xff" * 0xE0 + b"\x02" * 16),
+        ("08000400", b"\x03" * 16),
+    ]
+
@@ -0,0 +1,71 @@
+import os
+
+from conftest import write
+from fill_trim import TRIM_ALIGN, erased_runs, trim_fill
+from flash_core import prepare_flash
+from flash_plan import MAX_FILL_GAP
+from mapped_file import MappedFile
+
+DATA = b"\x5a" * 0x1000
+
+
+def profile_for(project, image, chip_erase=True):
+    return {
+        "name": "trim",
+        "project_file": project,
+        "image_file": image, "image_enabled": True, "addr_image": "08000000",
+        "chip_erase": chip_erase,
+        "trim_fill": True,
+        "sector_size": "0x400",
+    }
+
+
+def test_runs_are_aligned_to_absolute_addresses(tmp_path):
+    # run 0x0F80-0x4080 shrinks to whole TRIM_ALIGN units at the image's address
+    image = write(tmp_path / "a.bin", b"\x00" * 0xF80 + b"\xff" * 0x3100 + b"\x00" * 0x80)
+    with MappedFile(image) as mapped:
+        runs = erased_runs(mapped, 0x08000000, 0x1000)
+        shifted = erased_runs(mapped, 0x08000040, 0x1000)
+    assert runs == [(0x1000, 0x4000)]
+    assert shifted == [(0x1000 - 0x40, 0x4000 - 0x40)]
+    for lo, hi in runs + shifted:
+        assert (hi - lo) % TRIM_ALIGN == 0
+
+
+def test_runs_shorter_than_min_run_after_alignment_are_kept(tmp_path):
+    image = write(tmp_path / "a.bin", b"\x00" * 0x10 + b"\xff" * 0x1000 + b"\x00" * 0x10)
+    with MappedFile(image) as mapped:
+        assert erased_runs(mapped, 0x08000000, 0x1000) == []
+        assert erased_runs(mapped, 0x08000000, 0xF00) == [(0x100, 0x1000)]
+
+
+def test_trailing_fill_is_dropped(tmp_path):
+    image = write(tmp_path / "a.bin", b"\x00" * 0x10 + b"\xff" * 0x2000)
+    with MappedFile(image) as mapped:
+        assert erased_runs(mapped, 0x08000000, 0x1000) == [(0x100, 0x2010)]
+
+
+def test_no_trim_without_chip_erase(tmp_path, cache):
+    image = write(tmp_path / "a.bin", DATA + b"\xff" * 0x4000 + DATA)
+    result = trim_fill([(image, "08000000")], False, 0x400, cache)
+    assert result.binaries == [(image, "08000000")]
+    assert result.reason and not result.skipped
+
+
+def test_gaps_the_planner_would_fill_are_not_trimmed(tmp_path, project):
+    # 0xC00 of fill is within MAX_FILL_GAP: group_images would program it anyway
+    image = write(tmp_path / "a.bin", DATA + b"\xff" * 0xC00 + DATA)
+    job = prepare_flash(profile_for(project, image), "JFlash.exe")
+    assert job.fill_trim.skipped == 0 and job.fill_trim.runs == 0
+    assert job.plan.binaries == [(image, "08000000")]
+
+
+def test_trimmed_runs_stay_out_of_the_plan(tmp_path, project):
+    gap = MAX_FILL_GAP + 0x1000
+    image = write(tmp_path / "a.bin", DATA + b"\xff" * gap + DATA + b"\xff" * 0x200)
+    job = prepare_flash(profile_for(project, image), "JFlash.exe")
+
+    assert job.fill_trim.skipped == gap  # the short trailing fill is programmed, not trimmed
+    programmed = [(int(addr, 16), os.path.getsize(path)) for path, addr in job.plan.binaries]
+    assert programmed == [(0x08000000, len(DATA)), (0x08000000 + len(DATA) + gap, len(DATA) + 0x200)]
+    assert sum(size for _, size in programmed) + job.fill_trim.skipped == os.path.getsize(image)
@@ -0,0 +1,58 @@
+import json
+import threading
+
+from conftest import JFLASH_SIM
+from flash_core import prepare_flash
+from gang import run_gang
+
+
+def gang_job(tmp_path, project, serials, step_timeout=10):
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(range(256)) * 16)
+    return prepare_flash({
+        "name": "gang",
+        "project_file": project,
+        "image_file": str(image), "image_enabled": True, "addr_image": "08000000",
+        "jlink_sn": ",".join(serials),
+        "step_timeout": step_timeout,
+    }, JFLASH_SIM)
+
+
+def test_every_probe_passes(tmp_path, project, sim):
+    serials = ["111", "222", "333"]
+    job = gang_job(tmp_path, project, serials)
+    updates = []
+    result = run_gang(serials, job.steps_for, on_update=lambda probe: updates.append((probe.serial, probe.status)))
+
+    assert result.passed
+    assert result.summary().startswith("3/3 probes passed")
+    assert [(p.serial, p.status, p.returncode) for p in result.probes] == [(sn, "passed", 0) for sn in serials]
+    for sn in serials:
+        assert updates.index((sn, "running")) < updates.index((sn, "passed"))
+    commands = [json.loads(line) for line in sim.read_text().splitlines()]
+    assert sorted(argv[argv.index("-usb") + 1] for argv in commands) == serials
+
+
+def test_failures_and_timeouts_are_reported_per_probe(tmp_path, project, sim, monkeypatch):
+    monkeypatch.setenv("JFLASH_SIM_FAIL", "222:program")
+    monkeypatch.setenv("JFLASH_SIM_HANG", "333:verify")
+    serials = ["111", "222", "333"]
+    job = gang_job(tmp_path, project, serials, step_timeout=1)
+    result = run_gang(serials, job.steps_for)
+
+    probes = {p.serial: p for p in result.probes}
+    assert not result.passed
+    assert result.summary().startswith("1/3 probes passed")
+    assert probes["111"].status == "passed"
+    assert probes["222"].status == "failed" and probes["222"].returncode == 1
+    assert probes["333"].status == "failed" and "timed out" in probes["333"].error
+    assert result.as_dict()["probes"][1]["error"] == probes["222"].error
+
+
+def test_cancelled_gang_skips_probes_not_started(tmp_path, project, sim):
+    cancel = threading.Event()
+    cancel.set()
+    job = gang_job(tmp_path, project, ["111", "222"])
+    result = run_gang(["111", "222"], job.steps_for, cancel_event=cancel)
+    assert [(p.status, p.error) for p in result.probes] == [("failed", "cancelled")] * 2
+    assert not sim.exists()
@@ -0,0 +1,51 @@
+import io
+import sys
+
+from conftest import JFLASH_SIM
+from jflash import parse_progress, program_command, run_streamed
+from jflash_sim import SIM_DEFAULTS, Simulator
+from metrics import PhaseClock
+
+
+def sim_transcript(project, images, chip_erase=False):
+    out = io.StringIO()
+    Simulator({**SIM_DEFAULTS, "scale": 0.0}, "123", out).run(project, chip_erase, images)
+    return out.getvalue().splitlines()
+
+
+def test_verify_lines_go_to_verify():
+    for line in (" - Target programmed and verified successfully @ 0x08000000",
+                 " - Verifying target (4096 bytes, 1 range) ...",
+                 "Comparing range 0x08000000 - 0x08000FFF"):
+        assert parse_progress(line).phase == "verify"
+    assert parse_progress(" - Programming 50% (2048 bytes)").phase == "program"
+    assert parse_progress("ERROR: Verify failed @ address 0x08000010.").phase == "error"
+
+
+def test_simulated_session_phase_order(tmp_path, project):
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(4096))
+    phases = []
+    for line in sim_transcript(project, [(str(image), 0x08000000)]):
+        event = parse_progress(line)
+        if event is not None and (not phases or phases[-1] != event.phase):
+            phases.append(event.phase)
+    # "Auto programming target" opens the -auto cycle, its erase comes next
+    assert phases == ["connect", "program", "erase", "program", "verify"]
+
+
+def test_simulated_session_times_verify(tmp_path, project, monkeypatch):
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(128 * 1024))
+    scale = 0.25
+    monkeypatch.setenv("JFLASH_SIM_SCALE", str(scale))
+    monkeypatch.setenv("JFLASH_SIM_STARTUP", "0")
+    clock = PhaseClock()
+    cmd = [sys.executable] + program_command(JFLASH_SIM, project, "123", [(str(image), "08000000")])
+    assert run_streamed(cmd, lambda lines: None, flush_interval=0.01, clock=clock) == 0
+
+    link_kbps = 4000 * SIM_DEFAULTS["swd_efficiency"] / 8
+    verify = 128 / link_kbps / 4 * scale
+    program = 128 / min(SIM_DEFAULTS["write_kbps"], link_kbps) * scale
+    assert verify * 0.8 <= clock.durations["verify"] < program
+    assert clock.durations["program"] >= program * 0.8
@@ -0,0 +1,53 @@
+import json
+import os
+
+from conftest import JFLASH_SIM
+from flash_core import EXIT_INVALID, EXIT_OK
+from jflash_cli import main
+
+
+def run_cli(capsys, *argv):
+    code = main(list(argv))
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_unreadable_profile_store(tmp_path, capsys):
+    db = tmp_path / "profiles.db"
+    db.write_bytes(b"not a database" * 100)
+    code, summary = run_cli(capsys, "--profile", "A", "--settings", str(db), "--dry-run")
+    assert code == EXIT_INVALID
+    assert summary["error"].startswith("Failed to load settings: ")
+
+
+def test_errors_after_loading_are_not_blamed_on_the_settings(tmp_path, project, capsys, monkeypatch):
+    monkeypatch.setenv("JFLASH_EXE", JFLASH_SIM)
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(16))
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"profiles": [{
+        "name": "A",
+        "project_file": project,
+        "image_file": str(image), "image_enabled": True, "addr_image": "08000000",
+        "step_timeout": "soon",
+    }]}))
+    code, summary = run_cli(capsys, "--profile", "A", "--settings", str(settings), "--dry-run")
+    assert code == EXIT_INVALID
+    assert summary["error"] and "settings" not in summary["error"]
+
+
+def test_dry_run_fills_the_artifact_cache(tmp_path, project, capsys, monkeypatch):
+    monkeypatch.setenv("JFLASH_EXE", JFLASH_SIM)
+    trpk = tmp_path / "app.trpk"
+    trpk.write_bytes(os.urandom(64))
+    settings = tmp_path / "settings.json"
+    settings.write_text(json.dumps({"profiles": [{
+        "name": "A",
+        "project_file": project,
+        "image_file": str(trpk), "image_enabled": True, "addr_image": "08000000",
+    }]}))
+    code, summary = run_cli(capsys, "--profile", "A", "--settings", str(settings), "--dry-run")
+    assert code == EXIT_OK
+    [(artifact, addr)] = summary["plan"]["binaries"]
+    assert addr == "08000000" and open(artifact, "rb").read() == trpk.read_bytes()
+    assert any(os.path.basename(artifact) in arg for arg in summary["commands"][""][0])
+
@@ -0,0 +1,108 @@
+import os
+import stat
+
+import pytest
+
+import parser
+from conftest import JFLASH_SIM
+from flash_core import FlashError, prepare_flash
+from parser import ConfigWriter, get_config, load_project, set_configs
+
+PROJECT = "AppVersion = 72000\n[JTAG]\n  Speed0 = 4000\n  Speed1 = 4000\n[CPU]\n  Core = 0x030000FF\n"
+
+
+@pytest.fixture
+def project_file(tmp_path):
+    path = tmp_path / "board.jflash"
+    path.write_text(PROJECT)
+    return str(path)
+
+
+def test_set_configs_rewrites_once(project_file):
+    assert set_configs(project_file, {("JTAG", "Speed1"): "1000", ("CPU", "Endian"): "0"})
+    assert open(project_file).read() == (
+        "AppVersion = 72000\n[JTAG]\n  Speed0 = 4000\n  Speed1 = 1000\n"
+        "[CPU]\n  Endian = 0\n  Core = 0x030000FF\n"
+    )
+    # nothing changes, nothing is written
+    assert not set_configs(project_file, {("JTAG", "Speed1"): "1000"})
+
+
+def test_set_configs_is_atomic(project_file, monkeypatch):
+    os.chmod(project_file, 0o640)
+    inode = os.stat(project_file).st_ino
+
+    def crash(src, dst):
+        raise OSError("disk gone")
+    monkeypatch.setattr(parser.os, "replace", crash)
+    with pytest.raises(OSError):
+        set_configs(project_file, {("JTAG", "Speed1"): "1000"})
+    assert open(project_file).read() == PROJECT
+    assert os.listdir(os.path.dirname(project_file)) == ["board.jflash"]  # no temp file left
+
+    monkeypatch.undo()
+    set_configs(project_file, {("JTAG", "Speed1"): "1000"})
+    assert os.stat(project_file).st_ino != inode  # renamed over, never written in place
+    assert stat.S_IMODE(os.stat(project_file).st_mode) == 0o640
+
+
+def test_set_configs_invalidates_the_parsed_project(project_file):
+    assert load_project(project_file).get("JTAG", "Speed1") == "4000"
+    set_configs(project_file, {("JTAG", "Speed1"): "9000"})  # same file size
+    assert load_project(project_file).get("JTAG", "Speed1") == "9000"
+
+
+def test_config_writer_coalesces_until_flush(project_file, monkeypatch):
+    writes = []
+    monkeypatch.setattr(parser, "set_configs", lambda path, updates: writes.append((path, dict(updates))))
+    writer = ConfigWriter(delay=60)
+    writer.set(project_file, "JTAG", "Speed1", "1000")
+    writer.set(project_file, "JTAG", "Speed1", "2000")
+    writer.set(project_file, "JTAG", "Speed0", "2000")
+    assert writer.pending(project_file, "JTAG", "Speed1") == "2000"
+    assert writes == []
+
+    writer.flush()
+    assert writes == [(os.path.abspath(project_file), {("JTAG", "Speed1"): "2000", ("JTAG", "Speed0"): "2000"})]
+    assert writer.pending(project_file, "JTAG", "Speed1") is None
+    writer.flush()
+    assert len(writes) == 1
+
+
+def test_config_writer_writes_after_its_delay(project_file):
+    writer = ConfigWriter(delay=0.01)
+    writer.set(project_file, "JTAG", "Speed1", "1000")
+    for timer in list(writer._timers.values()):
+        timer.join()
+    assert get_config(project_file, "JTAG", "Speed1") == "1000"
+
+
+def test_config_writer_keeps_edits_it_could_not_write(project_file, monkeypatch):
+    def locked(path, updates):
+        raise PermissionError(13, "Permission denied", path)
+    monkeypatch.setattr(parser, "set_configs", locked)
+    writer = ConfigWriter(delay=0.01)
+    writer.set(project_file, "JTAG", "Speed1", "1000")
+    for timer in list(writer._timers.values()):
+        timer.join()
+    assert writer.pending(project_file, "JTAG", "Speed1") == "1000"
+    with pytest.raises(PermissionError):
+        writer.flush()
+
+    monkeypatch.undo()
+    writer.flush()
+    assert get_config(project_file, "JTAG", "Speed1") == "1000"
+
+
+def test_prepare_flash_stops_when_project_edits_cannot_be_written(tmp_path, project, monkeypatch):
+    image = tmp_path / "app.bin"
+    image.write_bytes(bytes(16))
+    monkeypatch.setattr(parser, "config_writer", ConfigWriter(delay=60))
+    parser.config_writer.set(project, "JTAG", "Speed1", "1000")
+    monkeypatch.setattr(parser, "set_configs", lambda path, updates: open(tmp_path / "missing" / "x", "w"))
+    with pytest.raises(FlashError, match="Could not save the project edits"):
+        prepare_flash({
+            "name": "edits",
+            "project_file": project,
+            "image_file": str(image), "image_enabled": True, "addr_image": "08000000",
+        }, JFLASH_SIM)
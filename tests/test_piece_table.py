@@ -0,0 +1,83 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from piece_table import (JOURNAL_MAGIC, JOURNAL_SUFFIX, PieceTable, patch_file,
+                         recover_journal)
+
+
+def test_edits_and_undo_redo():
+    table = PieceTable(b"0123456789")
+    table.overwrite(2, b"ab")
+    table.insert(0, b"XY")
+    table.delete(10, 2)
+    assert table[:] == b"XY01ab4567"
+    assert table[3] == ord("1") and table[-1] == ord("7")
+
+    assert table.undo() and table[:] == b"XY01ab456789"
+    assert table.undo() and table[:] == b"01ab456789"
+    assert table.redo() and table[:] == b"XY01ab456789"
+    table.overwrite(0, b"Z")
+    assert not table.redo()  # a new edit drops the redo history
+    assert table.undo() and table.undo() and table.undo()
+    assert not table.undo() and not table.is_modified()
+
+
+def test_overwrites_stay_in_place():
+    table = PieceTable(b"\x00" * 64)
+    table.overwrite(8, b"\x11\x22")
+    table.overwrite(9, b"\x33\x44")
+    table.overwrite(40, b"\x55")
+    assert table.in_place()
+    patched = bytearray(64)
+    for offset, data in table.dirty_ranges():
+        patched[offset:offset + len(data)] = data
+    assert bytes(patched) == table[:]
+    assert sum(len(data) for _, data in table.dirty_ranges()) == 4
+
+    table.insert(0, b"\x66")
+    assert not table.in_place()
+
+
+def test_overwrite_past_end_is_refused():
+    table = PieceTable(b"abc")
+    with pytest.raises(IndexError):
+        table.overwrite(2, b"xy")
+    assert table[:] == b"abc"
+
+
+def test_patch_file(tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(bytes(32))
+    patch_file(str(path), [(4, b"\x01\x02"), (30, b"\xff\xff")])
+    assert path.read_bytes() == bytes(4) + b"\x01\x02" + bytes(24) + b"\xff\xff"
+    assert not os.path.exists(str(path) + JOURNAL_SUFFIX)
+
+
+def write_journal(path, ranges):
+    body = b"".join(struct.pack(">QI", offset, len(data)) + data for offset, data in ranges)
+    raw = JOURNAL_MAGIC + body + struct.pack(">I", zlib.crc32(body))
+    (path.parent / (path.name + JOURNAL_SUFFIX)).write_bytes(raw)
+    return raw
+
+
+def test_recover_replays_a_complete_journal(tmp_path):
+    # a crash after the journal was written, before (or while) the image was patched
+    path = tmp_path / "image.bin"
+    path.write_bytes(bytes(16))
+    write_journal(path, [(2, b"\xaa\xbb"), (12, b"\xcc")])
+    assert recover_journal(str(path))
+    assert path.read_bytes() == bytes(2) + b"\xaa\xbb" + bytes(8) + b"\xcc" + bytes(3)
+    assert not recover_journal(str(path))
+
+
+def test_recover_discards_a_torn_journal(tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(bytes(16))
+    raw = write_journal(path, [(2, b"\xaa\xbb")])
+    (tmp_path / ("image.bin" + JOURNAL_SUFFIX)).write_bytes(raw[:-3])
+    assert not recover_journal(str(path))
+    assert path.read_bytes() == bytes(16)
+    assert not os.path.exists(str(path) + JOURNAL_SUFFIX)
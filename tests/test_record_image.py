@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import record_image
+from conftest import write
+from record_image import (MAX_CACHED_IMAGES, ImageFormatError, is_loaded, load_image,
+                          read_intel_hex, read_srec)
+
+
+def intel_hex(address, data):
+    """One data record at a 16-bit address and the end-of-file record"""
+    raw = bytes([len(data), address >> 8, address & 0xFF, 0]) + data
+    return f":{raw.hex().upper()}{-sum(raw) & 0xFF:02X}\n:00000001FF\n"
+
+
+def test_cache_keeps_only_recent_images(tmp_path):
+    paths = []
+    for i in range(MAX_CACHED_IMAGES + 2):
+        path = tmp_path / f"fw{i}.hex"
+        path.write_text(intel_hex(0x100 * i, bytes([i]) * 4))
+        paths.append(str(path))
+        load_image(paths[-1])
+    assert len(record_image._images) == MAX_CACHED_IMAGES
+    assert not is_loaded(paths[0]) and is_loaded(paths[-1])
+
+
+def test_changed_file_replaces_its_cached_image(tmp_path):
+    path = tmp_path / "fw.hex"
+    path.write_text(intel_hex(0, b"\x01" * 4))
+    assert bytes(load_image(str(path)).segments[0].data) == b"\x01" * 4
+
+    path.write_text(intel_hex(0, b"\x02" * 8))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert not is_loaded(str(path))
+    assert bytes(load_image(str(path)).segments[0].data) == b"\x02" * 8
+    assert [key for key in record_image._images if key[0] == str(path)] == [(str(path), *record_image._stamp(str(path)))]
+
+
+def test_intel_hex_segments_and_extended_addresses(tmp_path):
+    text = (
+        ":020000040800F2\n"                       # upper 16 bits 0800
+        + intel_hex(0x0000, b"\x01\x02\x03\x04").splitlines()[0] + "\n"
+        + intel_hex(0x0004, b"\x05\x06").splitlines()[0] + "\n"   # continues the segment
+        + intel_hex(0x1000, b"\x07").splitlines()[0] + "\n"
+        + ":0400000508000101ED\n"                 # start linear address
+        + ":00000001FF\n"
+    )
+    image = read_intel_hex(write(tmp_path / "fw.hex", text))
+    assert [(s.address, bytes(s.data)) for s in image.segments] == [
+        (0x08000000, b"\x01\x02\x03\x04\x05\x06"), (0x08001000, b"\x07")
+    ]
+    assert image.entry == 0x08000101
+    flat = image.flat()
+    assert len(flat) == 0x1001 and flat[6:8] == b"\xff\xff" and flat[0x1000] == 7
+
+
+def test_intel_hex_errors(tmp_path):
+    good = intel_hex(0, b"\x01\x02").splitlines()[0]
+    bad_checksum = good[:-2] + f"{(int(good[-2:], 16) + 1) & 0xFF:02X}"
+    cases = {
+        bad_checksum + "\n:00000001FF\n": "checksum mismatch",
+        good + "\n": "no end-of-file record",
+        "01000000\n": "does not start with ':'",
+        ":0200000001\n": "byte count",
+        ":0Z\n": "not a hex record",
+    }
+    for text, message in cases.items():
+        with pytest.raises(ImageFormatError, match=message) as e:
+            read_intel_hex(write(tmp_path / "bad.hex", text))
+        assert e.value.line == 1 or message == "no end-of-file record"
+
+
+def srec(kind, address, data, width):
+    raw = bytes([width + len(data) + 1]) + address.to_bytes(width, "big") + data
+    return f"S{kind}{raw.hex().upper()}{~sum(raw) & 0xFF:02X}"
+
+
+def test_srec_segments(tmp_path):
+    text = "\n".join([
+        "S00600004844521B",
+        srec(3, 0x08000000, b"\x01\x02", 4),
+        srec(3, 0x08000002, b"\x03", 4),
+        srec(1, 0x0100, b"\x04", 2),
+        srec(7, 0x08000101, b"", 4),
+    ]) + "\n"
+    image = read_srec(write(tmp_path / "fw.srec", text))
+    assert [(s.address, bytes(s.data)) for s in image.segments] == [
+        (0x0100, b"\x04"), (0x08000000, b"\x01\x02\x03")
+    ]
+    assert image.entry == 0x08000101
+
+
+def test_srec_errors(tmp_path):
+    good = srec(3, 0x08000000, b"\x01\x02", 4)
+    end = srec(7, 0, b"", 4)
+    cases = {
+        good[:-2] + "00\n" + end + "\n": "checksum mismatch",
+        good + "\n": "no termination record",
+        "X1030000FC\n": "not an S-record",
+        "S1050000FA\n": "byte count",
+    }
+    for text, message in cases.items():
+        with pytest.raises(ImageFormatError, match=message):
+            read_srec(write(tmp_path / "bad.srec", text))
+
+
+def test_overlapping_records_are_rejected(tmp_path):
+    text = intel_hex(0x10, b"\x01\x02\x03\x04").splitlines()[0] + "\n" + intel_hex(0x12, b"\x05")
+    with pytest.raises(ImageFormatError, match="overlap"):
+        read_intel_hex(write(tmp_path / "fw.hex", text))
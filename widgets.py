@@ -1,13 +1,43 @@
 from PyQt6.QtWidgets import QWidget, QLineEdit, QLabel, QHBoxLayout
+from PyQt6.QtCore import QThread, pyqtSignal
 from styles import MaterialButton, MaterialCheckBox
 
+# Images that carry their own addresses (Intel HEX, S-record, ELF), for file dialog filters
+SEGMENT_FILTER = "*.hex *.ihex *.srec *.s19 *.s28 *.s37 *.mot *.elf *.axf *.out"
+
+class ImageLoader(QThread):
+    """Parses a .hex / .srec / ELF image off the GUI thread for its address summary"""
+    loaded = pyqtSignal(str, int, str)  # path, start address, tooltip
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.error = ""
+
+    def run(self):
+        from record_image import ImageFormatError, load_image
+        try:
+            with load_image(self.path) as image:
+                self.loaded.emit(self.path, image.start, (
+                    f"Addresses come from the file: {len(image.segments)} segment(s), "
+                    f"{image.payload_size} bytes, {image.start:08X}-{image.end:08X}"
+                ))
+        except (OSError, ImageFormatError) as e:
+            self.error = str(e)
+            self.loaded.emit(self.path, -1, f"Addresses come from the file: {e}")
+
+
 class FlashFileWidget(QWidget):
     """
     A widget to select a file to flash, with address input and enable checkbox,
     and hex viewer integration.
     """
+    image_loaded = pyqtSignal()  # a .hex / .srec / ELF file was parsed, its address is shown
+
     def __init__(self, label_text, default_address, file_filter="(*.bin *.trpk)"):
         super().__init__()
+        self._loader = None
+        self._viewer_loader = None  # parses a .hex / .srec file before the hex viewer opens
 
         self.file_path = QLineEdit()
         self.addr = QLineEdit(default_address)
@@ -37,6 +67,8 @@ class FlashFileWidget(QWidget):
 
         # Connect buttons
         self.btn_browse.clicked.connect(self.select_file)
+        # .hex / .srec images carry their own addresses
+        self.file_path.textChanged.connect(self._update_address_mode)
         # Connect double-click on file_path to open hex viewer
         self.file_path.mouseDoubleClickEvent = self._on_file_double_click
 
@@ -51,6 +83,9 @@ class FlashFileWidget(QWidget):
         file, _ = QFileDialog.getOpenFileName(self, f"Select {self.label_text}", "", self.file_filter)
         if file:
             self.file_path.setText(file)
+            if self.addr.isReadOnly():  # a .hex / .srec / ELF file set its own address
+                self.chk_enable.setChecked(True)
+                return
             default_kernel_address = "08080000" if self.file_path.text().endswith(".trpk") else "08014000"
             default_bootloader_address = "08000000"
             is_bootloader = True if "boot" in self.file_path.text() else False
@@ -58,24 +93,73 @@ class FlashFileWidget(QWidget):
             self.chk_enable.setChecked(True)
 
 
+    def _update_address_mode(self, text):
+        from record_image import is_segment_file
+
+        path = text.strip()
+        if not is_segment_file(path):
+            if self.addr.isReadOnly():
+                self.addr.setReadOnly(False)
+                self.addr.setToolTip("")
+            return
+        self.addr.setReadOnly(True)
+        self.addr.setToolTip("Addresses come from the file: reading...")
+        if self._loader is None or not self._loader.isRunning():
+            self._start_loader(path)
+
+    def _start_loader(self, path):
+        self._loader = ImageLoader(path)
+        self._loader.loaded.connect(self._on_image_loaded)
+        self._loader.start()
+
+    def _on_image_loaded(self, path, start, tooltip):
+        self._loader.wait()
+        current = self.file_path.text().strip()
+        if path != current:  # the path was edited while the file was read
+            self._update_address_mode(current)
+            return
+        if start >= 0:
+            self.addr.setText(f"{start:08X}")
+        self.addr.setToolTip(tooltip)
+        self.image_loaded.emit()
+
     def open_hex_viewer(self):
         if not self.file_path.text():
             from PyQt6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "No file", "Please select a file first.")
             return
 
+        from record_image import is_loaded, is_segment_file
+        path = self.file_path.text()
+        if is_segment_file(path) and not is_loaded(path):
+            # The viewer opens once the file is parsed, off the GUI thread
+            if self._viewer_loader is None:
+                self._viewer_loader = ImageLoader(path)
+                self._viewer_loader.loaded.connect(self._on_viewer_image_loaded)
+                self._viewer_loader.start()
+            return
+        self._show_hex_viewer(path)
+
+    def _on_viewer_image_loaded(self, path, start, tooltip):
+        loader, self._viewer_loader = self._viewer_loader, None
+        loader.wait()
+        if loader.error:
+            from PyQt6.QtWidgets import QMessageBox
+            QMessageBox.critical(self, "Error", f"Failed to open file in hex viewer:\n{loader.error}")
+            return
+        self._show_hex_viewer(path)
+
+    def _show_hex_viewer(self, path):
         from hex_viewer import Hexviewer
-        self.viewer = Hexviewer(self.file_path.text())  # store as attribute to keep it alive
+        self.viewer = Hexviewer(path)  # store as attribute to keep it alive
         try:
-            with open(self.viewer.file_path, "rb") as f:
-                self.viewer.data = bytearray(f.read())
-            self.viewer.update_display()
+            self.viewer.load_file()
         except Exception as e:
             from PyQt6.QtWidgets import QMessageBox
             QMessageBox.critical(self, "Error", f"Failed to open file in hex viewer:\n{e}")
             return
 
-        self.viewer.setWindowTitle(f"Hex viewer - {self.file_path.text()}")
+        self.viewer.setWindowTitle(f"Hex viewer - {path}[*]")
         self.viewer.show()
         self.viewer.raise_()
         self.viewer.activateWindow()